@@ -3,61 +3,104 @@
 
 """The GUI for playing chess using KingSnake!"""
 
-import pickle
+import argparse
+import cProfile
 import sys
 import time
 
-from king_snake.player import Player
-from king_snake.chessboard import Chessboard
-from king_snake.errors import ChessError
+from king_snake import instrumentation
+from king_snake.controller import GameController
+from king_snake.errors import ChessError, NotationError
+from king_snake.fen import to_fen
 
 
 class ChessGame(object):
 
     """A chess game manager"""
 
-    def __init__(self):
-        self.white, self.black = Player(), Player()
-        self.chessboard = Chessboard()
-        self.chessboard.add_players(self.white, self.black)
-        self.greet()
+    def __init__(self, engine_color=None, engine_seconds=5.0, fen=None,
+                 engine_processes=1):
+        """
+        Set up a new game.
+
+        If engine_color is "white" or "black", that side is played by the
+        engine, which thinks for engine_seconds per move with
+        engine_processes processes. If fen is given, the game starts from
+        that position.
+        """
+        self.controller = GameController(engine_color, engine_seconds, fen,
+                                         engine_processes=engine_processes)
+
+    @property
+    def chessboard(self):
+        """Chessboard of the game being played."""
+        return self.controller.chessboard
 
     def greet(self):
         """Greet the players and begin game."""
         print("Welcome to KingSnake.\n"
               "Enter moves directly or press Enter to enter the menu.")
-        self.get_move()
+        self.play()
+
+    def play(self):
+        """
+        Show board and prompt for moves until the players quit.
 
-    def get_move(self, message=""):
-        """Show board and prompt for current move, then execute it."""
-        valid_move = False
-        while not valid_move:
+        Once the game has ended, the players are sent to the menu instead,
+        from which they can start over, load or undo a move.
+        """
+        message = ""
+        while True:
             self.show(message)
+            message = ""
+            outcome = self.chessboard.outcome()
+            if outcome:
+                self.announce(outcome)
+                message = self.menu(game_over=True)
+                continue
+            if self.controller.engine_to_move:
+                color = self.chessboard.current_player.color
+                message = "{} plays {}.".format(
+                            color.capitalize(),
+                            " ".join(self.controller.engine_move()))
+                continue
             move = raw_input("Please enter your move (e.g. E2 E4) or enter to "
                              "access the menu: ")
             if not move:
-                self.menu()
-            else:
-                try:
-                    start_position, end_position = move.split()
-                    self.chessboard.current_player.move(start_position.upper(),
-                                                        end_position.upper())
-                    valid_move = True
-                except ValueError:
-                    message = ("Please enter your move in the following form:"
-                               "\n{start position} {end position}\n"
-                              "Positions are notated using their letter "
-                              "followed by their number.\n"
-                              "Example valid move request to move from A1 to "
-                              "A2: 'A1 A2'")
-                except KeyError:
-                    message = "Only valid fields are allowed."
-                except ChessError as error:
-                    message = error
-        self.get_move(message)
-
-    def menu(self):
-        """Allow user to do something other than move pieces"""
+                message = self.menu()
+                continue
+            try:
+                self.controller.move(move)
+            except NotationError:
+                message = ("Please enter your move in the following form:"
+                           "\n{start position} {end position}\n"
+                           "Positions are notated using their letter "
+                           "followed by their number.\n"
+                           "Example valid move request to move from A1 to "
+                           "A2: 'A1 A2'\n"
+                           "A pawn reaching the last row becomes a queen, "
+                           "add R, B or N to choose another figure.")
+            except KeyError:
+                message = "Only valid fields are allowed."
+            except ChessError as error:
+                message = error
+
+    def announce(self, outcome):
+        """Print how the game ended."""
+        if outcome.winner:
+            print("{}! {} is the winner!".format(
+                                             outcome.termination.capitalize(),
+                                             outcome.winner.capitalize()))
+        else:
+            print("Draw by {}.".format(outcome.termination))
+
+    def menu(self, game_over=False):
+        """
+        Allow user to do something other than move pieces.
+
+        Return the message to show when the game goes on. If the game is
+        over, neither resigning nor going back to it is offered.
+        """
 
         def quit_game():
             """Quit game."""
@@ -73,56 +116,54 @@ class ChessGame(object):
 
         def restart():
             """Start new game."""
-            self.__init__()
+            self.controller.new_game()
+            return "New game started."
 
         def save_game():
             """Save game to file."""
             file_name = raw_input("What file would you like to save to?: ")
             try:
-                with open(file_name, "w") as saved_game:
-                    pickle.dump(self.chessboard, saved_game)
+                self.controller.save(file_name)
             except IOError:
-                self.get_move("The file you have chosen is invalid. "
-                              "Please enter a valid filename.")
-            self.get_move("Game saved to {}.".format(file_name))
+                return ("The file you have chosen is invalid. "
+                        "Please enter a valid filename.")
+            return "Game saved to {}.".format(file_name)
 
         def load_game():
             """Load game from file."""
             file_name = raw_input("What file would you like to load from?: ")
             try:
-                with open(file_name) as saved_game:
-                    self.chessboard = pickle.load(saved_game)
-                    self.white = self.chessboard.players["white"]
-                    self.black = self.chessboard.players["black"]
+                self.controller.load(file_name)
             except IOError:
-                self.get_move("The file you have chosen is invalid. "
-                              "Please enter a valid filename.")
+                return ("The file you have chosen is invalid. "
+                        "Please enter a valid filename.")
+            return "Game loaded from {}.".format(file_name)
 
         def undo_turn():
             """Undo turn."""
-            self.chessboard.rollback()
-            self.get_move("Move restored.")
+            self.controller.undo()
+            return "Move restored."
 
         def return_to_game():
             """Resume play."""
-            self.get_move()
+            return ""
 
+        if game_over:
+            functions = (quit_game, restart, save_game, load_game, undo_turn)
+        else:
+            functions = (quit_game, resign, restart, save_game, load_game,
+                         undo_turn, return_to_game)
         menu_choices = []
-        for function in (quit_game, resign, restart, save_game, load_game,
-                         undo_turn, return_to_game):
+        for function in functions:
             menu_choices.append((function, function.__doc__))
-        valid_choice = False
-        while not valid_choice:
+        while True:
             for number, choice in enumerate(menu_choices):
                 print("{}. {}".format(number + 1, choice[1]))
             try:
                 decision = int(raw_input("What would you like to do?: ")) - 1
-                try:
-                    valid_choice = True
-                    menu_choices[decision][0]()
-                except IndexError:
-                    valid_choice = False
-                    print("Please enter a valid menu number.")
+                if decision < 0:
+                    raise IndexError()
+                return menu_choices[decision][0]()
             except (ValueError, IndexError):
                 print("Please enter a valid menu number.")
 
@@ -133,4 +174,109 @@ class ChessGame(object):
               "It's {}'s turn.".format(message,
                                        self.chessboard.current_player.color))
 
-game = ChessGame()
+
+def play_batch(controller, lines, verbose=False):
+    """
+    Play the moves in lines, one per line, and return the exit status.
+
+    Empty lines and lines starting with "#" are skipped, and the engine
+    replies to each move if it plays a side. If verbose is set, each move is
+    printed as it is made. Play stops at the first move that cannot be made,
+    which is reported. Finally the position is printed in FEN, followed by
+    the result if the game is over. The status is 1 if a move could not be
+    made, otherwise 0.
+    """
+    status = 0
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        _play_engine(controller, verbose)
+        try:
+            move = controller.move(line)
+        except (ChessError, KeyError) as error:
+            print("Line {}: cannot play {}: {}".format(number, line, error))
+            status = 1
+            break
+        if verbose:
+            print(" ".join(move))
+    else:
+        _play_engine(controller, verbose)
+    print(to_fen(controller.chessboard))
+    outcome = controller.chessboard.outcome()
+    if outcome:
+        print("{} {}".format(outcome.result, outcome.termination))
+    return status
+
+
+def _play_engine(controller, verbose):
+    """Let the engine move if it is its turn."""
+    while controller.engine_to_move:
+        move = controller.engine_move()
+        if verbose:
+            print(" ".join(move))
+
+
+def _run_batch(controller, lines, arguments):
+    """Play batch, instrumented and profiled as the arguments ask."""
+    chessboard = controller.chessboard
+    if arguments.stats:
+        instrumentation.start(chessboard)
+    if arguments.profile:
+        profiler = cProfile.Profile()
+        status = profiler.runcall(play_batch, controller, lines,
+                                  arguments.verbose)
+        profiler.dump_stats(arguments.profile)
+    elif arguments.flame_graph:
+        with instrumentation.StackProfiler() as profiler:
+            status = play_batch(controller, lines, arguments.verbose)
+        profiler.write(arguments.flame_graph)
+    else:
+        status = play_batch(controller, lines, arguments.verbose)
+    if arguments.stats:
+        instrumentation.stop(chessboard)
+        print(instrumentation.format_stats(chessboard.stats()))
+    return status
+
+
+def main():
+    """Parse command line and play interactively or from a list of moves."""
+    parser = argparse.ArgumentParser(description="Play chess using KingSnake!")
+    parser.add_argument("--engine", choices=("white", "black"),
+                        help="let the engine play this side")
+    parser.add_argument("--engine-seconds", type=float, default=5.0,
+                        help="seconds the engine thinks per move (default: 5)")
+    parser.add_argument("--engine-processes", type=int, default=1,
+                        help="number of processes the engine searches with "
+                             "(default: 1)")
+    parser.add_argument("--fen", help="start from this position, given in FEN")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="play the moves in FILE, one per line such as "
+                             "e2e4, without asking; - reads standard input")
+    parser.add_argument("--verbose", action="store_true",
+                        help="print each move made in batch mode")
+    parser.add_argument("--stats", action="store_true",
+                        help="count and time the hot paths of move "
+                             "validation in batch mode and print them")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="profile batch mode with cProfile and save the "
+                             "result to FILE for pstats")
+    parser.add_argument("--flame-graph", metavar="FILE",
+                        help="save the call stacks of batch mode to FILE in "
+                             "folded format for flame graph tools")
+    arguments = parser.parse_args()
+
+    if not arguments.batch:
+        ChessGame(arguments.engine, arguments.engine_seconds, arguments.fen,
+                  arguments.engine_processes).greet()
+        return
+    controller = GameController(arguments.engine, arguments.engine_seconds,
+                                arguments.fen,
+                                engine_processes=arguments.engine_processes)
+    if arguments.batch == "-":
+        sys.exit(_run_batch(controller, sys.stdin, arguments))
+    with open(arguments.batch) as lines:
+        sys.exit(_run_batch(controller, lines, arguments))
+
+if __name__ == "__main__":
+    main()
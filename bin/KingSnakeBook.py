@@ -0,0 +1,49 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Build an opening book from PGN files or look up a position in it."""
+
+import argparse
+
+from king_snake.book import OpeningBook, build_book
+from king_snake.fen import START_FEN, from_fen
+from king_snake.pgn import open_pgn, parse_games
+
+
+def read_games(file_names):
+    """Yield (headers, san, result) for each game in the PGN files."""
+    for file_name in file_names:
+        with open_pgn(file_name) as lines:
+            for game in parse_games(lines):
+                yield game
+
+
+def main():
+    """Parse command line, then build book or look up position."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command")
+    build = commands.add_parser("build", help="build book from PGN files")
+    build.add_argument("book", help="book file to write")
+    build.add_argument("files", nargs="+", help="PGN files, may be compressed")
+    build.add_argument("--plies", type=int, default=30,
+                       help="moves counted per game (default: 30)")
+    lookup = commands.add_parser("lookup", help="show moves of a position")
+    lookup.add_argument("book", help="book file to read")
+    lookup.add_argument("--fen", default=START_FEN,
+                        help="position to look up (default: starting "
+                             "position)")
+    arguments = parser.parse_args()
+
+    if arguments.command == "build":
+        records = build_book(read_games(arguments.files), arguments.book,
+                             arguments.plies)
+        print("Wrote {} records to {}.".format(records, arguments.book))
+    else:
+        with OpeningBook(arguments.book) as book:
+            for entry in book.lookup(from_fen(arguments.fen)):
+                print("{:<10} {:>8} games  +{} ={} -{}".format(
+                      " ".join(entry.move), entry.games, entry.white_wins,
+                      entry.draws, entry.black_wins))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measure moves per second and latency of a running KingSnakeServer.py."""
+
+import argparse
+
+from king_snake.loadtest import percentile, random_games, run_load_test
+
+
+def main():
+    """Parse command line, run load test and report the measurements."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="localhost",
+                        help="address of the server (default: localhost)")
+    parser.add_argument("--port", type=int, default=5454,
+                        help="TCP port of the server (default: 5454)")
+    parser.add_argument("--socket",
+                        help="connect to this local socket instead of TCP")
+    parser.add_argument("--games", type=int, default=1000,
+                        help="games to play in total (default: 1000)")
+    parser.add_argument("--connections", type=int, default=10,
+                        help="connections to open (default: 10)")
+    parser.add_argument("--concurrent", type=int, default=10,
+                        help="games each connection plays at the same time "
+                             "(default: 10)")
+    parser.add_argument("--scripts", type=int, default=10,
+                        help="random games prepared to be replayed "
+                             "(default: 10)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random games (default: 0)")
+    arguments = parser.parse_args()
+
+    address = arguments.socket or (arguments.host, arguments.port)
+    print("Preparing {} random games.".format(arguments.scripts))
+    scripts = random_games(arguments.scripts, arguments.seed)
+    result = run_load_test(address, arguments.games, arguments.connections,
+                           arguments.concurrent, scripts)
+    print("{} games, {} moves, {} errors in {:.1f} s, {:.0f} moves/s".format(
+          result.games, result.moves, result.errors, result.seconds,
+          result.moves / max(result.seconds, 1e-9)))
+    if result.latencies:
+        print("Latency: median {:.1f} ms, 99th percentile {:.1f} ms".format(
+              1000 * percentile(result.latencies, 0.5),
+              1000 * percentile(result.latencies, 0.99)))
+
+if __name__ == "__main__":
+    main()
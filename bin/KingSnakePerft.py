@@ -0,0 +1,57 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Measure and check KingSnake's move generation with perft."""
+
+import argparse
+import sys
+
+from king_snake.perft import (KNOWN_RESULTS, POSITIONS, benchmark, check,
+                               divide, new_board)
+
+
+def main():
+    """Parse command line and run perft."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depth", type=int, default=4,
+                        help="deepest perft depth to run (default: 4)")
+    parser.add_argument("--position", choices=sorted(POSITIONS),
+                        default="start",
+                        help="known position to start from (default: start)")
+    parser.add_argument("--fen",
+                        help="start from this position instead, given in FEN")
+    parser.add_argument("--bitboards", action="store_true",
+                        help="use the bitboard backend")
+    parser.add_argument("--divide", action="store_true",
+                        help="show node counts below each move at depth")
+    parser.add_argument("--check", action="store_true",
+                        help="compare node counts with known results and "
+                             "exit with an error if they differ")
+    arguments = parser.parse_args()
+    if arguments.check and arguments.fen:
+        parser.error("--check needs a known --position, not --fen")
+
+    chessboard = new_board(arguments.bitboards,
+                           arguments.fen or POSITIONS[arguments.position])
+    if arguments.divide:
+        counts = divide(chessboard, arguments.depth)
+        for move, nodes in sorted(counts.items()):
+            print("{}: {}".format(" ".join(move), nodes))
+        print("Total: {}".format(sum(counts.values())))
+    elif arguments.check:
+        expected = KNOWN_RESULTS[arguments.position][:arguments.depth]
+        errors = check(chessboard, expected)
+        for depth, nodes, found in errors:
+            print("Depth {}: expected {} nodes, found {}".format(depth, nodes,
+                                                                 found))
+        if errors:
+            sys.exit(1)
+        print("All {} depths match.".format(len(expected)))
+    else:
+        for depth, nodes, seconds in benchmark(chessboard,
+                                               range(1, arguments.depth + 1)):
+            print("Depth {}: {} nodes in {:.3f} s, {:.0f} nodes/s".format(
+                  depth, nodes, seconds, nodes / max(seconds, 1e-9)))
+
+if __name__ == "__main__":
+    main()
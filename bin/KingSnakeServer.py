@@ -0,0 +1,35 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Host many chess games for players connected over the network."""
+
+import argparse
+
+from king_snake.server import serve
+
+
+def main():
+    """Parse command line and serve games until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="localhost",
+                        help="address to listen on (default: localhost)")
+    parser.add_argument("--port", type=int, default=5454,
+                        help="TCP port to listen on (default: 5454)")
+    parser.add_argument("--socket",
+                        help="listen on this local socket instead of TCP")
+    parser.add_argument("--bitboards", action="store_true",
+                        help="give the games' chessboards bitboards")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="positions the games share a cache of "
+                             "(default: 0, no cache)")
+    arguments = parser.parse_args()
+
+    address = arguments.socket or (arguments.host, arguments.port)
+    print("Serving games on {}.".format(address))
+    try:
+        serve(address, arguments.bitboards, arguments.cache_size)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
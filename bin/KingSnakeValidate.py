@@ -0,0 +1,47 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Check that all moves in archives of chess games are legal."""
+
+import argparse
+import sys
+import time
+
+from king_snake.batch import read_files, validate_games
+
+
+def main():
+    """Parse command line, validate games and report the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("files", nargs="+",
+                        help="PGN files (.pgn, .pgn.gz, .pgn.bz2) or move "
+                             "lists with one game of moves like e2e4 per line")
+    parser.add_argument("--processes", type=int,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=50,
+                        help="games handed to a worker at once (default: 50)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="only report illegal games and the summary")
+    arguments = parser.parse_args()
+
+    started = time.time()
+    games = illegal = plies = 0
+    for result in validate_games(read_files(arguments.files),
+                                 arguments.processes, arguments.chunk_size):
+        games += 1
+        plies += result.plies
+        if not result.legal:
+            illegal += 1
+            print("Game {}: illegal move at ply {}: {}".format(
+                  result.index + 1, result.illegal_ply, result.error))
+        elif not arguments.quiet:
+            print("Game {}: {} plies, {}".format(result.index + 1,
+                                                 result.plies, result.fen))
+    seconds = time.time() - started
+    print("{} games, {} illegal, {} plies in {:.1f} s, {:.0f} games/s".format(
+          games, illegal, plies, seconds, games / max(seconds, 1e-9)))
+    if illegal:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
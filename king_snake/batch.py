@@ -0,0 +1,149 @@
+"""
+Validating many games at once on a pool of processes.
+
+Games are read from PGN files or from move lists, which hold one game per
+line as coordinate moves, e.g. "e2e4 e7e5 g1f3", with the promoted figure's
+letter appended to promotions as in "e7e8n". Lines starting with "#" are
+skipped.
+
+validate_games hands the games to worker processes in chunks. Each worker
+keeps one chessboard, which it resets between games instead of building a
+new one. Only a fixed number of chunks are under way at any time, so memory
+stays bounded however many games are read, and the results are yielded in
+the order of the games.
+"""
+
+from collections import deque, namedtuple
+import multiprocessing
+
+from king_snake.errors import ChessError
+from king_snake.fen import to_fen
+from king_snake.pgn import new_board, open_pgn, parse_games, parse_san
+
+ValidationResult = namedtuple("ValidationResult",
+                              ("index", "headers", "legal", "plies",
+                               "illegal_ply", "error", "fen"))
+
+# Chessboard in the starting position kept by each worker process
+_chessboard = None
+_bitboards = False
+
+
+def read_move_lists(lines):
+    """Yield (headers, moves) for each game in an iterable of move lists."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        moves = []
+        for move in line.split():
+            move = move.upper()
+            if len(move) > 4:
+                moves.append((move[:2], move[2:4], move[4:]))
+            else:
+                moves.append((move[:2], move[2:4]))
+        yield {"Line": str(number)}, moves
+
+
+def read_files(file_names):
+    """
+    Yield (headers, moves) for each game in the given files.
+
+    Files whose name contains ".pgn" are read as PGN, possibly compressed,
+    and their moves are in SAN. All others are read as move lists.
+    """
+    for file_name in file_names:
+        with open_pgn(file_name) as lines:
+            if ".pgn" in file_name:
+                for headers, san, result in parse_games(lines):
+                    yield headers, san
+            else:
+                for game in read_move_lists(lines):
+                    yield game
+
+
+def validate_game(chessboard, moves):
+    """
+    Play moves on chessboard and return (legal, plies, illegal_ply, error).
+
+    moves are given in SAN or as tuples for Player.move. plies counts the
+    moves played. If a move cannot be read or is illegal, illegal_ply is its
+    number counted from 1 and error its message, otherwise both are None.
+    """
+    for ply, move in enumerate(moves, 1):
+        try:
+            if isinstance(move, tuple):
+                chessboard.current_player.move(*move)
+            else:
+                chessboard.current_player.move(*parse_san(chessboard, move))
+        except (ChessError, KeyError) as error:
+            return False, ply - 1, ply, str(error) or repr(error)
+    return True, len(moves), None, None
+
+
+def _start_worker(bitboards):
+    """Remember backend of the chessboards of this worker process."""
+    global _bitboards
+    _bitboards = bitboards
+
+
+def _validate_chunk(index, games):
+    """Validate games numbered from index and return their results."""
+    global _chessboard
+    results = []
+    for headers, moves in games:
+        if "FEN" in headers:
+            chessboard = new_board(headers, _bitboards)
+        else:
+            if not _chessboard:
+                _chessboard = new_board(bitboards=_bitboards)
+            chessboard = _chessboard
+            chessboard.reset()
+        legal, plies, illegal_ply, error = validate_game(chessboard, moves)
+        results.append(ValidationResult(index, headers, legal, plies,
+                                        illegal_ply, error,
+                                        to_fen(chessboard)))
+        index += 1
+    return results
+
+
+def _chunks(games, chunk_size):
+    """Yield lists of up to chunk_size games."""
+    chunk = []
+    for game in games:
+        chunk.append(game)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_games(games, processes=None, chunk_size=50, bitboards=True):
+    """
+    Validate games on a pool of processes and yield a ValidationResult each.
+
+    games is an iterable of (headers, moves) pairs as yielded by read_files.
+    processes defaults to the number of CPUs. The results come in the order
+    of the games, each with the game's index counted from 0, and fen is the
+    position reached when the game ended or stopped at an illegal move.
+    """
+    processes = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes, _start_worker, (bitboards,))
+    pending = deque()
+    try:
+        index = 0
+        for chunk in _chunks(games, chunk_size):
+            pending.append(pool.apply_async(_validate_chunk, (index, chunk)))
+            index += len(chunk)
+            # Keep every process busy while the oldest chunk is collected
+            if len(pending) > 2 * processes:
+                for result in pending.popleft().get():
+                    yield result
+        while pending:
+            for result in pending.popleft().get():
+                yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
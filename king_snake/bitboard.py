@@ -0,0 +1,208 @@
+"""
+Bitboard representation of a chessboard.
+
+A bitboard is an integer with one bit per field. Field A1 is bit 0, B1 is bit
+1 and so on up to H8, which is bit 63, matching Field.index. The attack tables
+only depend on the board's geometry and are computed once when the module is
+imported.
+"""
+
+COLORS = ("white", "black")
+SYMBOLS = ("P", "N", "B", "R", "Q", "K")
+
+# Column and row offsets of the directions sliding figures move in
+ROOK_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_DIRECTIONS = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+KNIGHT_STEPS = ((1, 2), (2, 1), (2, -1), (1, -2),
+                (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+KING_STEPS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+
+def _index(column, row):
+    """Return field index for column and row counted from 0 or None."""
+    if 0 <= column < 8 and 0 <= row < 8:
+        return row * 8 + column
+
+
+def _step_table(steps):
+    """Return masks of fields reachable by any single step from each field."""
+    table = []
+    for index in range(64):
+        mask = 0
+        for columns, rows in steps:
+            target = _index(index % 8 + columns, index // 8 + rows)
+            if target is not None:
+                mask |= 1 << target
+        table.append(mask)
+    return tuple(table)
+
+
+def _ray_table(columns, rows):
+    """Return masks of all fields in a direction from each field."""
+    table = []
+    for index in range(64):
+        mask = 0
+        target = _index(index % 8 + columns, index // 8 + rows)
+        while target is not None:
+            mask |= 1 << target
+            target = _index(target % 8 + columns, target // 8 + rows)
+        table.append(mask)
+    return tuple(table)
+
+
+def _pawn_table(rows):
+    """Return masks of the fields a pawn moving in rows direction attacks."""
+    return _step_table(((1, rows), (-1, rows)))
+
+KNIGHT_ATTACKS = _step_table(KNIGHT_STEPS)
+KING_ATTACKS = _step_table(KING_STEPS)
+PAWN_ATTACKS = {"white": _pawn_table(1), "black": _pawn_table(-1)}
+
+# Rays whose field indices grow from the start field. The first blocker on
+# them is the lowest set bit, on the other rays it is the highest.
+POSITIVE_RAYS = tuple(_ray_table(columns, rows) for columns, rows in
+                      ((1, 0), (0, 1), (1, 1), (-1, 1)))
+NEGATIVE_RAYS = tuple(_ray_table(columns, rows) for columns, rows in
+                      ((-1, 0), (0, -1), (-1, -1), (1, -1)))
+ROOK_RAYS = ((POSITIVE_RAYS[0], POSITIVE_RAYS[1]),
+             (NEGATIVE_RAYS[0], NEGATIVE_RAYS[1]))
+BISHOP_RAYS = ((POSITIVE_RAYS[2], POSITIVE_RAYS[3]),
+               (NEGATIVE_RAYS[2], NEGATIVE_RAYS[3]))
+
+
+def lowest_index(mask):
+    """Return index of lowest set bit in a non-empty mask."""
+    return (mask & -mask).bit_length() - 1
+
+
+def indices(mask):
+    """Yield indices of all set bits in mask, lowest first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+def _sliding_attacks(rays, index, occupied):
+    """Return attacks along rays from index, stopping at the first blocker."""
+    positive_rays, negative_rays = rays
+    attacks = 0
+    for table in positive_rays:
+        ray = table[index]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for table in negative_rays:
+        ray = table[index]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= table[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(index, occupied):
+    """Return fields a rook on index attacks given occupied fields."""
+    return _sliding_attacks(ROOK_RAYS, index, occupied)
+
+
+def bishop_attacks(index, occupied):
+    """Return fields a bishop on index attacks given occupied fields."""
+    return _sliding_attacks(BISHOP_RAYS, index, occupied)
+
+
+def queen_attacks(index, occupied):
+    """Return fields a queen on index attacks given occupied fields."""
+    return (_sliding_attacks(ROOK_RAYS, index, occupied) |
+            _sliding_attacks(BISHOP_RAYS, index, occupied))
+
+
+class Bitboards(object):
+
+    """
+    Piece and occupancy bitboards for both colors.
+
+    pieces holds one bitboard for each combination of color and figure symbol,
+    occupied one bitboard per color with all of its figures.
+    """
+
+    __slots__ = ("pieces", "occupied")
+
+    def __repr__(self):
+        return "Bitboards()"
+
+    def __init__(self):
+        self.pieces = dict(((color, symbol), 0) for color in COLORS
+                           for symbol in SYMBOLS)
+        self.occupied = dict((color, 0) for color in COLORS)
+
+    @property
+    def occupancy(self):
+        """Return bitboard of all occupied fields."""
+        return self.occupied["white"] | self.occupied["black"]
+
+    def toggle(self, figure, index):
+        """Add figure on index if it is not there, otherwise remove it."""
+        bit = 1 << index
+        self.pieces[figure.color, figure.symbol] ^= bit
+        self.occupied[figure.color] ^= bit
+
+    def replace(self, index, old_figure, new_figure):
+        """Replace old_figure on index with new_figure, either may be None."""
+        if old_figure:
+            self.toggle(old_figure, index)
+        if new_figure:
+            self.toggle(new_figure, index)
+
+    def attacks_from(self, symbol, color, index):
+        """Return fields a figure of symbol and color attacks from index."""
+        if symbol == "P":
+            return PAWN_ATTACKS[color][index]
+        elif symbol == "N":
+            return KNIGHT_ATTACKS[index]
+        elif symbol == "K":
+            return KING_ATTACKS[index]
+        elif symbol == "B":
+            return bishop_attacks(index, self.occupancy)
+        elif symbol == "R":
+            return rook_attacks(index, self.occupancy)
+        return queen_attacks(index, self.occupancy)
+
+    def attackers_of(self, index, color):
+        """Return bitboard of figures of color that attack index."""
+        pieces = self.pieces
+        occupied = self.occupancy
+        other = "black" if color == "white" else "white"
+        straight = pieces[color, "R"] | pieces[color, "Q"]
+        diagonal = pieces[color, "B"] | pieces[color, "Q"]
+        # A pawn of color attacks index if a pawn of the other color on index
+        # would attack the pawn's field
+        return ((PAWN_ATTACKS[other][index] & pieces[color, "P"]) |
+                (KNIGHT_ATTACKS[index] & pieces[color, "N"]) |
+                (KING_ATTACKS[index] & pieces[color, "K"]) |
+                (rook_attacks(index, occupied) & straight) |
+                (bishop_attacks(index, occupied) & diagonal))
+
+    def is_attacked(self, index, color):
+        """Test if any figure of color attacks index."""
+        pieces = self.pieces
+        other = "black" if color == "white" else "white"
+        if (PAWN_ATTACKS[other][index] & pieces[color, "P"] or
+                KNIGHT_ATTACKS[index] & pieces[color, "N"] or
+                KING_ATTACKS[index] & pieces[color, "K"]):
+            return True
+        occupied = self.occupancy
+        straight = pieces[color, "R"] | pieces[color, "Q"]
+        if straight and rook_attacks(index, occupied) & straight:
+            return True
+        diagonal = pieces[color, "B"] | pieces[color, "Q"]
+        return bool(diagonal and bishop_attacks(index, occupied) & diagonal)
+
+    def attacked_by(self, color):
+        """Return bitboard of all fields attacked by figures of color."""
+        attacks = 0
+        for symbol in SYMBOLS:
+            for index in indices(self.pieces[color, symbol]):
+                attacks |= self.attacks_from(symbol, color, index)
+        return attacks
@@ -0,0 +1,207 @@
+"""
+An opening book of moves played in known positions, read from disk.
+
+The book file starts with MAGIC and then holds fixed size records sorted by
+position key and move. Each record counts the games in which the move was
+played in the position with the given Zobrist key, and how they ended:
+
+    key         8 bytes, the chessboard's position_key
+    move        2 bytes, see encode_move
+    games       4 bytes, games the move was played in
+    white_wins  4 bytes
+    draws       4 bytes
+    black_wins  4 bytes
+
+All numbers are big endian. OpeningBook maps the file into memory and finds
+a position's records by binary search, so only the pages touched by a lookup
+are read, however large the file is.
+
+build_book writes a book from game archives. Records are collected in memory
+up to a limit, then sorted and written to temporary runs, which are merged
+into the book at the end. Memory therefore stays bounded as well.
+"""
+
+from collections import namedtuple
+import heapq
+import itertools
+import mmap
+import struct
+import tempfile
+
+from king_snake.chessboard import FIELD_NAMES
+from king_snake.errors import ChessError
+from king_snake.moves import encode, to_coordinates
+from king_snake.pgn import new_board, parse_san
+
+MAGIC = b"KSBOOK\x00\x01"
+RECORD = struct.Struct(">QHIIII")
+
+BookEntry = namedtuple("BookEntry", ("move", "games", "white_wins", "draws",
+                                     "black_wins"))
+
+# Counted outcome of a game by its PGN result
+_RESULT_COUNTS = {"1-0": (1, 1, 0, 0), "1/2-1/2": (1, 0, 1, 0),
+                  "0-1": (1, 0, 0, 1), "*": (1, 0, 0, 0)}
+
+
+def encode_move(move):
+    """
+    Return move tuple as an integer below 2 ** 15.
+
+    This is the move encoded as in king_snake.moves with the promotion code
+    shifted down into the place of the flags. The flags depend on the
+    position and would not fit in a record's two bytes.
+    """
+    code = encode(FIELD_NAMES.index(move[0]), FIELD_NAMES.index(move[1]),
+                  promotion=move[2] if len(move) > 2 else None)
+    return code & 0xFFF | code >> 16 << 12
+
+
+def decode_move(code):
+    """Return move tuple encoded by encode_move."""
+    return to_coordinates(code & 0xFFF | code >> 12 << 16)
+
+
+class OpeningBook(object):
+
+    """A read-only opening book file, mapped into memory."""
+
+    def __repr__(self):
+        return "OpeningBook({!r})".format(self.file_name)
+
+    def __init__(self, file_name):
+        """Open book file and check its format."""
+        self.file_name = file_name
+        self._file = open(file_name, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("{} is empty.".format(file_name))
+        size = len(self._map) - len(MAGIC)
+        if self._map[:len(MAGIC)] != MAGIC or size % RECORD.size:
+            self.close()
+            raise ValueError("{} is not an opening book.".format(file_name))
+        self.records = size // RECORD.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def close(self):
+        """Release file and memory map."""
+        self._map.close()
+        self._file.close()
+
+    def _key(self, record):
+        """Return position key of record with given number."""
+        return struct.unpack_from(">Q", self._map,
+                                  len(MAGIC) + record * RECORD.size)[0]
+
+    def lookup_key(self, key):
+        """Return BookEntry list for position key, most played first."""
+        low, high = 0, self.records
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        offset = len(MAGIC) + low * RECORD.size
+        while low < self.records:
+            record = RECORD.unpack_from(self._map, offset)
+            if record[0] != key:
+                break
+            entries.append(BookEntry(decode_move(record[1]), *record[2:]))
+            low += 1
+            offset += RECORD.size
+        entries.sort(key=lambda entry: entry.games, reverse=True)
+        return entries
+
+    def lookup(self, chessboard):
+        """Return BookEntry list for chessboard's position."""
+        return self.lookup_key(chessboard.position_key)
+
+
+def _book_records(games, max_plies, bitboards):
+    """
+    Yield (key, move, counts) for each move in the first plies of games.
+
+    games is an iterable of (headers, san, result) as yielded by
+    pgn.parse_games. A game's moves are counted up to its first illegal move.
+    """
+    chessboard = new_board(bitboards=bitboards)
+    for headers, san, result in games:
+        if "FEN" in headers:
+            game_board = new_board(headers, bitboards)
+        else:
+            game_board = chessboard
+            game_board.reset()
+        counts = _RESULT_COUNTS.get(result, _RESULT_COUNTS["*"])
+        for text in san[:max_plies]:
+            key = game_board.position_key
+            try:
+                game_board.current_player.move(*parse_san(game_board, text))
+            except ChessError:
+                break
+            yield key, encode_move(game_board.move_history[-1]), counts
+
+
+def _write_run(records):
+    """Write sorted records to a temporary file and return it rewound."""
+    run = tempfile.TemporaryFile()
+    for (key, move), counts in sorted(records.items()):
+        run.write(RECORD.pack(key, move, *counts))
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    """Yield ((key, move), counts) for each record of a run."""
+    while True:
+        data = run.read(RECORD.size)
+        if not data:
+            return
+        record = RECORD.unpack(data)
+        yield record[:2], record[2:]
+
+
+def build_book(games, file_name, max_plies=30, buffer_records=10 ** 6,
+               bitboards=True):
+    """
+    Write opening book of games to file_name and return its record count.
+
+    games is an iterable of (headers, san, result) as yielded by
+    pgn.parse_games, of which the first max_plies moves are counted. At most
+    buffer_records records are held in memory before they are written to a
+    temporary run.
+    """
+    runs = []
+    records = dict()
+    for key, move, counts in _book_records(games, max_plies, bitboards):
+        stored = records.get((key, move))
+        if stored:
+            counts = tuple(a + b for a, b in zip(stored, counts))
+        records[key, move] = counts
+        if len(records) >= buffer_records:
+            runs.append(_write_run(records))
+            records = dict()
+    runs.append(_write_run(records))
+
+    written = 0
+    with open(file_name, "wb") as book:
+        book.write(MAGIC)
+        merged = heapq.merge(*[_read_run(run) for run in runs])
+        for (key, move), group in itertools.groupby(merged,
+                                                    lambda record: record[0]):
+            totals = [sum(column) for column in
+                      zip(*[counts for record, counts in group])]
+            book.write(RECORD.pack(key, move, *totals))
+            written += 1
+    for run in runs:
+        run.close()
+    return written
@@ -0,0 +1,82 @@
+"""
+A bounded cache of positions shared by chessboards and games.
+
+Many games pass through the same positions, most of all in their openings.
+PositionCache remembers for the most recently used positions their legal
+moves, whether the player to move is in check and, once asked for, a score.
+When the cache is full, the least recently used position is dropped. A
+chessboard with a position cache, see Chessboard.position_info, looks a
+position up there before working it out itself, so a position already seen
+in another game costs a dictionary lookup.
+
+Positions are identified by their Zobrist key, which covers the figures, the
+player to move, castling rights and the en passant field, everything the
+legal moves depend on. Scores are stored as the evaluation function returned
+them, so chessboards sharing a cache should evaluate positions alike.
+"""
+
+from collections import OrderedDict, namedtuple
+
+# Legal moves encoded as in king_snake.moves, whether the player to move is
+# in check and the position's score or None if it was not asked for
+PositionInfo = namedtuple("PositionInfo", ("moves", "in_check", "score"))
+CacheStats = namedtuple("CacheStats", ("hits", "misses", "evictions",
+                                       "positions", "capacity"))
+
+
+class PositionCache(object):
+
+    """Least recently used PositionInfo by position key."""
+
+    __slots__ = ("capacity", "hits", "misses", "evictions", "_entries")
+
+    def __repr__(self):
+        return "PositionCache({})".format(self.capacity)
+
+    def __init__(self, capacity=2 ** 16):
+        """Create empty cache holding up to capacity positions."""
+        if capacity < 1:
+            raise ValueError("A position cache needs room for a position.")
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Entries in the order they were last used, the oldest first
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        """Leave out the cached positions when pickling."""
+        return (self.capacity,)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def lookup(self, key):
+        """Return PositionInfo stored for key or None and count the lookup."""
+        info = self._entries.pop(key, None)
+        if info is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries[key] = info
+        return info
+
+    def store(self, key, info):
+        """Store PositionInfo for key, dropping the oldest if full."""
+        self._entries.pop(key, None)
+        self._entries[key] = info
+        if len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Forget all positions and reset the counters."""
+        self.__init__(self.capacity)
+
+    def stats(self):
+        """Return CacheStats of the lookups so far."""
+        return CacheStats(self.hits, self.misses, self.evictions,
+                          len(self._entries), self.capacity)
@@ -1,13 +1,109 @@
 # -*- coding: utf-8 -*-
 """A chess board and fields."""
 
+from collections import namedtuple
+import operator
+
+from king_snake.bitboard import Bitboards
+from king_snake.cache import PositionInfo
 from king_snake.errors import FieldOccupiedError
+from king_snake.evaluation import piece_square_score
+from king_snake.zobrist import piece_key, state_key
+
+# Directions a Field can be asked about, in the order of Field.neighbors
+DIRECTION_NAMES = ("to_right", "to_left", "above", "below",
+                   "above_right", "above_left", "below_right", "below_left")
+(TO_RIGHT, TO_LEFT, ABOVE, BELOW,
+ ABOVE_RIGHT, ABOVE_LEFT, BELOW_RIGHT, BELOW_LEFT) = range(8)
+DIRECTION_INDEX = dict((name, index) for index, name in
+                       enumerate(DIRECTION_NAMES))
+
+# Column and row offsets of each direction
+DIRECTIONS = {"to_right": (1, 0),
+              "to_left": (-1, 0),
+              "above": (0, 1),
+              "below": (0, -1),
+              "above_right": (1, 1),
+              "above_left": (-1, 1),
+              "below_right": (1, -1),
+              "below_left": (-1, -1)}
+
+FIELD_NAMES = tuple(letter + str(number) for number in range(1, 9)
+                    for letter in "ABCDEFGH")
+
+# Ways a game can end, see Chessboard.outcome
+(CHECKMATE, STALEMATE, INSUFFICIENT_MATERIAL, FIFTY_MOVES,
+ THREEFOLD_REPETITION) = ("checkmate", "stalemate", "insufficient material",
+                          "fifty moves", "threefold repetition")
+
+
+def _neighbor_names():
+    """
+    Map each field name to the names of its neighbors in all directions.
+
+    The neighbors are listed in the order of DIRECTION_NAMES. Neighbors that
+    would lie outside of the board are None. The table only depends on the
+    board's geometry, so it is computed once and shared by all chessboards.
+    """
+    table = dict()
+    for name in FIELD_NAMES:
+        letter, number = ord(name[0]), int(name[1])
+        neighbors = []
+        for direction in DIRECTION_NAMES:
+            columns, rows = DIRECTIONS[direction]
+            neighbor = chr(letter + columns) + str(number + rows)
+            if neighbor not in FIELD_NAMES:
+                neighbor = None
+            neighbors.append(neighbor)
+        table[name] = tuple(neighbors)
+    return table
+
+NEIGHBOR_NAMES = _neighbor_names()
+
+
+def _neighbor_getters():
+    """
+    Return a getter for each field index that picks the field's neighbors.
+
+    Applied to a chessboard's fields in index order followed by None, the
+    getter returns the field's neighbors in the order of DIRECTION_NAMES.
+    Like NEIGHBOR_NAMES, the getters are shared by all chessboards.
+    """
+    getters = []
+    for name in FIELD_NAMES:
+        indices = (FIELD_NAMES.index(neighbor) if neighbor else 64
+                   for neighbor in NEIGHBOR_NAMES[name])
+        getters.append(operator.itemgetter(*indices))
+    return tuple(getters)
+
+NEIGHBOR_GETTERS = _neighbor_getters()
+
+
+class Outcome(namedtuple("Outcome", ("termination", "winner"))):
+
+    """
+    How a game ended.
+
+    termination is one of CHECKMATE, STALEMATE, INSUFFICIENT_MATERIAL,
+    FIFTY_MOVES and THREEFOLD_REPETITION. winner is the color of the winning
+    player or None for a draw.
+    """
+
+    __slots__ = ()
+
+    @property
+    def result(self):
+        """Return result in PGN notation, e.g. "1-0"."""
+        return {"white": "1-0", "black": "0-1"}.get(self.winner, "1/2-1/2")
 
 
 class Field(object):
 
     """A field on a chessboard."""
 
+    __slots__ = ("name", "letter", "number", "index", "chessboard", "_figure",
+                 "neighbors", "attackers")
+
     def __repr__(self):
         return "Field({letter}, {number}, {board})".format(
                                            letter=chr(self.letter),
@@ -30,12 +126,32 @@ class Field(object):
         Store position on chessboard.
 
         Letter is given as a capital character and converted internally into an
-        integer.
+        integer. The field's index counts from 0 for A1 to 63 for H8 and is its
+        bit in bitboards.
         """
+        self.name = letter + str(number)
         self.letter = ord(letter)
         self.number = number
+        self.index = (number - 1) * 8 + self.letter - ord("A")
         self.chessboard = chessboard
-        self.figure = None
+        self._figure = None
+        # Neighboring fields by direction index, filled in by the chessboard
+        # once all fields exist
+        self.neighbors = ()
+        # Figures that attack this field, kept by the chessboard
+        self.attackers = set()
+
+    @property
+    def figure(self):
+        """Figure standing on the field or None."""
+        return self._figure
+
+    @figure.setter
+    def figure(self, figure):
+        """Place figure on field and tell the chessboard about the change."""
+        old_figure = self._figure
+        self._figure = figure
+        self.chessboard.field_changed(self, old_figure)
 
     def receive_figure(self, figure):
         """
@@ -55,59 +171,119 @@ class Field(object):
 
     def to_right(self):
         """Return field to right of self or None if there is none."""
-        position = chr(self.letter + 1) + str(self.number)
-        return self.chessboard.fields.get(position)
+        return self.neighbors[TO_RIGHT]
 
     def to_left(self):
         """Return field to left of self or None if there is none."""
-        position = chr(self.letter - 1) + str(self.number)
-        return self.chessboard.fields.get(position)
+        return self.neighbors[TO_LEFT]
 
     def above(self):
         """Return field above self or None if there is none."""
-        position = chr(self.letter) + str(self.number + 1)
-        return self.chessboard.fields.get(position)
+        return self.neighbors[ABOVE]
 
     def below(self):
         """Return field below self or None if there is none."""
-        position = chr(self.letter) + str(self.number - 1)
-        return self.chessboard.fields.get(position)
+        return self.neighbors[BELOW]
 
     def above_right(self):
         """Return field above self and to right or None if there is none."""
-        above = self.above()
-        if above:
-            return above.to_right()
+        return self.neighbors[ABOVE_RIGHT]
 
     def above_left(self):
         """Return field above self and to left or None if there is none."""
-        above = self.above()
-        if above:
-            return above.to_left()
+        return self.neighbors[ABOVE_LEFT]
 
     def below_right(self):
         """Return field below self and to right or None if there is none."""
-        below = self.below()
-        if below:
-            return below.to_right()
+        return self.neighbors[BELOW_RIGHT]
 
     def below_left(self):
         """Return field below self and to left or None if there is none."""
-        below = self.below()
-        if below:
-            return below.to_left()
+        return self.neighbors[BELOW_LEFT]
 
     def threatened_by(self, player):
-        """Field is in legal moves of given player."""
-        for figure in player.figures:
-            if figure.position and self in figure.legal_moves:
+        """
+        Field is attacked by any figure of given player.
+
+        The answer is read from the chessboard's attack maps, which only need
+        to be refreshed for fields that changed since they were last read, or
+        from its bitboards if it has them.
+        """
+        bitboards = self.chessboard.bitboards
+        if bitboards:
+            return bitboards.is_attacked(self.index, player.color)
+        self.chessboard.update_attacks()
+        color = player.color
+        for figure in self.attackers:
+            if figure.color == color:
                 return True
+        return False
+
+
+class UndoRecord(object):
+
+    """
+    State that a single move may change, recorded before the move is made.
+
+    Only the fields a figure's move can touch are recorded, together with the
+    figures on them, so both recording and restoring take constant time
+    regardless of how long the game has been going on. Promoting a pawn swaps
+    it for a queen in its player's figures, so the moved figure's slot in that
+    list is recorded as well.
+    """
+
+    __slots__ = ("chessboard", "current_move", "current_player",
+                 "history_length", "en_passant_field", "halfmove_clock",
+                 "state_key", "generation", "fields", "figures", "figure",
+                 "figure_index")
+
+    def __init__(self, chessboard, figure, field):
+        self.chessboard = chessboard
+        self.current_move = chessboard.current_move
+        self.current_player = chessboard.current_player
+        self.history_length = len(chessboard.move_history)
+        self.en_passant_field = chessboard.en_passant_field
+        self.halfmove_clock = chessboard.halfmove_clock
+        self.state_key = chessboard._state_key
+        self.generation = chessboard.generation
+        self.fields = tuple((affected, affected.figure) for affected in
+                            figure.affected_fields(field) if affected)
+        self.figures = tuple((occupant, occupant.get_state()) for
+                             affected, occupant in self.fields if occupant)
+        self.figure = figure
+        self.figure_index = figure.player.figures.index(figure)
+
+    def restore(self):
+        """Put board, figures and turn back to the recorded state."""
+        for figure, state in self.figures:
+            figure.set_state(state)
+        for field, figure in self.fields:
+            field.figure = figure
+        self.figure.player.figures[self.figure_index] = self.figure
+        chessboard = self.chessboard
+        chessboard.current_move = self.current_move
+        chessboard.current_player = self.current_player
+        chessboard.en_passant_field = self.en_passant_field
+        chessboard.halfmove_clock = self.halfmove_clock
+        chessboard._state_key = self.state_key
+        # The position is the same as in the recorded generation again, so
+        # moves cached in it are valid once more
+        chessboard.generation = self.generation
+        del chessboard.move_history[self.history_length:]
+        del chessboard.position_keys[self.history_length + 1:]
 
 
 class Chessboard(object):
 
     """A chessboard."""
 
+    __slots__ = ("_changed_fields", "_piece_key", "_state_key", "_score",
+                 "bitboards", "generation", "_last_generation", "fields",
+                 "ordered_fields", "move_history", "position_keys",
+                 "undo_stack", "current_move", "en_passant_field",
+                 "halfmove_clock", "initial_fen", "players", "current_player",
+                 "position_cache", "_recorder")
+
     def __str__(self):
         """Print border with coordinates and all fields in order."""
         string = ""
@@ -130,7 +306,8 @@ class Chessboard(object):
         string += "  {}".format(column_string)
         return string
 
-    def __init__(self, players=None, move_history=None):
+    def __init__(self, players=None, move_history=None, bitboards=False,
+                 position_cache=None):
         """
         Initialize fields and set current move to 1.
 
@@ -138,27 +315,258 @@ class Chessboard(object):
         provided as a dictionary: {"white": Player, "black": Player}
 
         If a move history is supplied, apply that move history.
-        """
-        self.fields = dict()
-        for letter in "ABCDEFGH":
-            for number in range(1, 9):
-                self.fields[letter + str(number)] = Field(letter, number, self)
 
-        if players:
-            self.add_players(players["white"], players["black"])
-        else:
-            self.players = dict()
-            self.current_player = None
+        If bitboards is True, the chessboard keeps Bitboards of all figures
+        next to its fields and answers attack queries from them instead of
+        from the attack maps. The fields and figures stay available either
+        way.
+
+        position_cache is a king_snake.cache.PositionCache, possibly shared
+        with other chessboards, that position_info consults.
 
+        Every attempted move pushes an UndoRecord onto the undo stack, which
+        rollback pops again.
+
+        Fields report changes of their figures to the chessboard, which keeps
+        a list of them until the attack maps are next brought up to date. The
+        Zobrist key of the figures' positions and their score, see
+        king_snake.evaluation, are updated with every change as well, the key
+        of the remaining position state at the end of a turn.
+        """
+        self._create_fields(bitboards)
         self.move_history = []
+        # Keys of the position before each move and of the current position
+        self.position_keys = []
+        self.undo_stack = []
         self.current_move = 1
+        # Field a pawn jumped over in the last move if it can be taken there
+        self.en_passant_field = None
+        # Moves since the last capture or pawn move, counted in plies
+        self.halfmove_clock = 0
+        # FEN of the position the move history starts from, None for the
+        # standard starting position
+        self.initial_fen = None
+        self.players = dict()
+        self.current_player = None
+        self.position_cache = position_cache
+        # Recorder of instrumented calls, see stats
+        self._recorder = None
+        if players:
+            self.add_players(players["white"], players["black"])
+
         if move_history:
-            for start_field, goal_field in move_history:
-                self.current_player.move(start_field, goal_field)
+            for move in move_history:
+                self.current_player.move(*move)
+
+    def _create_fields(self, bitboards):
+        """Create empty fields and the structures that track their figures."""
+        self._changed_fields = []
+        self._piece_key = 0
+        self._state_key = 0
+        self._score = 0
+        # Number of the current position, see Figure.legal_moves. Each change
+        # creates a new number, rollback returns to the recorded one.
+        self.generation = 0
+        self._last_generation = 0
+        self.bitboards = Bitboards() if bitboards else None
+        self.fields = dict()
+        for name in FIELD_NAMES:
+            self.fields[name] = Field(name[0], int(name[1]), self)
+        # Fields in order of their index
+        self.ordered_fields = tuple(self.fields[name] for name in FIELD_NAMES)
+        self._link_fields()
+
+    def _link_fields(self):
+        """Give each field direct references to its neighboring fields."""
+        fields = self.ordered_fields + (None,)
+        for field, get_neighbors in zip(self.ordered_fields, NEIGHBOR_GETTERS):
+            field.neighbors = get_neighbors(fields)
+
+    def copy(self):
+        """
+        Return an independent copy of the chessboard.
+
+        Players and figures are copied, keeping their classes and settings,
+        and placed on new fields. The time needed depends on the number of
+        figures, not on the length of the game, because the game is not
+        replayed. The move history is copied as well, but the undo stack
+        starts out empty, so the copy cannot be rolled back beyond the
+        position it was copied in. The copy shares the position cache.
+        """
+        chessboard = Chessboard.__new__(Chessboard)
+        chessboard._create_fields(self.bitboards is not None)
+        chessboard.move_history = list(self.move_history)
+        chessboard.position_keys = list(self.position_keys)
+        chessboard.undo_stack = []
+        chessboard.current_move = self.current_move
+        chessboard.en_passant_field = None
+        if self.en_passant_field:
+            chessboard.en_passant_field = chessboard.fields[
+                                                   self.en_passant_field.name]
+        chessboard.halfmove_clock = self.halfmove_clock
+        chessboard.initial_fen = self.initial_fen
+        chessboard.players = dict()
+        for color, player in self.players.items():
+            chessboard.players[color] = player.copy(chessboard)
+        chessboard.current_player = None
+        if self.current_player:
+            chessboard.current_player = chessboard.players[
+                                                    self.current_player.color]
+        chessboard._state_key = self._state_key
+        chessboard.position_cache = self.position_cache
+        chessboard._recorder = None
+        return chessboard
+
+    def stats(self):
+        """
+        Return Timing of the instrumented calls of the chessboard by name.
+
+        Calls are only recorded while the chessboard is instrumented, see
+        king_snake.instrumentation, otherwise the dictionary is empty.
+        """
+        if self._recorder is None:
+            return dict()
+        return self._recorder.timings()
+
+    @property
+    def position_key(self):
+        """Return 64 bit Zobrist key of current position."""
+        return self._piece_key ^ self._state_key
+
+    @property
+    def score(self):
+        """Return static evaluation in centipawns from white's view."""
+        return self._score
+
+    @property
+    def castling_rights(self):
+        """
+        Return castling rights in FEN notation, e.g. "KQkq".
+
+        A player keeps the right to castle to a side as long as neither the
+        king nor that side's rook have moved, even if castling is not possible
+        at the moment.
+        """
+        rights = ""
+        for color, row, king_side, queen_side in (("white", "1", "K", "Q"),
+                                                  ("black", "8", "k", "q")):
+            player = self.players.get(color)
+            king = player and player.king
+            if (not king or king.already_moved or not king.position or
+                    king.position.name != "E" + row):
+                continue
+            for letter, right in (("H", king_side), ("A", queen_side)):
+                rook = self.fields[letter + row].figure
+                if (rook and rook.symbol == "R" and rook.color == color and
+                        not rook.already_moved):
+                    rights += right
+        return rights
+
+    def _update_state_key(self):
+        """Recompute Zobrist key of side to move, castling and en passant."""
+        self._state_key = state_key(self.current_player.color,
+                                    self.castling_rights,
+                                    self.en_passant_field)
+
+    def generate_moves(self):
+        """
+        Yield all encoded legal moves of the current player, see Player.
+
+        With a position cache, the moves are taken from position_info.
+        """
+        if self.position_cache is not None:
+            return iter(self.position_info().moves)
+        return self.current_player.generate_moves()
+
+    def position_info(self, evaluation=None):
+        """
+        Return PositionInfo of the current position.
+
+        If the chessboard has a position cache, the position is looked up
+        there and, if missing, stored after working it out. If evaluation is
+        given, score is its result for the chessboard, which is only computed
+        if the cache has no score yet. Otherwise score may be None.
+        """
+        cache = self.position_cache
+        key = self.position_key
+        info = None if cache is None else cache.lookup(key)
+        stored = info is not None
+        if info is None:
+            player = self.current_player
+            info = PositionInfo(tuple(player.generate_moves()),
+                                player.king.in_check, None)
+        if evaluation and info.score is None:
+            info = info._replace(score=evaluation(self))
+            stored = False
+        if cache is not None and not stored:
+            cache.store(key, info)
+        return info
+
+    def generate_legal_moves(self):
+        """Yield all legal moves of the current player, see Player."""
+        return self.current_player.generate_legal_moves()
+
+    def field_changed(self, field, old_figure):
+        """Remember that field's figure was replaced, previously old_figure."""
+        self._last_generation += 1
+        self.generation = self._last_generation
+        if old_figure:
+            self._piece_key ^= piece_key(old_figure, field)
+            self._score -= piece_square_score(old_figure, field)
+        if field.figure:
+            self._piece_key ^= piece_key(field.figure, field)
+            self._score += piece_square_score(field.figure, field)
+        if self.bitboards:
+            self.bitboards.replace(field.index, old_figure, field.figure)
+        else:
+            self._changed_fields.append((field, old_figure))
+
+    def update_attacks(self):
+        """
+        Bring the attack maps up to date with all changed fields.
+
+        Only figures that were placed on or removed from a changed field, or
+        that attacked a changed field, can attack different fields now. Those
+        figures recompute their attacks, all others stay as they are.
+        """
+        if not self._changed_fields:
+            return
+        figures = set()
+        for field, old_figure in self._changed_fields:
+            if old_figure:
+                figures.add(old_figure)
+            if field.figure:
+                figures.add(field.figure)
+            figures.update(field.attackers)
+        self._changed_fields = []
+        for figure in figures:
+            figure.update_attacks()
+
+    def push_undo(self, figure, field):
+        """Record the state that moving figure to field may change."""
+        self.undo_stack.append(UndoRecord(self, figure, field))
 
     def rollback(self):
-        """Rollback to previous state"""
-        self.__init__(self.players, self.move_history[:-1])
+        """
+        Rollback to previous state.
+
+        The last recorded move is undone in place. If nothing has been
+        recorded, the board is left as it is.
+        """
+        if self.undo_stack:
+            self.undo_stack.pop().restore()
+
+    def reset(self):
+        """
+        Roll back all recorded moves.
+
+        The chessboard returns to the position it was set up in, reusing its
+        fields, players and figures, which is cheaper than building a new
+        chessboard for the next game. A copy returns to the position it was
+        copied in.
+        """
+        while self.undo_stack:
+            self.undo_stack.pop().restore()
 
     def add_players(self, white, black):
         """Add players to the game, assign colors and set up board."""
@@ -167,16 +575,107 @@ class Chessboard(object):
             self.players[color].color = color
             player.set_up_board(self)
             self.current_player = self.players["white"]
+        self._update_state_key()
+        self.position_keys = [self.position_key]
 
-    def end_turn(self, start_field, goal_field):
+    def end_turn(self, start_field, goal_field, irreversible=False,
+                 promotion=None):
         """
         End turn for current player and increment current_move.
 
-        The move history is used for rollback capabilities
+        The move history is used for rollback capabilities. Its moves are
+        (start_field, goal_field) tuples, extended by the symbol of the figure
+        a pawn was promoted to if one was. The halfmove clock is reset if the
+        move was irreversible, i.e. a capture or a pawn move, and counts up
+        otherwise. If a pawn jumped two fields and an opponent's pawn stands
+        next to it, the field it jumped over is remembered for en passant.
+        Finally the Zobrist key of the position state is updated.
         """
         self.current_move += 1
-        self.move_history.append((start_field, goal_field))
+        self._last_generation += 1
+        self.generation = self._last_generation
+        if promotion:
+            self.move_history.append((start_field, goal_field, promotion))
+        else:
+            self.move_history.append((start_field, goal_field))
+        if irreversible:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
         if self.current_player == self.players["white"]:
             self.current_player = self.players["black"]
         else:
             self.current_player = self.players["white"]
+
+        self.en_passant_field = None
+        start, goal = self.fields[start_field], self.fields[goal_field]
+        figure = goal.figure
+        if figure.symbol == "P" and abs(goal.number - start.number) == 2:
+            if goal.number > start.number:
+                jumped = start.above()
+            else:
+                jumped = start.below()
+            for neighbor in goal.to_left(), goal.to_right():
+                if (neighbor and neighbor.figure and
+                        neighbor.figure.symbol == "P" and
+                        neighbor.figure.color != figure.color):
+                    self.en_passant_field = jumped
+        self._update_state_key()
+        self.position_keys.append(self.position_key)
+
+    def repetitions(self):
+        """
+        Return how often the current position occurred before.
+
+        Only positions since the last capture or pawn move are compared, as
+        no earlier position can come back.
+        """
+        keys = self.position_keys[-1 - self.halfmove_clock:-1]
+        return keys.count(self.position_key)
+
+    def insufficient_material(self):
+        """
+        Test if neither player can possibly checkmate.
+
+        This is the case if besides the kings there is at most one bishop or
+        knight left on the board.
+        """
+        minor_figures = 0
+        for player in self.players.values():
+            for figure in player.figures:
+                if not figure.on_board or figure.symbol == "K":
+                    continue
+                if figure.symbol in "PRQ":
+                    return False
+                minor_figures += 1
+        return minor_figures <= 1
+
+    def outcome(self):
+        """
+        Return Outcome of the game if it has ended, otherwise None.
+
+        Checking for mate or stalemate stops at the first legal move found,
+        and repetitions are counted from the position keys, so the test is
+        cheap enough to run after every move. A position repeated three times
+        or fifty moves by each player without capture or pawn move end the
+        game in a draw, as if a player had claimed it. With a position cache,
+        the legal moves are taken from position_info instead.
+        """
+        player = self.current_player
+        if self.position_cache is not None:
+            info = self.position_info()
+            stuck, in_check = not info.moves, info.in_check
+        else:
+            stuck = not player.has_legal_move()
+            in_check = stuck and player.king.in_check
+        if stuck:
+            if in_check:
+                return Outcome(CHECKMATE, player.opponent.color)
+            return Outcome(STALEMATE, None)
+        if self.insufficient_material():
+            return Outcome(INSUFFICIENT_MATERIAL, None)
+        if self.halfmove_clock >= 100:
+            return Outcome(FIFTY_MOVES, None)
+        if self.repetitions() >= 2:
+            return Outcome(THREEFOLD_REPETITION, None)
+        return None
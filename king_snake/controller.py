@@ -0,0 +1,120 @@
+"""
+Running a game from moves given as text.
+
+GameController holds a game and carries out moves and commands one at a
+time, returning what happened instead of reading input or printing, so the
+same game can be driven from a terminal, a script or a test. Nothing calls
+back into the caller, so a game can go on for any number of moves.
+
+Moves are given in coordinates, with or without a space between the fields
+and with the promoted figure's letter at the end if a pawn is promoted, e.g.
+"E2 E4", "e2e4" or "e7e8n".
+"""
+
+import pickle
+
+from king_snake.chessboard import Chessboard
+from king_snake.engine import EnginePlayer
+from king_snake.errors import NotationError
+from king_snake.fen import from_fen
+from king_snake.parallel import ParallelEngine
+from king_snake.player import Player
+
+
+def parse_move(text):
+    """
+    Return move given in coordinates as a tuple for Player.move.
+
+    Raise NotationError if text is not a move.
+    """
+    text = "".join(text.upper().split())
+    if len(text) not in (4, 5):
+        raise NotationError("Not a move: {}".format(text))
+    move = text[:2], text[2:4]
+    if len(text) == 5:
+        move += (text[4],)
+    return move
+
+
+class GameController(object):
+
+    """A game of two players, one of which may be an engine."""
+
+    def __repr__(self):
+        return "GameController({!r}, {!r})".format(self.engine_color,
+                                                   self.fen)
+
+    def __init__(self, engine_color=None, engine_seconds=5.0, fen=None,
+                 bitboards=False, engine_processes=1):
+        """
+        Set up a new game.
+
+        If engine_color is "white" or "black", that side is played by the
+        engine, which thinks for engine_seconds per move with
+        engine_processes processes. If fen is given, the game starts from
+        that position.
+        """
+        self.engine_color = engine_color
+        self.engine_seconds = engine_seconds
+        self.engine_processes = engine_processes
+        self.fen = fen
+        self.bitboards = bitboards
+        self.chessboard = None
+        self.new_game()
+
+    def new_game(self):
+        """Start the game over."""
+        players = {"white": Player(), "black": Player()}
+        if self.engine_color:
+            engine = None
+            if self.engine_processes > 1:
+                engine = ParallelEngine(self.engine_processes)
+            players[self.engine_color] = EnginePlayer(
+                                         engine, seconds=self.engine_seconds)
+        if self.fen:
+            self.chessboard = from_fen(self.fen, players, self.bitboards)
+        else:
+            self.chessboard = Chessboard(players, bitboards=self.bitboards)
+
+    @property
+    def current_player(self):
+        """Return player whose turn it is."""
+        return self.chessboard.current_player
+
+    @property
+    def engine_to_move(self):
+        """Test if the engine is to move in a game that is not over."""
+        return (isinstance(self.current_player, EnginePlayer) and
+                not self.chessboard.outcome())
+
+    def move(self, text):
+        """
+        Make the current player's move given as text and return it.
+
+        The move is returned as recorded in the move history. Raise
+        NotationError if text is not a move, KeyError for unknown fields and
+        ChessError if the move is illegal.
+        """
+        self.current_player.move(*parse_move(text))
+        return self.chessboard.move_history[-1]
+
+    def engine_move(self):
+        """Make the engine's move and return it, None if it has none."""
+        result = self.current_player.play()
+        return result and result.move
+
+    def undo(self):
+        """Take back the last move, and the engine's before it if any."""
+        self.chessboard.rollback()
+        if isinstance(self.current_player, EnginePlayer):
+            self.chessboard.rollback()
+
+    def save(self, file_name):
+        """Save game to file."""
+        with open(file_name, "wb") as saved_game:
+            pickle.dump(self.chessboard, saved_game, pickle.HIGHEST_PROTOCOL)
+
+    def load(self, file_name):
+        """Load game from file."""
+        with open(file_name, "rb") as saved_game:
+            self.chessboard = pickle.load(saved_game)
@@ -0,0 +1,359 @@
+"""
+A chess engine for KingSnake.
+
+The engine searches a Chessboard with iterative deepening alpha-beta and a
+quiescence search over captures. Positions are remembered in a fixed size
+transposition table indexed by their Zobrist key. Moves are tried in the
+order: best move from the table, captures by most valuable victim and least
+valuable attacker, killer moves, then quiet moves by their history score.
+
+Searches can be limited by depth, time and node count. EnginePlayer is a
+Player whose moves are chosen by an Engine.
+"""
+
+from collections import namedtuple
+import time
+
+from king_snake.evaluation import PIECE_VALUES, evaluate
+from king_snake.moves import (CAPTURE, EN_PASSANT, goal_index, move_flags,
+                              start_index, to_coordinates)
+from king_snake.player import Player
+
+INFINITY = 1000000
+MATE = 100000
+# Scores beyond this are mates, counted in plies from the root
+MATE_THRESHOLD = MATE - 1000
+
+# Kinds of scores stored in the transposition table
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+SearchResult = namedtuple("SearchResult", ("move", "score", "depth", "nodes",
+                                           "seconds", "principal_variation"))
+
+
+class _BudgetExhausted(Exception):
+    """The search has used up its time or nodes."""
+
+
+def captured_figure(chessboard, move):
+    """Return figure the encoded move would capture or None."""
+    flags = move_flags(move)
+    if flags & CAPTURE:
+        return chessboard.ordered_fields[goal_index(move)].figure
+    if flags & EN_PASSANT:
+        # The captured pawn stands next to the moving pawn, in the goal's
+        # column and the start's row
+        start, goal = start_index(move), goal_index(move)
+        return chessboard.ordered_fields[start - start % 8 + goal % 8].figure
+
+
+class TranspositionTable(object):
+
+    """
+    Fixed size table of search results indexed by position key.
+
+    Each position key maps to one slot. A slot is replaced if it holds the
+    same position, an entry from an earlier search, or an entry searched to
+    the same or a lower depth, so deep results of the current search survive.
+    """
+
+    def __repr__(self):
+        return "TranspositionTable({})".format(len(self.keys))
+
+    def __init__(self, size=2 ** 16):
+        """Create table with size slots, rounded up to a power of two."""
+        slots = 1
+        while slots < size:
+            slots *= 2
+        self.mask = slots - 1
+        self.keys = [None] * slots
+        self.entries = [None] * slots
+        self.generation = 0
+
+    def new_search(self):
+        """Mark all stored entries as coming from an earlier search."""
+        self.generation += 1
+
+    def probe(self, key):
+        """Return (depth, score, kind, move) stored for key or None."""
+        slot = key & self.mask
+        if self.keys[slot] == key:
+            return self.entries[slot][:4]
+
+    def store(self, key, depth, score, kind, move):
+        """Store search result for key if the replacement policy allows."""
+        slot = key & self.mask
+        entry = self.entries[slot]
+        if (entry is None or self.keys[slot] == key or
+                entry[4] != self.generation or depth >= entry[0]):
+            self.keys[slot] = key
+            self.entries[slot] = (depth, score, kind, move, self.generation)
+
+
+class Engine(object):
+
+    """Iterative deepening alpha-beta search over a chessboard."""
+
+    # Class of the transposition table, created with the table size
+    table_class = TranspositionTable
+
+    def __repr__(self):
+        return "Engine()"
+
+    def __init__(self, table_size=2 ** 16, evaluation=evaluate):
+        """
+        Create engine with a transposition table of table_size slots.
+
+        evaluation is called with the chessboard and returns its score in
+        centipawns for the player to move.
+        """
+        self.table = self.table_class(table_size)
+        self.evaluation = evaluation
+        self.nodes = 0
+        self.killers = dict()
+        self.history = dict()
+        self._deadline = None
+        self._node_limit = None
+        self._can_stop = False
+        self._root_move = None
+
+    def __getstate__(self):
+        """Leave out the table and move ordering data when pickling."""
+        return len(self.table.keys), self.evaluation
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def search(self, chessboard, depth=None, seconds=None, nodes=None):
+        """
+        Search chessboard for the best move of its current player.
+
+        The search is deepened one ply at a time up to depth, or until the
+        given seconds or nodes are used up, and returns a SearchResult from
+        the deepest completed iteration. The first ply is always completed.
+        Without any limit, four plies are searched. The move and principal
+        variation are given as tuples for Player.move. If the player has no
+        legal moves, the result's move is None. The chessboard is left
+        unchanged.
+        """
+        if depth is None:
+            depth = 4 if seconds is None and nodes is None else 100
+        started = time.time()
+        self._deadline = started + seconds if seconds is not None else None
+        self._node_limit = nodes
+        self.nodes = 0
+        self.killers = dict()
+        self.history = dict()
+        self.table.new_search()
+        undo_depth = len(chessboard.undo_stack)
+
+        result = SearchResult(None, 0, 0, 0, 0.0, [])
+        for iteration in self._iterations(depth):
+            self._can_stop = iteration > 1
+            self._root_move = None
+            try:
+                score = self._negamax(chessboard, iteration, -INFINITY,
+                                      INFINITY, 0)
+            except _BudgetExhausted:
+                while len(chessboard.undo_stack) > undo_depth:
+                    chessboard.rollback()
+                break
+            result = SearchResult(self._root_move and
+                                  to_coordinates(self._root_move), score,
+                                  iteration, self.nodes,
+                                  time.time() - started,
+                                  self.principal_variation(chessboard,
+                                                           iteration))
+            if not self._root_move or abs(score) >= MATE_THRESHOLD:
+                break
+        return result._replace(nodes=self.nodes,
+                               seconds=time.time() - started)
+
+    def _iterations(self, depth):
+        """Return the depths of the iterations of a search up to depth."""
+        return range(1, depth + 1)
+
+    def principal_variation(self, chessboard, depth):
+        """
+        Return expected line of play as read from the table.
+
+        The moves are given as tuples for Player.move.
+        """
+        line = []
+        for ply in range(depth):
+            entry = self.table.probe(chessboard.position_key)
+            if not entry or not entry[3]:
+                break
+            move = entry[3]
+            if move not in list(chessboard.generate_moves()):
+                break
+            chessboard.current_player.make_move(move)
+            line.append(to_coordinates(move))
+        for move in line:
+            chessboard.rollback()
+        return line
+
+    def _count_node(self):
+        """Count visited node and stop search if budget is used up."""
+        self.nodes += 1
+        if self._can_stop and not self.nodes % 1024:
+            if self._node_limit and self.nodes >= self._node_limit:
+                raise _BudgetExhausted()
+            if self._deadline and time.time() >= self._deadline:
+                raise _BudgetExhausted()
+
+    def _order(self, chessboard, moves, table_move, ply):
+        """Return moves sorted by how promising they are."""
+        killers = self.killers.get(ply, ())
+        history = self.history
+        fields = chessboard.ordered_fields
+
+        def priority(move):
+            """Return sort key of move, higher is tried first."""
+            if move == table_move:
+                return 3 * INFINITY
+            victim = captured_figure(chessboard, move)
+            if victim:
+                attacker = fields[start_index(move)].figure
+                return (2 * INFINITY + 10 * PIECE_VALUES[victim.symbol] -
+                        PIECE_VALUES[attacker.symbol])
+            if move in killers:
+                return INFINITY
+            return history.get(move, 0)
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def _remember_cutoff(self, move, depth, ply):
+        """Record quiet move that caused a beta cutoff."""
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def _negamax(self, chessboard, depth, alpha, beta, ply):
+        """Return score of position for the player to move."""
+        self._count_node()
+        if ply and (chessboard.halfmove_clock >= 100 or
+                    chessboard.repetitions()):
+            # A repeated position can be repeated again, so it is a draw
+            return 0
+        key = chessboard.position_key
+        entry = self.table.probe(key)
+        table_move = None
+        if entry:
+            entry_depth, score, kind, table_move = entry
+            score = _score_from_table(score, ply)
+            if ply and entry_depth >= depth:
+                if kind == EXACT:
+                    return score
+                if kind == LOWER_BOUND and score >= beta:
+                    return score
+                if kind == UPPER_BOUND and score <= alpha:
+                    return score
+        if depth <= 0:
+            return self._quiescence(chessboard, alpha, beta, ply)
+
+        moves = list(chessboard.generate_moves())
+        if not moves:
+            if chessboard.current_player.king.in_check:
+                return -MATE + ply
+            return 0
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, None
+        for move in self._order(chessboard, moves, table_move, ply):
+            capture = captured_figure(chessboard, move)
+            chessboard.current_player.make_move(move)
+            score = -self._negamax(chessboard, depth - 1, -beta, -alpha,
+                                   ply + 1)
+            chessboard.rollback()
+            if score > best_score:
+                best_score, best_move = score, move
+                if ply == 0:
+                    self._root_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not capture:
+                    self._remember_cutoff(move, depth, ply)
+                break
+
+        if best_score <= original_alpha:
+            kind = UPPER_BOUND
+        elif best_score >= beta:
+            kind = LOWER_BOUND
+        else:
+            kind = EXACT
+        self.table.store(key, depth, _score_to_table(best_score, ply), kind,
+                         best_move)
+        return best_score
+
+    def _quiescence(self, chessboard, alpha, beta, ply):
+        """Return score after resolving all captures."""
+        standing = self.evaluation(chessboard)
+        if standing >= beta:
+            return standing
+        if standing > alpha:
+            alpha = standing
+        captures = [move for move in chessboard.generate_moves()
+                    if move_flags(move) & (CAPTURE | EN_PASSANT)]
+        for move in self._order(chessboard, captures, None, ply):
+            self._count_node()
+            chessboard.current_player.make_move(move)
+            score = -self._quiescence(chessboard, -beta, -alpha, ply + 1)
+            chessboard.rollback()
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def _score_to_table(score, ply):
+    """Make mate scores relative to the stored position."""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score, ply):
+    """Make stored mate scores relative to the root again."""
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class EnginePlayer(Player):
+
+    """A chess player whose moves are chosen by an engine."""
+
+    __slots__ = ("engine", "depth", "seconds", "nodes")
+
+    def __repr__(self):
+        return "EnginePlayer()"
+
+    def __init__(self, engine=None, depth=None, seconds=None, nodes=None):
+        """Use given or a new Engine, searching within the given limits."""
+        super(EnginePlayer, self).__init__()
+        self.engine = engine or Engine()
+        self.depth = depth
+        self.seconds = seconds
+        self.nodes = nodes
+
+    def play(self):
+        """
+        Search for the best move and make it.
+
+        Return the SearchResult, or None if the player has no legal moves.
+        """
+        result = self.engine.search(self.chessboard, self.depth, self.seconds,
+                                    self.nodes)
+        if not result.move:
+            return None
+        self.move(*result.move)
+        return result
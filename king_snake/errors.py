@@ -27,3 +27,7 @@ class FieldMustBeCastledError(ChessError):
 
 class PawnMustCaptureError(ChessError):
     """A Pawn has to capture when moving diagonally."""
+
+
+class NotationError(ChessError):
+    """A position or move could not be read from its notation."""
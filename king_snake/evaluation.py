@@ -0,0 +1,165 @@
+"""
+Static evaluation of chess positions.
+
+A position is scored by the material of the figures on the board and by
+piece-square tables, which reward figures for standing on good fields, e.g.
+knights in the center and pawns far advanced. Scores are given in centipawns
+from white's point of view, positive if white stands better.
+
+Each figure contributes a fixed amount for the field it stands on, so the
+chessboard keeps the score up to date as figures are placed and removed, the
+same way it keeps its Zobrist key. Moves, captures, castling, promotions and
+rollbacks all replace figures on fields, so reading the score never looks at
+the figures again.
+
+evaluate_batch scores many positions stored with fen.to_binary at once with
+NumPy, which is only imported when it is called.
+"""
+
+PIECE_VALUES = {"P": 100, "N": 320, "B": 330, "R": 500, "Q": 900, "K": 0}
+
+# Bonus for a white figure on each field, row 8 first as seen from white.
+# Black figures use the mirrored fields.
+_TABLES = {
+    "P": (0, 0, 0, 0, 0, 0, 0, 0,
+          50, 50, 50, 50, 50, 50, 50, 50,
+          10, 10, 20, 30, 30, 20, 10, 10,
+          5, 5, 10, 25, 25, 10, 5, 5,
+          0, 0, 0, 20, 20, 0, 0, 0,
+          5, -5, -10, 0, 0, -10, -5, 5,
+          5, 10, 10, -20, -20, 10, 10, 5,
+          0, 0, 0, 0, 0, 0, 0, 0),
+    "N": (-50, -40, -30, -30, -30, -30, -40, -50,
+          -40, -20, 0, 0, 0, 0, -20, -40,
+          -30, 0, 10, 15, 15, 10, 0, -30,
+          -30, 5, 15, 20, 20, 15, 5, -30,
+          -30, 0, 15, 20, 20, 15, 0, -30,
+          -30, 5, 10, 15, 15, 10, 5, -30,
+          -40, -20, 0, 5, 5, 0, -20, -40,
+          -50, -40, -30, -30, -30, -30, -40, -50),
+    "B": (-20, -10, -10, -10, -10, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 10, 10, 5, 0, -10,
+          -10, 5, 5, 10, 10, 5, 5, -10,
+          -10, 0, 10, 10, 10, 10, 0, -10,
+          -10, 10, 10, 10, 10, 10, 10, -10,
+          -10, 5, 0, 0, 0, 0, 5, -10,
+          -20, -10, -10, -10, -10, -10, -10, -20),
+    "R": (0, 0, 0, 0, 0, 0, 0, 0,
+          5, 10, 10, 10, 10, 10, 10, 5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          0, 0, 0, 5, 5, 0, 0, 0),
+    "Q": (-20, -10, -10, -5, -5, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 5, 5, 5, 0, -10,
+          -5, 0, 5, 5, 5, 5, 0, -5,
+          0, 0, 5, 5, 5, 5, 0, -5,
+          -10, 5, 5, 5, 5, 5, 0, -10,
+          -10, 0, 5, 0, 0, 0, 0, -10,
+          -20, -10, -10, -5, -5, -10, -10, -20),
+    "K": (-30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -20, -30, -30, -40, -40, -30, -30, -20,
+          -10, -20, -20, -20, -20, -20, -20, -10,
+          20, 20, 0, 0, 0, 0, 20, 20,
+          20, 30, 10, 0, 0, 10, 30, 20)}
+
+# Signed score of each figure on each field, indexed by field index
+PIECE_SQUARE_SCORES = dict(
+    (("white", symbol), tuple(PIECE_VALUES[symbol] + table[index ^ 56]
+                              for index in range(64)))
+    for symbol, table in _TABLES.items())
+PIECE_SQUARE_SCORES.update(
+    (("black", symbol), tuple(-PIECE_VALUES[symbol] - table[index]
+                              for index in range(64)))
+    for symbol, table in _TABLES.items())
+
+
+def piece_square_score(figure, field):
+    """Return signed score of figure standing on field."""
+    return PIECE_SQUARE_SCORES[figure.color, figure.symbol][field.index]
+
+
+def evaluate(chessboard):
+    """Return score of chessboard in centipawns for the player to move."""
+    if chessboard.current_player.color == "white":
+        return chessboard.score
+    return -chessboard.score
+
+
+def full_score(chessboard):
+    """
+    Return score of chessboard from white's view, counted from its figures.
+
+    This walks all figures and gives the same result as the chessboard's
+    incrementally kept score, against which it can be checked.
+    """
+    score = 0
+    for player in chessboard.players.values():
+        for figure in player.figures:
+            if figure.on_board:
+                score += piece_square_score(figure, figure.position)
+    return score
+
+
+def _code_scores(numpy):
+    """
+    Return array of the score of each binary code on each field.
+
+    The codes are those of fen.to_binary. Castling rooks and pawns that can
+    be taken en passant have their color given by their row. The king to
+    move is left at 0, as its color depends on the position.
+    """
+    from king_snake.fen import (CASTLING_ROOK, CODE_FIGURES, EN_PASSANT_PAWN,
+                                KING_TO_MOVE)
+    scores = numpy.zeros((KING_TO_MOVE + 1, 64), dtype=numpy.int32)
+    for code, figure in CODE_FIGURES.items():
+        scores[code] = PIECE_SQUARE_SCORES[figure]
+    for index in range(64):
+        row = index // 8 + 1
+        rook = ("white" if row == 1 else "black"), "R"
+        if row in (1, 8):
+            scores[CASTLING_ROOK, index] = PIECE_SQUARE_SCORES[rook][index]
+        pawn = ("white" if row == 4 else "black"), "P"
+        if row in (4, 5):
+            scores[EN_PASSANT_PAWN, index] = PIECE_SQUARE_SCORES[pawn][index]
+    return scores
+
+
+def evaluate_batch(positions):
+    """
+    Return NumPy array of the scores of positions for the player to move.
+
+    positions is a sequence of positions packed by fen.to_binary or an array
+    of them with one row of BINARY_SIZE bytes each. All positions are scored
+    together with array operations, which is much faster than setting up a
+    chessboard for each of them. Requires NumPy.
+    """
+    import numpy
+    from king_snake.fen import BINARY_SIZE, FIGURE_CODES, KING_TO_MOVE
+
+    if isinstance(positions, numpy.ndarray):
+        data = positions.astype(numpy.uint8, copy=False)
+    else:
+        data = numpy.frombuffer(b"".join(positions), dtype=numpy.uint8)
+    data = data.reshape(-1, BINARY_SIZE)
+    nibbles = data[:, :32]
+    # Each byte holds two fields, the lower index in the low nibble
+    codes = numpy.empty((len(data), 64), dtype=numpy.intp)
+    codes[:, 0::2] = nibbles & 15
+    codes[:, 1::2] = nibbles >> 4
+
+    scores = _code_scores(numpy)[codes, numpy.arange(64)].sum(axis=1)
+    white_to_move = ~(codes == FIGURE_CODES["white", "K"]).any(axis=1)
+    king_fields = (codes == KING_TO_MOVE).argmax(axis=1)
+    white_king = numpy.array(PIECE_SQUARE_SCORES["white", "K"])
+    black_king = numpy.array(PIECE_SQUARE_SCORES["black", "K"])
+    scores += numpy.where(white_to_move, white_king[king_fields],
+                          black_king[king_fields])
+    return numpy.where(white_to_move, scores, -scores)
@@ -0,0 +1,310 @@
+"""
+Reading and writing positions in Forsyth-Edwards Notation and in binary.
+
+FEN describes a position in a single line, e.g. the starting position:
+
+    rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
+
+Loading a position places its figures directly instead of replaying the moves
+that led to it, so the time needed does not depend on the length of the game.
+The loaded chessboard's move history starts out empty and its initial_fen
+holds the position it was loaded from.
+
+The binary format stores a position in BINARY_SIZE bytes. The first 32 bytes
+hold one nibble per field in index order, low nibble first:
+
+    0        empty field
+    1 - 6    white pawn, knight, bishop, rook, queen, king
+    7 - 12   black pawn, knight, bishop, rook, queen, king
+    13       rook that can still castle, white on row 1 and black on row 8
+    14       pawn that can be taken en passant, white on row 4 and black on
+             row 5
+    15       king of the player to move
+
+They are followed by the halfmove clock in one byte, capped at 255, and the
+move number in two bytes, big endian.
+"""
+
+import struct
+
+from king_snake.chessboard import Chessboard, FIELD_NAMES
+from king_snake.errors import NotationError
+from king_snake.figures import Pawn, Rook, Knight, Bishop, Queen, King
+from king_snake.player import Player
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+FIGURE_CLASSES = dict((figure_class.symbol, figure_class) for figure_class in
+                      (Pawn, Knight, Bishop, Rook, Queen, King))
+
+# Castling right kept by a rook that has not moved from its corner
+CORNER_RIGHTS = {"H1": "K", "A1": "Q", "H8": "k", "A8": "q"}
+
+BINARY_SIZE = 35
+CASTLING_ROOK, EN_PASSANT_PAWN, KING_TO_MOVE = 13, 14, 15
+FIGURE_CODES = dict(((color, symbol), code) for code, (color, symbol) in
+                    enumerate(((color, symbol)
+                               for color in ("white", "black")
+                               for symbol in "PNBRQK"), 1))
+CODE_FIGURES = dict((code, figure) for figure, code in FIGURE_CODES.items())
+
+
+def from_fen(fen, players=None, bitboards=False):
+    """
+    Return chessboard set up in the position described by fen.
+
+    The halfmove clock and move number may be left out. Players can be
+    supplied as for Chessboard, otherwise two new players are created. An
+    invalid description raises NotationError.
+    """
+    parts = fen.split()
+    if len(parts) == 4:
+        parts.extend(("0", "1"))
+    if len(parts) != 6:
+        raise NotationError("FEN has {} parts instead of 6.".format(
+                                                                len(parts)))
+    placement, color, castling, en_passant, halfmove_clock, number = parts
+
+    figures = dict()
+    rows = placement.split("/")
+    if len(rows) != 8:
+        raise NotationError("FEN has {} rows instead of 8.".format(len(rows)))
+    for row, number_in_row in zip(rows, range(8, 0, -1)):
+        letter = ord("A")
+        for character in row:
+            if character in "12345678":
+                letter += int(character)
+                continue
+            if character.upper() not in FIGURE_CLASSES or letter > ord("H"):
+                raise NotationError("Invalid row in FEN: {}".format(row))
+            figure_color = "white" if character.isupper() else "black"
+            figures[chr(letter) + str(number_in_row)] = (figure_color,
+                                                         character.upper())
+            letter += 1
+        if letter != ord("H") + 1:
+            raise NotationError("Row does not have 8 fields: {}".format(row))
+
+    if color not in ("w", "b"):
+        raise NotationError("Invalid color to move: {}".format(color))
+    if castling == "-":
+        castling = ""
+    elif not castling or set(castling) - set("KQkq"):
+        raise NotationError("Invalid castling rights: {}".format(castling))
+    if en_passant == "-":
+        en_passant = None
+    elif en_passant.upper() in FIELD_NAMES:
+        en_passant = en_passant.upper()
+    else:
+        raise NotationError("Invalid en passant field: {}".format(en_passant))
+    try:
+        halfmove_clock, number = int(halfmove_clock), int(number)
+    except ValueError:
+        raise NotationError("Invalid move counters: {} {}".format(
+                                                      halfmove_clock, number))
+
+    chessboard = _set_up(figures, "white" if color == "w" else "black",
+                         castling, en_passant, halfmove_clock, number,
+                         players, bitboards)
+    chessboard.initial_fen = to_fen(chessboard)
+    return chessboard
+
+
+def to_fen(chessboard):
+    """
+    Return FEN of chessboard's current position.
+
+    An en passant field is only given if a pawn can actually be taken there.
+    """
+    rows = []
+    for number in range(8, 0, -1):
+        row = ""
+        empty = 0
+        for letter in "ABCDEFGH":
+            figure = chessboard.fields[letter + str(number)].figure
+            if not figure:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            if figure.color == "white":
+                row += figure.symbol
+            else:
+                row += figure.symbol.lower()
+        if empty:
+            row += str(empty)
+        rows.append(row)
+    if chessboard.en_passant_field:
+        en_passant = chessboard.en_passant_field.name.lower()
+    else:
+        en_passant = "-"
+    return "{} {} {} {} {} {}".format("/".join(rows),
+                                      chessboard.current_player.color[0],
+                                      chessboard.castling_rights or "-",
+                                      en_passant, chessboard.halfmove_clock,
+                                      (chessboard.current_move + 1) // 2)
+
+
+def to_binary(chessboard):
+    """Return chessboard's current position as BINARY_SIZE bytes."""
+    castling_rights = chessboard.castling_rights
+    en_passant_pawn = _en_passant_pawn_field(chessboard.en_passant_field)
+    king_to_move = chessboard.current_player.king
+    codes = []
+    for field in chessboard.ordered_fields:
+        figure = field.figure
+        if not figure:
+            codes.append(0)
+        elif figure is king_to_move:
+            codes.append(KING_TO_MOVE)
+        elif (figure.symbol == "R" and
+                CORNER_RIGHTS.get(field.name, "-") in castling_rights):
+            codes.append(CASTLING_ROOK)
+        elif field is en_passant_pawn:
+            codes.append(EN_PASSANT_PAWN)
+        else:
+            codes.append(FIGURE_CODES[figure.color, figure.symbol])
+    data = bytearray(codes[index] | codes[index + 1] << 4
+                     for index in range(0, 64, 2))
+    data.extend(struct.pack(">BH", min(chessboard.halfmove_clock, 255),
+                            (chessboard.current_move + 1) // 2))
+    return bytes(data)
+
+
+def from_binary(data, players=None, bitboards=False):
+    """
+    Return chessboard set up in the position stored by to_binary.
+
+    Players can be supplied as for from_fen. Data that does not describe a
+    position raises NotationError.
+    """
+    if len(data) != BINARY_SIZE:
+        raise NotationError("Binary position has {} bytes instead of "
+                            "{}.".format(len(data), BINARY_SIZE))
+    data = bytearray(data)
+    figures = dict()
+    castling = ""
+    en_passant = None
+    king_to_move = None
+    for index, name in enumerate(FIELD_NAMES):
+        code = data[index // 2] >> 4 * (index % 2) & 15
+        if not code:
+            continue
+        if code == CASTLING_ROOK:
+            if name not in CORNER_RIGHTS:
+                raise NotationError("Castling rook on {}.".format(name))
+            right = CORNER_RIGHTS[name]
+            castling += right
+            figures[name] = ("white" if right.isupper() else "black", "R")
+        elif code == EN_PASSANT_PAWN:
+            if name[1] == "4":
+                figures[name] = ("white", "P")
+                en_passant = name[0] + "3"
+            elif name[1] == "5":
+                figures[name] = ("black", "P")
+                en_passant = name[0] + "6"
+            else:
+                raise NotationError("En passant pawn on {}.".format(name))
+        elif code == KING_TO_MOVE:
+            king_to_move = name
+        else:
+            figures[name] = CODE_FIGURES[code]
+    other_kings = [figure_color for figure_color, symbol in figures.values()
+                   if symbol == "K"]
+    if not king_to_move or len(other_kings) != 1:
+        raise NotationError("Binary position does not have two kings.")
+    color = "white" if other_kings[0] == "black" else "black"
+    figures[king_to_move] = (color, "K")
+    halfmove_clock, number = struct.unpack_from(">BH", data, 32)
+    castling = "".join(right for right in "KQkq" if right in castling)
+
+    chessboard = _set_up(figures, color, castling, en_passant, halfmove_clock,
+                         number, players, bitboards)
+    chessboard.initial_fen = to_fen(chessboard)
+    return chessboard
+
+
+def _en_passant_pawn_field(en_passant_field):
+    """Return field of the pawn that jumped over en_passant_field or None."""
+    if not en_passant_field:
+        return None
+    if en_passant_field.number == 3:
+        return en_passant_field.above()
+    return en_passant_field.below()
+
+
+def _set_up(figures, color, castling, en_passant, halfmove_clock, number,
+            players, bitboards):
+    """
+    Return chessboard with figures placed and the position state set.
+
+    figures maps field names to (color, symbol) pairs. color is the color of
+    the player to move, castling the castling rights in FEN notation and
+    en_passant the name of the field a pawn jumped over in the last move or
+    None. Which figures count as having moved is derived from the castling
+    rights and from whether they stand on one of their start positions.
+    """
+    for figure_color in ("white", "black"):
+        kings = [name for name, figure in figures.items()
+                 if figure == (figure_color, "K")]
+        if len(kings) != 1:
+            raise NotationError("The {} player has {} kings.".format(
+                                                     figure_color, len(kings)))
+    if number < 1:
+        raise NotationError("Invalid move number: {}".format(number))
+
+    chessboard = Chessboard(bitboards=bitboards)
+    players = players or {"white": Player(), "black": Player()}
+    for figure_color in ("white", "black"):
+        chessboard.players[figure_color] = players[figure_color]
+        players[figure_color].color = figure_color
+    for figure_color in ("white", "black"):
+        placement = [(FIGURE_CLASSES[figures[name][1]], name)
+                     for name in FIELD_NAMES
+                     if figures.get(name, (None,))[0] == figure_color]
+        players[figure_color].set_up_position(chessboard, placement)
+
+    for field in chessboard.ordered_fields:
+        figure = field.figure
+        if figure:
+            figure.already_moved = (field.name not in
+                                    figure.start_position[figure.color])
+            # Only the pawn that jumped over the en passant field, if any, can
+            # be taken en passant, see _set_en_passant
+            if isinstance(figure, Pawn):
+                figure.can_be_taken_en_passant = False
+    for name, right in CORNER_RIGHTS.items():
+        rook = chessboard.fields[name].figure
+        if rook and rook.symbol == "R" and right not in castling:
+            rook.already_moved = True
+    for figure_color, rights in (("white", "KQ"), ("black", "kq")):
+        king = players[figure_color].king
+        if not any(right in castling for right in rights):
+            king.already_moved = True
+
+    chessboard.current_move = 2 * number - (color == "white")
+    chessboard.current_player = players[color]
+    chessboard.halfmove_clock = halfmove_clock
+    if en_passant:
+        _set_en_passant(chessboard, chessboard.fields[en_passant])
+    chessboard._update_state_key()
+    chessboard.position_keys = [chessboard.position_key]
+    return chessboard
+
+
+def _set_en_passant(chessboard, jumped):
+    """Let the pawn that jumped over field jumped be taken en passant."""
+    pawn_field = _en_passant_pawn_field(jumped)
+    pawn = pawn_field and pawn_field.figure
+    opponent = chessboard.current_player.opponent
+    if (jumped.number not in (3, 6) or not isinstance(pawn, Pawn) or
+            pawn.player != opponent or
+            pawn_field.number != pawn.first_jump_row):
+        raise NotationError("No pawn can have jumped over {}.".format(
+                                                               jumped.name))
+    pawn.can_be_taken_en_passant = True
+    pawn.last_moved = chessboard.current_move - 1
+    for neighbor in pawn_field.to_left(), pawn_field.to_right():
+        if (neighbor and isinstance(neighbor.figure, Pawn) and
+                neighbor.figure.player != opponent):
+            chessboard.en_passant_field = jumped
@@ -11,6 +11,10 @@ class Bishop(Figure):
     start_position = {"white": ("C1", "F1"),
                       "black": ("C8", "F8")}
 
+    symbol = "B"
+
+    __slots__ = ()
+
     def __str__(self):
         if self.color == "white":
             string = "♗"
@@ -18,8 +22,7 @@ class Bishop(Figure):
             string = "♝"
         return string
 
-    @property
-    def legal_moves(self):
+    def _reachable_fields(self):
         """Return legal moves from current position."""
         return self._fields_in_directions(("above_right", "below_right",
                                            "above_left", "below_left"))
@@ -1,9 +1,21 @@
 """Abstract chess figure classes."""
 
+from king_snake.chessboard import DIRECTION_INDEX
 from king_snake.errors import (FieldMustBeCastledError, FieldOccupiedError,
                                IllegalCaptureError, IllegalMoveError,
                                PawnMustCaptureError)
 
+# Names of all slots of figure classes, collected when first needed
+_SLOT_NAMES = dict()
+
+
+def _slot_names(cls):
+    """Return names of the slots of cls and its base classes."""
+    if cls not in _SLOT_NAMES:
+        _SLOT_NAMES[cls] = tuple(name for base in cls.__mro__
+                                 for name in getattr(base, "__slots__", ()))
+    return _SLOT_NAMES[cls]
+
 
 class Figure(object):
 
@@ -14,11 +26,19 @@ class Figure(object):
     implemented in subclasses. It contains a dictionary of possible positions
     for each color. Each entry in the dictionary is a tuple of the appropriate
     field coordinates.
+
+    symbol is the figure's letter in chess notation, e.g. "N" for a knight,
+    and is also used to key bitboards.
     """
 
     start_position = {"white": (None),
                       "black": (None)}
 
+    __slots__ = ("attacks", "player", "color", "position", "already_moved",
+                 "last_moved", "_moves_generation", "_moves", "_move_set")
+
+    symbol = None
+
     def __repr__(self):
         return "{type} at {position}".format(type=self.__class__.__name__,
                                              position=self.position)
@@ -35,7 +55,17 @@ class Figure(object):
         last_moved field is set to the current move number whenever a move is
         successfully completed. A captured move is also set to have been moved
         when being captured, as is a castled rook.
+
+        The fields the figure attacks are registered with the chessboard's
+        attack maps in attacks.
+
+        The fields the figure can reach are cached together with the
+        chessboard's generation they were found in, see legal_moves.
         """
+        self.attacks = ()
+        self._moves_generation = None
+        self._moves = ()
+        self._move_set = None
         self.player = player
         if self.player == self.player.chessboard.players["white"]:
             self.color = "white"
@@ -74,7 +104,8 @@ class Figure(object):
 
         The directions are the string names of directional methods on the Field
         class which return neighboring Fields in the given direction. See Field
-        for the possible directions.
+        for the possible directions. The neighbors are read from each field's
+        precomputed neighbor table instead of calling the methods.
 
         The perimeter is set to 8 by default, because chess pieces operate on
         an 8x8 board.
@@ -82,18 +113,68 @@ class Figure(object):
         fields = []
         for direction in directions:
             found_figure = None
-            next_position = getattr(self.position, direction)()
+            direction = DIRECTION_INDEX[direction]
+            next_position = self.position.neighbors[direction]
             distance = 1
             while distance <= perimeter and next_position and not found_figure:
                 fields.append(next_position)
                 if next_position.figure:
                     found_figure = next_position.figure
-                next_position = getattr(next_position, direction)()
+                next_position = next_position.neighbors[direction]
                 distance += 1
         return fields
 
     @property
-    def legal_moves(self):
+    def on_board(self):
+        """Figure stands on a field, i.e. was neither captured nor promoted."""
+        return self.position is not None and self.position.figure is self
+
+    def copy(self, player):
+        """
+        Return copy of self belonging to player.
+
+        If self stands on a field, the copy is placed on the field with the
+        same name on the player's chessboard.
+        """
+        cls = type(self)
+        figure = cls.__new__(cls)
+        for name in _slot_names(cls):
+            setattr(figure, name, getattr(self, name))
+        if hasattr(self, "__dict__"):
+            figure.__dict__.update(self.__dict__)
+        figure.player = player
+        figure.attacks = ()
+        figure._moves_generation = None
+        if self.position:
+            figure.position = player.chessboard.fields[self.position.name]
+            if self.on_board:
+                figure.position.figure = figure
+        return figure
+
+    def __getstate__(self):
+        """Leave out the cached moves when pickling."""
+        state = dict((name, getattr(self, name)) for name in
+                     _slot_names(type(self)) if hasattr(self, name))
+        state.update(_moves_generation=None, _moves=(), _move_set=None)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def get_state(self):
+        """Return the figure's changeable state for restoring it later."""
+        return self.position, self.already_moved, self.last_moved
+
+    def set_state(self, state):
+        """Restore state returned by get_state."""
+        self.position, self.already_moved, self.last_moved = state
+
+    def affected_fields(self, field):
+        """Return all fields that moving to field can change."""
+        return self.position, field
+
+    def _reachable_fields(self):
         """
         Compute list of legal moves.
 
@@ -101,6 +182,68 @@ class Figure(object):
         """
         raise NotImplementedError
 
+    def _find_moves(self):
+        """
+        Bring cached legal moves up to date with the chessboard.
+
+        The chessboard's generation changes whenever a field's figure changes
+        or a turn ends, which are the only events that change the moves.
+        """
+        generation = self.player.chessboard.generation
+        if self._moves_generation != generation:
+            self._moves = tuple(self._reachable_fields())
+            self._move_set = None
+            self._moves_generation = generation
+
+    @property
+    def legal_moves(self):
+        """
+        Return set of fields the figure can reach from current position.
+
+        The set includes fields occupied by a figure of the own color. It is
+        computed at most once per chessboard generation.
+        """
+        self._find_moves()
+        if self._move_set is None:
+            self._move_set = frozenset(self._moves)
+        return self._move_set
+
+    @property
+    def attacked_fields(self):
+        """
+        Compute list of fields attacked from current position.
+
+        For most figures these are the fields they can move to, including a
+        field occupied by a figure of their own color, which they protect.
+        """
+        self._find_moves()
+        return self._moves
+
+    @property
+    def pseudo_legal_moves(self):
+        """
+        Return fields the figure can move to or capture on.
+
+        Unlike legal_moves, fields occupied by the figure's own color are left
+        out, while it is not checked whether the move would leave the own king
+        in check.
+        """
+        self._find_moves()
+        color = self.color
+        return [field for field in self._moves if not field.figure or
+                field.figure.color != color]
+
+    def update_attacks(self):
+        """Recompute attacked fields and register them on the chessboard."""
+        for field in self.attacks:
+            field.attackers.discard(self)
+        if self.on_board:
+            self.attacks = tuple(self.attacked_fields)
+            for field in self.attacks:
+                field.attackers.add(self)
+        else:
+            self.attacks = ()
+
     def move(self, field):
         """
         Move to field.
@@ -117,9 +260,12 @@ class Figure(object):
         """
         Capture piece at field.
 
-        Check if piece to capture is of different color. If not, raise error.
-        If it is, unlink the figure and field, then place self on field.
+        Check if field can be reached and if the piece to capture is of
+        different color. If not, raise error. If it is, unlink the figure and
+        field, then place self on field.
         """
+        if field not in self.legal_moves:
+            raise IllegalMoveError("Piece cannot move to given field.")
         if field.figure.color != self.color:
             captured_figure = field.figure
             captured_figure.position = None
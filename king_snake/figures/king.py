@@ -1,8 +1,26 @@
 # -*- coding: utf-8 -*-
 """King chess piece."""
 
+from collections import namedtuple
+
+from king_snake.bitboard import KNIGHT_ATTACKS, PAWN_ATTACKS, indices
+from king_snake.chessboard import (TO_RIGHT, TO_LEFT, ABOVE, BELOW,
+                                   ABOVE_RIGHT, ABOVE_LEFT, BELOW_RIGHT,
+                                   BELOW_LEFT)
 from .figure import Figure, FieldMustBeCastledError, IllegalMoveError
 
+# Figures giving check, fields a figure other than the king can move to in
+# order to answer a single check, fields each pinned figure may move to and
+# fields next to the king that a checking figure attacks through the king.
+CheckState = namedtuple("CheckState", ("checkers", "evasions", "pins",
+                                       "exposed"))
+
+# Direction opposite to each direction, in the order of Field.neighbors
+OPPOSITE_DIRECTIONS = (TO_LEFT, TO_RIGHT, BELOW, ABOVE,
+                       BELOW_LEFT, BELOW_RIGHT, ABOVE_LEFT, ABOVE_RIGHT)
+# Figures attacking along the orthogonal and diagonal directions
+SLIDERS = (("R", "Q"),) * 4 + (("B", "Q"),) * 4
+
 
 class King(Figure):
 
@@ -11,6 +29,10 @@ class King(Figure):
     start_position = {"white": ["E1"],
                       "black": ["E8"]}
 
+    symbol = "K"
+
+    __slots__ = ("castle_positions", "_check_generation", "_check_state")
+
     def __str__(self):
         if self.color == "white":
             string = "♔"
@@ -18,14 +40,38 @@ class King(Figure):
             string = "♚"
         return string
 
-    def __init__(self, player):
-        """Initialize king and set castle positions."""
-        super(King, self).__init__(player)
-        self.castle_positions = {"left": self.position.to_left().to_left(),
-                                 "right": self.position.to_right().to_right()}
+    def __init__(self, player, position=None):
+        """
+        Initialize king and set castle positions.
 
-    @property
-    def legal_moves(self):
+        The castle positions are on the king's home row, so they stay the same
+        if the king is placed elsewhere, e.g. when a position is loaded.
+        """
+        super(King, self).__init__(player, position)
+        row = self.start_position[self.color][0][1]
+        fields = player.chessboard.fields
+        self.castle_positions = {"left": fields["C" + row],
+                                 "right": fields["G" + row]}
+        self._check_generation = None
+        self._check_state = None
+
+    def copy(self, player):
+        """Return copy of self with castle positions on player's board."""
+        king = super(King, self).copy(player)
+        fields = player.chessboard.fields
+        king.castle_positions = dict((side, fields[field.name]) for
+                                     side, field in
+                                     self.castle_positions.items())
+        king._check_generation = None
+        return king
+
+    def __getstate__(self):
+        """Leave out the cached moves and check state when pickling."""
+        state = super(King, self).__getstate__()
+        state.update(_check_generation=None, _check_state=None)
+        return state
+
+    def _reachable_fields(self):
         """Return legal moves from current position."""
         moves = []
         # Castling positions
@@ -39,6 +85,26 @@ class King(Figure):
                                                 1))
         return moves
 
+    @property
+    def attacked_fields(self):
+        """Return surrounding fields, leaving out castling positions."""
+        return self._fields_in_directions(("to_left", "to_right",
+                                           "above", "below",
+                                           "above_right", "below_right",
+                                           "above_left", "below_left"),
+                                          1)
+
+    @property
+    def pseudo_legal_moves(self):
+        """Return free or capturable surrounding fields and castle fields."""
+        color = self.color
+        moves = [field for field in self.attacked_fields if not field.figure or
+                 field.figure.color != color]
+        for field in self.castle_positions.values():
+            if self.castling_rook(field):
+                moves.append(field)
+        return moves
+
     def move(self, field):
         """
         Move to field.
@@ -46,66 +112,136 @@ class King(Figure):
         If given field is a castling field and castling is legal, use try
         castling. Otherwise call superclass method.
         """
-        if (field in self.legal_moves and
+        if (not self.already_moved and
                 field in self.castle_positions.values()):
             raise FieldMustBeCastledError("Goal field is for castling.")
         else:
             super(King, self).move(field)
 
+    def affected_fields(self, field):
+        """Castling can change every field on the king's row."""
+        fields = self.player.chessboard.fields
+        return tuple(fields[letter + str(self.position.number)]
+                     for letter in "ABCDEFGH") + (field,)
+
     @property
     def in_check(self):
-        """Test if king is in check."""
-        return self.position.threatened_by(self.player.opponent)
+        """Test if king is in check, see check_state."""
+        return bool(self.check_state.checkers)
 
-    def castle(self, field):
+    @property
+    def check_state(self):
         """
-        Castle king.
+        Return CheckState of the current position.
 
-        First, check if corresponding rook is there and has not moved yet. Then
-        check if any of the positions between and including the king and rook
-        are occupied or threatened. If this is not the case, castle the king.
-        If not, raise error.
+        The rays from the king are followed once per chessboard generation.
+        The first own figure on a ray is pinned if the next figure behind it
+        is an opponent's rook, bishop or queen attacking along the ray.
+        """
+        generation = self.player.chessboard.generation
+        if self._check_generation != generation:
+            self._check_state = self._find_check_state()
+            self._check_generation = generation
+        return self._check_state
+
+    def _find_check_state(self):
+        """Follow the rays from the king and return a CheckState."""
+        color = self.color
+        position = self.position
+        checkers = []
+        evasions = set()
+        pins = dict()
+        exposed = set()
+        for direction, field in enumerate(position.neighbors):
+            sliders = SLIDERS[direction]
+            ray = []
+            pinned = None
+            while field:
+                ray.append(field)
+                figure = field.figure
+                if figure:
+                    if figure.color == color:
+                        if pinned:
+                            break
+                        pinned = figure
+                    else:
+                        if figure.symbol in sliders:
+                            if pinned:
+                                pins[pinned] = frozenset(ray)
+                            else:
+                                checkers.append(figure)
+                                evasions.update(ray)
+                                behind = position.neighbors[
+                                                OPPOSITE_DIRECTIONS[direction]]
+                                if behind:
+                                    exposed.add(behind)
+                        break
+                field = field.neighbors[direction]
+        fields = self.player.chessboard.ordered_fields
+        for symbol, mask in (("N", KNIGHT_ATTACKS[position.index]),
+                             ("P", PAWN_ATTACKS[color][position.index])):
+            for index in indices(mask):
+                figure = fields[index].figure
+                if (figure and figure.symbol == symbol and
+                        figure.color != color):
+                    checkers.append(figure)
+                    evasions.add(figure.position)
+        return CheckState(tuple(checkers), frozenset(evasions), pins,
+                          frozenset(exposed))
+
+    def castling_rook(self, field):
         """
-        involved_fields = []
-        rook, rook_position = None, None
-        position = old_position = self.position
-        involved_fields.append(position)
+        Return rook the king would castle with to reach field.
 
+        The king and the corresponding rook must not have moved yet and all
+        positions between them must be free. The king may not be in check and
+        the positions it moves through and to may not be threatened. If the
+        king cannot castle to field, return None.
+        """
+        if self.already_moved:
+            return None
         if field == self.castle_positions["left"]:
-            rook_position = self.player.chessboard.fields[
-                                                      "A{}".format(
-                                                      self.position.number)]
-            while position != self.castle_positions["left"]:
-                position = position.to_left()
-                involved_fields.append(position)
-        # Rook is on right
+            letter, direction = "A", TO_LEFT
         elif field == self.castle_positions["right"]:
-            rook_position = self.player.chessboard.fields[
-                                                      "H{}".format(
-                                                      self.position.number)]
-            while position != self.castle_positions["right"]:
-                position = position.to_right()
-                involved_fields.append(position)
-
-        if rook_position:
-            rook = rook_position.figure
-        if rook and not rook.already_moved:
-            involved_fields_free = True
-            for position in involved_fields:
-                if position.threatened_by(self.player.opponent):
-                    involved_fields_free = False
-                elif position.figure and not (position == self.position or
-                                              position == rook_position):
-                    involved_fields_free = False
-            if involved_fields_free:
-                field.receive_figure(self)
-                if field == self.castle_positions["left"]:
-                    field.to_right().receive_figure(rook)
-                else:
-                    field.to_left().receive_figure(rook)
-
-        # King could not be castled
-        if self.position != field:
+            letter, direction = "H", TO_RIGHT
+        else:
+            return None
+
+        rook_position = self.player.chessboard.fields[
+                                      letter + str(self.position.number)]
+        rook = rook_position.figure
+        if not (rook and rook.symbol == "R" and rook.color == self.color and
+                not rook.already_moved):
+            return None
+        position = self.position.neighbors[direction]
+        while position != rook_position:
+            if position.figure:
+                return None
+            position = position.neighbors[direction]
+
+        opponent = self.player.opponent
+        position = self.position
+        while True:
+            if position.threatened_by(opponent):
+                return None
+            if position == field:
+                return rook
+            position = position.neighbors[direction]
+
+    def castle(self, field):
+        """
+        Castle king.
+
+        If castling to field is possible, move the king there and place the
+        rook on the field the king has passed. If not, raise error.
+        """
+        rook = self.castling_rook(field)
+        if not rook:
             raise IllegalMoveError("King cannot castle here.")
+        field.receive_figure(self)
+        if field == self.castle_positions["left"]:
+            field.to_right().receive_figure(rook)
         else:
-            return rook
+            field.to_left().receive_figure(rook)
+        rook.already_moved = True
+        return rook
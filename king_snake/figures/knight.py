@@ -2,6 +2,8 @@
 
 """A knight chess piece."""
 
+from king_snake.chessboard import (ABOVE, ABOVE_LEFT, ABOVE_RIGHT, BELOW,
+                                   BELOW_LEFT, BELOW_RIGHT, TO_LEFT, TO_RIGHT)
 from .figure import Figure
 
 
@@ -12,6 +14,16 @@ class Knight(Figure):
     start_position = {"white": ("B1", "G1"),
                       "black": ("B8", "G8")}
 
+    symbol = "N"
+
+    __slots__ = ()
+
+    # One straight step followed by one of the diagonal steps leading away
+    steps = ((ABOVE, (ABOVE_LEFT, ABOVE_RIGHT)),
+             (BELOW, (BELOW_LEFT, BELOW_RIGHT)),
+             (TO_LEFT, (ABOVE_LEFT, BELOW_LEFT)),
+             (TO_RIGHT, (ABOVE_RIGHT, BELOW_RIGHT)))
+
     def __str__(self):
         if self.color == "white":
             string = "♘"
@@ -19,19 +31,14 @@ class Knight(Figure):
             string = "♞"
         return string
 
-    @property
-    def legal_moves(self):
+    def _reachable_fields(self):
         """Return legal moves from current position."""
         moves = []
-        steps = {"above": ("above_left", "above_right"),
-                 "below": ("below_left", "below_right"),
-                 "to_left": ("above_left", "below_left"),
-                 "to_right": ("above_right", "below_right")}
-        for first_step in steps.keys():
-            for second_step in steps[first_step]:
-                first_pos = getattr(self.position, first_step)()
-                if first_pos:
-                    second_pos = getattr(first_pos, second_step)()
+        for first_step, second_steps in self.steps:
+            first_pos = self.position.neighbors[first_step]
+            if first_pos:
+                for second_step in second_steps:
+                    second_pos = first_pos.neighbors[second_step]
                     if second_pos:
                         moves.append(second_pos)
         return moves
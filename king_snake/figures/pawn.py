@@ -1,8 +1,16 @@
 # -*- coding: utf-8 -*-
 """Pawn chess piece."""
 
+from king_snake.chessboard import DIRECTION_INDEX
+from .bishop import Bishop
 from .figure import Figure, IllegalCaptureError, PawnMustCaptureError
+from .knight import Knight
 from .queen import Queen
+from .rook import Rook
+
+# Figures a pawn can be promoted to, by symbol
+PROMOTIONS = dict((figure.symbol, figure) for figure in
+                  (Queen, Rook, Bishop, Knight))
 
 
 class Pawn(Figure):
@@ -12,6 +20,12 @@ class Pawn(Figure):
     start_position = {"white": list(letter + "2" for letter in "ABCDEFGH"),
                       "black": list(letter + "7" for letter in "ABCDEFGH")}
 
+    symbol = "P"
+
+    __slots__ = ("can_be_taken_en_passant", "move_direction",
+                 "capture_directions", "last_row", "en_passant_row",
+                 "first_jump_row", "promotion")
+
     def __str__(self):
         if self.color == "white":
             string = "♙"
@@ -19,73 +33,131 @@ class Pawn(Figure):
             string = "♟"
         return string
 
-    def __init__(self, player):
-        """Initialize Pawn, set direction and change thresholds by color."""
-        super(Pawn, self).__init__(player)
-        self.en_passant_ready = False
-        self.can_be_taken_en_passant = True
+    def __init__(self, player, position=None):
+        """
+        Initialize Pawn, set direction and change thresholds by color.
+
+        promotion is the figure class the pawn becomes on the last row. A
+        Player sets it before each of the pawn's moves.
+        """
+        super(Pawn, self).__init__(player, position)
+        self.can_be_taken_en_passant = False
+        self.promotion = Queen
         if self.color == "white":
             self.move_direction = "above"
+            self.capture_directions = ("above_left", "above_right")
             self.last_row = 8
             self.en_passant_row = 5
             self.first_jump_row = 4
         else:
             self.move_direction = "below"
+            self.capture_directions = ("below_left", "below_right")
             self.last_row = 1
             self.en_passant_row = 4
             self.first_jump_row = 5
 
+    @property
+    def en_passant_ready(self):
+        """Pawn is in the row from which it can capture en passant."""
+        return bool(self.position and
+                    self.position.number == self.en_passant_row)
+
+    def get_state(self):
+        """Return figure state including en passant flag."""
+        return super(Pawn, self).get_state(), self.can_be_taken_en_passant
+
+    def set_state(self, state):
+        """Restore state returned by get_state."""
+        figure_state, self.can_be_taken_en_passant = state
+        super(Pawn, self).set_state(figure_state)
+
+    def affected_fields(self, field):
+        """Include the field of a pawn that could be taken en passant."""
+        if self.color == "white":
+            behind = field.below()
+        else:
+            behind = field.above()
+        return self.position, field, behind
+
     def _finish_turn(self):
         """
         Monitor pawn state changes.
 
-        If Pawn reaches last row, it is exchanged for a Queen. If Pawn is in
-        its en passant row, it is ready to perform en passant. If Pawn moves
-        two squares on its first move, it can be taken by en passant.
+        If Pawn reaches last row, it is exchanged for a figure of its
+        promotion class. If Pawn moves two squares on its first move, it can
+        be taken by en passant.
         """
 
         if self.position.number == self.last_row:
-            # Remove self from field and place queen there
+            # Remove self from field and place promoted figure there
             self.position.figure = None
-            queen = Queen(self.player, self.position)
-            self.position.figure = queen
-            # Replace self in player's list with queen
-            self.player.figures[self.player.figures.index(self)] = queen
-
-        elif self.position.number == self.en_passant_row:
-            self.en_passant_ready = True
+            promoted = self.promotion(self.player, self.position)
+            promoted.already_moved = True
+            self.position.figure = promoted
+            # Replace self in player's list with promoted figure
+            self.player.figures[self.player.figures.index(self)] = promoted
 
         elif (self.position.number == self.first_jump_row and not
               self.already_moved):
             self.can_be_taken_en_passant = True
 
-    @property
-    def legal_moves(self):
+    def _forward_moves(self):
         """
-        Return legal moves from current position.
+        Return free fields the pawn can move straight forward to.
 
         If pawn has already moved, it has a range of one square. Otherwise it
-        has a range of two squares. Also, if the adjacent squares in the pawn's
-        capture directions contain players, those fields are added to the legal
-        moves.
+        has a range of two squares.
+        """
+        moves = []
+        direction = DIRECTION_INDEX[self.move_direction]
+        field = self.position.neighbors[direction]
+        if field and not field.figure:
+            moves.append(field)
+            field = field.neighbors[direction]
+            if not self.already_moved and field and not field.figure:
+                moves.append(field)
+        return moves
+
+    def en_passant_victim(self, field):
+        """
+        Return pawn that would be taken en passant by moving to field.
+
+        This is the opponent's pawn next to self that jumped over field in the
+        previous move. If there is none, return None.
         """
+        if not self.en_passant_ready or field not in self.attacked_fields:
+            return None
         if self.color == "white":
-            movement_direction = "above"
-            capture_directions = "above_left", "above_right"
+            victim = field.below().figure
         else:
-            movement_direction = "below"
-            capture_directions = "below_left", "below_right"
+            victim = field.above().figure
+        if (isinstance(victim, Pawn) and victim.color != self.color and
+                victim.can_be_taken_en_passant and
+                victim.last_moved == self.player.chessboard.current_move - 1):
+            return victim
 
-        if self.already_moved:
-            move_range = 1
-        else:
-            move_range = 2
-        moves = self._fields_in_directions([movement_direction], move_range)
-        for field in self._fields_in_directions(capture_directions, 1):
-            if field and self.en_passant_ready or field.figure:
+    def _reachable_fields(self):
+        """
+        Return legal moves from current position.
+
+        These are the free fields in front of the pawn and those adjacent
+        fields in the pawn's capture directions that contain an opponent's
+        figure or can be reached by capturing en passant.
+        """
+        moves = self._forward_moves()
+        for field in self.attacked_fields:
+            if field.figure:
+                if field.figure.color != self.color:
+                    moves.append(field)
+            elif self.en_passant_victim(field):
                 moves.append(field)
         return moves
 
+    @property
+    def attacked_fields(self):
+        """Return both forward diagonal fields, whether occupied or not."""
+        return self._fields_in_directions(self.capture_directions, 1)
+
     def move(self, field):
         """
         Move to given field.
@@ -96,8 +168,7 @@ class Pawn(Figure):
         """
 
         self.can_be_taken_en_passant = False
-        if (field in self.legal_moves and
-                field in self._fields_in_directions([self.move_direction], 2)):
+        if field in self._forward_moves():
             super(Pawn, self).move(field)
             self._finish_turn()
         else:
@@ -105,32 +176,27 @@ class Pawn(Figure):
                                        "capturing.")
 
     def capture(self, field):
-        """Capture piece if legal, diagonally adjacent or en passant."""
-        if self.color == "white":
-            capture_directions = ("above_left", "above_right")
-            en_passant_direction = "below"
-        else:
-            capture_directions = ("below_left", "below_right")
-            en_passant_direction = "above"
+        """
+        Capture piece if legal, diagonally adjacent or en passant.
 
-        if field not in self._fields_in_directions(capture_directions, 1):
+        As in move, can_be_taken_en_passant is set to False, as only a pawn
+        that has just jumped two squares can be taken en passant.
+        """
+        if field not in self.attacked_fields:
             raise IllegalCaptureError("Pawns can only capture forward "
                                       "diagonally.")
+        self.can_be_taken_en_passant = False
 
-        # En passant
-        if not field.figure and self.en_passant_ready:
-            field.receive_figure(self)
-            capture_position = self._fields_in_directions(
-                                                 [en_passant_direction], 1)[0]
-            capture_figure = capture_position.figure
-            if (isinstance(capture_figure, Pawn) and
-                capture_figure.can_be_taken_en_passant and
-                capture_figure.last_moved == (
-                                  self.position.chessboard.current_move - 1)):
-                captured_figure = super(Pawn, self).capture(capture_position)
-                field.receive_figure(self)
         # Normal capture
-        else:
+        if field.figure:
             captured_figure = super(Pawn, self).capture(field)
+        # En passant
+        else:
+            captured_figure = self.en_passant_victim(field)
+            if not captured_figure:
+                raise IllegalCaptureError("There is no figure to capture.")
+            captured_figure.position.figure = None
+            captured_figure.position = None
+            field.receive_figure(self)
         self._finish_turn()
         return captured_figure
@@ -11,6 +11,10 @@ class Queen(Figure):
     start_position = {"white": ["D1"],
                       "black": ["D8"]}
 
+    symbol = "Q"
+
+    __slots__ = ()
+
     def __str__(self):
         if self.color == "white":
             string = "♕"
@@ -18,8 +22,7 @@ class Queen(Figure):
             string = "♛"
         return string
 
-    @property
-    def legal_moves(self):
+    def _reachable_fields(self):
         """Return legal moves from current position."""
         return self._fields_in_directions(("to_left", "to_right", "above",
                                            "below", "above_right",
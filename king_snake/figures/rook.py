@@ -11,8 +11,12 @@ class Rook(Figure):
     start_position = {"white": ["A1", "H1"],
                       "black": ["A8", "H8"]}
 
-    def __init__(self, player):
-        super(Rook, self).__init__(player)
+    symbol = "R"
+
+    __slots__ = ()
+
+    def __init__(self, player, position=None):
+        super(Rook, self).__init__(player, position)
 
     def __str__(self):
         if self.color == "white":
@@ -21,8 +25,7 @@ class Rook(Figure):
             string = "♜"
         return string
 
-    @property
-    def legal_moves(self):
+    def _reachable_fields(self):
         """Return legal moves from current position."""
         return self._fields_in_directions(("to_left", "to_right", "above",
                                            "below"))
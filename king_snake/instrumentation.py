@@ -0,0 +1,233 @@
+"""
+Counting and timing the hot paths of move validation.
+
+Instrumentation is switched on per chessboard:
+
+    with instrumented(chessboard):
+        ...play...
+    for name, timing in sorted(chessboard.stats().items()):
+        ...
+
+While any chessboard is instrumented, the methods in TARGETS are replaced by
+wrappers that time each call and record it with the chessboard the call
+belongs to. Afterwards the original methods are put back, so code that is
+not instrumented runs exactly as before and pays nothing. Calls of figures'
+legal_moves and of _find_moves, which computes the moves behind it, are
+recorded per kind of figure, e.g. as "Figure.legal_moves N".
+
+Times include those of the instrumented calls made within, e.g. Player.move
+includes the threatened_by calls that check the king's safety. Each timing
+also has a histogram of the calls' durations, in which bucket n counts the
+calls taking less than 2 ** n microseconds but at least half that.
+
+StackProfiler records whole call stacks instead, in the folded format read
+by flame graph tools.
+"""
+
+from collections import defaultdict, namedtuple
+from contextlib import contextmanager
+import os
+import sys
+from timeit import default_timer
+
+from king_snake.chessboard import Chessboard, Field
+from king_snake.figures.figure import Figure
+from king_snake.player import Player
+
+Timing = namedtuple("Timing", ("calls", "seconds", "histogram"))
+
+
+def _figure_chessboard(figure):
+    """Return chessboard figure is on."""
+    return figure.player.chessboard
+
+# Class, attribute, function returning the chessboard of the instance and
+# whether calls are told apart by figure symbol. Figure._find_moves computes
+# the moves behind legal_moves, attacked_fields and pseudo_legal_moves.
+TARGETS = ((Player, "move", lambda player: player.chessboard, False),
+           (Player, "make_move", lambda player: player.chessboard, False),
+           (Figure, "legal_moves", _figure_chessboard, True),
+           (Figure, "_find_moves", _figure_chessboard, True),
+           (Figure, "_fields_in_directions", _figure_chessboard, False),
+           (Field, "threatened_by", lambda field: field.chessboard, False),
+           (Chessboard, "rollback", lambda chessboard: chessboard, False))
+
+# Original attributes of TARGETS while they are replaced
+_originals = dict()
+# Number of chessboards being instrumented
+_instrumented = 0
+
+
+class Recorder(object):
+
+    """Calls and their durations recorded for one chessboard."""
+
+    __slots__ = ("active", "calls", "seconds", "histograms")
+
+    def __repr__(self):
+        return "Recorder()"
+
+    def __init__(self):
+        self.active = True
+        self.calls = defaultdict(int)
+        self.seconds = defaultdict(float)
+        self.histograms = dict()
+
+    def record(self, name, seconds):
+        """Count call of name that took seconds."""
+        self.calls[name] += 1
+        self.seconds[name] += seconds
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = [0] * 32
+        histogram[min(int(seconds * 1000000).bit_length(), 31)] += 1
+
+    def timings(self):
+        """Return dictionary of Timing by name."""
+        return dict((name, Timing(calls, self.seconds[name],
+                                  tuple(self.histograms[name])))
+                    for name, calls in self.calls.items())
+
+
+def _timed(name, function, get_chessboard, by_symbol=False):
+    """Return wrapper of function that records its calls."""
+
+    def wrapper(self, *arguments, **keywords):
+        recorder = get_chessboard(self)._recorder
+        if recorder is None or not recorder.active:
+            return function(self, *arguments, **keywords)
+        started = default_timer()
+        try:
+            return function(self, *arguments, **keywords)
+        finally:
+            recorder.record(name + " " + self.symbol if by_symbol else name,
+                            default_timer() - started)
+
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+
+def _install():
+    """Replace TARGETS with wrappers that record their calls."""
+    for cls, attribute, get_chessboard, by_symbol in TARGETS:
+        original = cls.__dict__[attribute]
+        _originals[cls, attribute] = original
+        name = "{}.{}".format(cls.__name__, attribute)
+        if isinstance(original, property):
+            replacement = property(_timed(name, original.fget,
+                                          get_chessboard, by_symbol),
+                                   doc=original.__doc__)
+        else:
+            replacement = _timed(name, original, get_chessboard, by_symbol)
+        setattr(cls, attribute, replacement)
+
+
+def _uninstall():
+    """Put the original TARGETS back."""
+    for (cls, attribute), original in _originals.items():
+        setattr(cls, attribute, original)
+    _originals.clear()
+
+
+def start(chessboard):
+    """Start recording calls for chessboard, see Chessboard.stats."""
+    global _instrumented
+    if chessboard._recorder is not None and chessboard._recorder.active:
+        return
+    if not _instrumented:
+        _install()
+    _instrumented += 1
+    chessboard._recorder = Recorder()
+
+
+def stop(chessboard):
+    """
+    Stop recording calls for chessboard.
+
+    The recorded stats stay available until recording is started again.
+    """
+    global _instrumented
+    if chessboard._recorder is None or not chessboard._recorder.active:
+        return
+    chessboard._recorder.active = False
+    _instrumented -= 1
+    if not _instrumented:
+        _uninstall()
+
+
+@contextmanager
+def instrumented(chessboard):
+    """Record calls for chessboard within the with block and return it."""
+    start(chessboard)
+    try:
+        yield chessboard
+    finally:
+        stop(chessboard)
+
+
+def format_stats(timings):
+    """Return table of timings by name, the most time consuming first."""
+    lines = ["{:<36} {:>10} {:>10} {:>10}".format("call", "calls", "seconds",
+                                                 "us/call")]
+    for name, timing in sorted(timings.items(),
+                               key=lambda item: -item[1].seconds):
+        lines.append("{:<36} {:>10} {:>10.3f} {:>10.1f}".format(
+                     name, timing.calls, timing.seconds,
+                     1000000 * timing.seconds / timing.calls))
+    return "\n".join(lines)
+
+
+class StackProfiler(object):
+
+    """
+    Deterministic profiler recording time per call stack.
+
+    Used as a context manager, it records the time spent in each function,
+    not counting the functions it calls, together with the stack of callers
+    that led to it. write saves the result in folded format, one stack per
+    line with the frames separated by ";" and followed by microseconds.
+    """
+
+    def __repr__(self):
+        return "StackProfiler()"
+
+    def __init__(self):
+        self.stacks = defaultdict(float)
+        # Stack, start time and time spent in callees of each active call
+        self._calls = []
+
+    def __enter__(self):
+        sys.setprofile(self._profile)
+        return self
+
+    def __exit__(self, *exception):
+        sys.setprofile(None)
+
+    def _profile(self, frame, event, argument):
+        now = default_timer()
+        if event == "call" or event == "c_call":
+            if event == "call":
+                code = frame.f_code
+                name = "{}:{}".format(os.path.basename(code.co_filename),
+                                      code.co_name)
+            else:
+                name = getattr(argument, "__name__", "?")
+            if self._calls:
+                name = self._calls[-1][0] + ";" + name
+            self._calls.append([name, now, 0.0])
+        elif self._calls:
+            # A return, possibly by an exception
+            stack, started, callees = self._calls.pop()
+            elapsed = now - started
+            self.stacks[stack] += elapsed - callees
+            if self._calls:
+                self._calls[-1][2] += elapsed
+
+    def write(self, file_name):
+        """Write stacks to file_name in folded format."""
+        with open(file_name, "w") as folded:
+            for stack, seconds in sorted(self.stacks.items()):
+                microseconds = int(seconds * 1000000)
+                if microseconds:
+                    folded.write("{} {}\n".format(stack, microseconds))
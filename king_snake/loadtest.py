@@ -0,0 +1,161 @@
+"""
+Load testing a game server with stand-ins for its players.
+
+Each stand-in is one connection that plays several games at once, both
+colors of each, by replaying games prepared beforehand, so the time measured
+is spent in the server and not in choosing moves. A stand-in sends a game's
+next move as soon as the server has confirmed the previous one with a BOARD
+line, and the time in between is that move's latency. As soon as a game is
+over, the stand-in starts the next one until the requested number of games
+has been played.
+"""
+
+import asynchat
+import asyncore
+from collections import deque, namedtuple
+import random
+import socket
+import time
+
+from king_snake.chessboard import Chessboard
+from king_snake.player import Player
+
+LoadResult = namedtuple("LoadResult", ("games", "moves", "errors", "seconds",
+                                       "latencies"))
+
+
+def random_games(count, seed=0):
+    """
+    Return count lists of the moves of games played with random moves.
+
+    The games are played until they are over, which the fifty-move rule
+    guarantees to happen.
+    """
+    generator = random.Random(seed)
+    games = []
+    for number in range(count):
+        chessboard = Chessboard({"white": Player(), "black": Player()},
+                                bitboards=True)
+        while not chessboard.outcome():
+            move = generator.choice(list(chessboard.generate_legal_moves()))
+            chessboard.current_player.move(*move)
+        games.append(list(chessboard.move_history))
+    return games
+
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of values lie."""
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class _LoadTest(object):
+
+    """Games still to be started and measurements of all stand-ins."""
+
+    def __init__(self, games, scripts):
+        self.games_left = games
+        self.scripts = scripts
+        self.games = 0
+        self.errors = 0
+        self.latencies = []
+
+    def next_script(self):
+        """Return moves of the next game to play or None if all started."""
+        if not self.games_left:
+            return None
+        self.games_left -= 1
+        return self.scripts[self.games_left % len(self.scripts)]
+
+
+class _StandIn(asynchat.async_chat):
+
+    """A connection playing several games from their scripts."""
+
+    def __init__(self, address, load, concurrent, socket_map):
+        asynchat.async_chat.__init__(self, map=socket_map)
+        if isinstance(address, tuple):
+            self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+        else:
+            self.create_socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.set_terminator("\n")
+        self.load = load
+        self.concurrent = concurrent
+        # Scripts of the games requested with NEW, in order
+        self.requested = deque()
+        # Script, number of moves played and time the last move was sent of
+        # each game by number
+        self.playing = dict()
+        self._received = []
+        self.connect(address)
+
+    def handle_connect(self):
+        for game in range(self.concurrent):
+            self._start_game()
+
+    def _start_game(self):
+        """Ask for a new game or hang up if all games have been started."""
+        script = self.load.next_script()
+        if script:
+            self.requested.append(script)
+            self.push("NEW\n")
+        elif not self.playing and not self.requested:
+            self.close()
+
+    def _send_move(self, number):
+        """Send next move of game with given number."""
+        state = self.playing[number]
+        move = state[0][state[1]]
+        state[2] = time.time()
+        self.push("MOVE {} {}\n".format(number, " ".join(move)))
+
+    def _finish_game(self, number):
+        del self.playing[number]
+        self.load.games += 1
+        self._start_game()
+
+    def collect_incoming_data(self, data):
+        self._received.append(data)
+
+    def found_terminator(self):
+        words = "".join(self._received).split()
+        self._received = []
+        if words[0] == "GAME":
+            number = int(words[1])
+            self.playing[number] = [self.requested.popleft(), 0, None]
+            self._send_move(number)
+        elif words[0] == "BOARD":
+            state = self.playing[int(words[1])]
+            self.load.latencies.append(time.time() - state[2])
+            state[1] += 1
+            if state[1] < len(state[0]):
+                self._send_move(int(words[1]))
+        elif words[0] == "OVER":
+            self._finish_game(int(words[1]))
+        elif words[0] == "ERROR":
+            # The scripts are legal, so the server is at fault. Its games
+            # cannot go on, so the stand-in gives up.
+            self.load.errors += 1
+            self.close()
+
+
+def run_load_test(address, games=1000, connections=10, concurrent=10,
+                  scripts=None):
+    """
+    Play games against the server on address and return a LoadResult.
+
+    connections stand-ins each play up to concurrent games at the same time
+    until games games have been played. The games are replayed from
+    scripts, lists of moves as returned by random_games that each play a
+    game to its end, which by default are ten random games. latencies holds
+    the seconds each move took to be confirmed.
+    """
+    scripts = scripts or random_games(10)
+    load = _LoadTest(games, scripts)
+    socket_map = dict()
+    started = time.time()
+    for connection in range(connections):
+        _StandIn(address, load, concurrent, socket_map)
+    asyncore.loop(use_poll=True, map=socket_map)
+    return LoadResult(load.games, len(load.latencies), load.errors,
+                      time.time() - started, load.latencies)
@@ -0,0 +1,67 @@
+"""
+Moves encoded as integers.
+
+A move is a small int, cheap to create, compare, hash and store. From the
+lowest bit on, it holds 6 bits for the index of the start field, 6 for the
+goal field, 4 for flags telling what kind of move it is and 3 for the figure
+a pawn is promoted to, 0 if none. Field indices are those of Field.index.
+
+Player.generate_moves yields encoded moves and Player.make_move makes them,
+choosing what to do from the flags alone. Player.move takes moves in
+coordinates such as ("E7", "E8", "N") as before, and to_coordinates turns an
+encoded move into that form.
+"""
+
+from king_snake.chessboard import FIELD_NAMES
+
+# Flags of the kinds of moves. A move without flags goes to a free field.
+CAPTURE = 1
+EN_PASSANT = 2
+CASTLE = 4
+PROMOTION = 8
+
+# Symbols of the figures a pawn can be promoted to, by their code from 1
+PROMOTION_SYMBOLS = (None, "Q", "R", "B", "N")
+_PROMOTION_CODES = dict((symbol, code) for code, symbol in
+                        enumerate(PROMOTION_SYMBOLS) if symbol)
+
+
+def encode(start, goal, flags=0, promotion=None):
+    """
+    Return move from field index start to goal.
+
+    promotion is the symbol of the figure a pawn is promoted to, which also
+    sets the PROMOTION flag.
+    """
+    if promotion:
+        return (start | goal << 6 | (flags | PROMOTION) << 12 |
+                _PROMOTION_CODES[promotion] << 16)
+    return start | goal << 6 | flags << 12
+
+
+def start_index(move):
+    """Return index of move's start field."""
+    return move & 63
+
+
+def goal_index(move):
+    """Return index of move's goal field."""
+    return move >> 6 & 63
+
+
+def move_flags(move):
+    """Return move's flags."""
+    return move >> 12 & 15
+
+
+def promotion_symbol(move):
+    """Return symbol of the figure a pawn is promoted to or None."""
+    return PROMOTION_SYMBOLS[move >> 16]
+
+
+def to_coordinates(move):
+    """Return move as a tuple for Player.move, e.g. ("E7", "E8", "N")."""
+    coordinates = FIELD_NAMES[move & 63], FIELD_NAMES[move >> 6 & 63]
+    if move >> 16:
+        return coordinates + (PROMOTION_SYMBOLS[move >> 16],)
+    return coordinates
@@ -0,0 +1,206 @@
+"""
+Searching one position with several processes at once.
+
+Threads cannot search in parallel while they hold the interpreter lock, so
+ParallelEngine starts helper processes next to its own search ("lazy SMP").
+All of them search the same position and share one transposition table in
+shared memory. A process that reaches a position another one has already
+searched takes the stored result instead of searching again. So that the
+helpers do not merely repeat the engine's work, each of them tries the moves
+at the root in a different order, and every other helper searches one ply
+deeper than the engine's current iteration, filling the table with results
+the engine needs next. When the engine's own search ends, the helpers are
+stopped and the engine's result is returned with the nodes of all processes
+counted.
+
+The shared table is read and written without locks. A slot holds the entry
+packed into one 64 bit number and the position key XORed with it. If two
+processes write a slot at the same time, or one reads it while another
+writes, the key no longer matches the entry and the slot counts as empty.
+"""
+
+import ctypes
+import multiprocessing
+
+from king_snake.engine import (INFINITY, Engine, TranspositionTable,
+                               _BudgetExhausted)
+from king_snake.evaluation import evaluate
+
+# Depth the helpers search to unless they are stopped first
+MAX_DEPTH = 100
+# Nodes a helper searches between looking whether it has to stop
+STOP_INTERVAL = 128
+
+
+def _pack(depth, score, kind, move, generation):
+    """
+    Return table entry packed into a non-zero 64 bit number.
+
+    From the lowest bit on, it holds 8 bits of depth, 2 of kind, 21 of score
+    offset by INFINITY, 20 of the encoded move plus 1, which leaves 0 for no
+    move, and 12 of the generation.
+    """
+    code = 0 if move is None else move + 1
+    return (depth | kind << 8 | (score + INFINITY) << 10 | code << 31 |
+            (generation & 0xFFF) << 51)
+
+
+def _unpack(data):
+    """Return (depth, score, kind, move, generation) packed by _pack."""
+    code = data >> 31 & 0xFFFFF
+    return (data & 0xFF, (data >> 10 & 0x1FFFFF) - INFINITY, data >> 8 & 3,
+            code - 1 if code else None, data >> 51)
+
+
+class SharedTranspositionTable(TranspositionTable):
+
+    """
+    TranspositionTable in shared memory that processes can use at once.
+
+    The table is shared with the processes it is handed to when they are
+    started. Moves stored in it are encoded as in king_snake.moves.
+    """
+
+    def __repr__(self):
+        return "SharedTranspositionTable({})".format(len(self.keys))
+
+    def __init__(self, size=2 ** 16):
+        """Create table with size slots, rounded up to a power of two."""
+        slots = 1 << max(size - 1, 0).bit_length()
+        self.mask = slots - 1
+        # Position key XORed with the packed entry of each slot
+        self.keys = multiprocessing.RawArray(ctypes.c_uint64, slots)
+        self.entries = multiprocessing.RawArray(ctypes.c_uint64, slots)
+        self.generation = 0
+
+    def probe(self, key):
+        """Return (depth, score, kind, move) stored for key or None."""
+        slot = key & self.mask
+        data = self.entries[slot]
+        if data and self.keys[slot] ^ data == key:
+            return _unpack(data)[:4]
+
+    def store(self, key, depth, score, kind, move):
+        """Store search result for key if the replacement policy allows."""
+        slot = key & self.mask
+        data = self.entries[slot]
+        entry = data and _unpack(data)
+        if (not entry or self.keys[slot] ^ data == key or
+                entry[4] != self.generation & 0xFFF or depth >= entry[0]):
+            data = _pack(depth, score, kind, move, self.generation)
+            self.entries[slot] = data
+            self.keys[slot] = key ^ data
+
+
+class _Helper(Engine):
+
+    """
+    Engine that stops searching as soon as a shared flag is set.
+
+    The helper with the given number deepens its search along with the
+    engine's current depth, shared in main_depth, and one ply beyond it if
+    its number is odd. At the root, it rotates the moves after the most
+    promising one by its number.
+    """
+
+    def __init__(self, stop, evaluation, main_depth, number):
+        super(_Helper, self).__init__(1, evaluation)
+        self.stop = stop
+        self.main_depth = main_depth
+        self.number = number
+
+    def _count_node(self):
+        super(_Helper, self)._count_node()
+        if not self.nodes % STOP_INTERVAL and self.stop.value:
+            raise _BudgetExhausted()
+
+    def _iterations(self, depth):
+        iteration = 0
+        while iteration < depth:
+            iteration = min(max(iteration + 1, self.main_depth.value +
+                                self.number % 2), depth)
+            yield iteration
+
+    def _order(self, chessboard, moves, table_move, ply):
+        moves = super(_Helper, self)._order(chessboard, moves, table_move,
+                                            ply)
+        if ply or len(moves) < 3:
+            return moves
+        shift = self.number % (len(moves) - 1)
+        return moves[:1] + moves[1 + shift:] + moves[1:1 + shift]
+
+
+def _help(table, evaluation, chessboard, stop, main_depth, counts, number):
+    """Search chessboard until stop is set and count the nodes in counts."""
+    engine = _Helper(stop, evaluation, main_depth, number)
+    engine.table = table
+    try:
+        engine.search(chessboard, MAX_DEPTH)
+    finally:
+        counts[number] = engine.nodes
+
+
+class ParallelEngine(Engine):
+
+    """Engine searching together with helper processes."""
+
+    table_class = SharedTranspositionTable
+
+    def __repr__(self):
+        return "ParallelEngine({})".format(self.processes)
+
+    def __init__(self, processes=None, table_size=2 ** 16,
+                 evaluation=evaluate):
+        """
+        Create engine searching with the given number of processes.
+
+        processes defaults to the number of CPUs and includes the process
+        calling search. See Engine for the other arguments.
+        """
+        super(ParallelEngine, self).__init__(table_size, evaluation)
+        self.processes = processes or multiprocessing.cpu_count()
+        # Depth of the current iteration, shared with the helpers
+        self._main_depth = None
+
+    def __getstate__(self):
+        """Leave out the table and move ordering data when pickling."""
+        return self.processes, len(self.table.keys), self.evaluation
+
+    def _iterations(self, depth):
+        for iteration in super(ParallelEngine, self)._iterations(depth):
+            if self._main_depth is not None:
+                self._main_depth.value = iteration
+            yield iteration
+
+    def search(self, chessboard, depth=None, seconds=None, nodes=None):
+        """
+        Search like Engine.search while helper processes search alongside.
+
+        The helpers search the same position until this search is over. The
+        result is that of this search, but its nodes include those of the
+        helpers. A nodes limit only counts the nodes of this search.
+        """
+        if self.processes < 2:
+            return super(ParallelEngine, self).search(chessboard, depth,
+                                                      seconds, nodes)
+        stop = multiprocessing.RawValue(ctypes.c_bool, False)
+        self._main_depth = multiprocessing.RawValue(ctypes.c_int, 1)
+        counts = multiprocessing.RawArray(ctypes.c_uint64, self.processes)
+        helpers = []
+        try:
+            for number in range(1, self.processes):
+                helper = multiprocessing.Process(
+                             target=_help,
+                             args=(self.table, self.evaluation, chessboard,
+                                   stop, self._main_depth, counts, number))
+                helper.daemon = True
+                helper.start()
+                helpers.append(helper)
+            result = super(ParallelEngine, self).search(chessboard, depth,
+                                                        seconds, nodes)
+        finally:
+            stop.value = True
+            for helper in helpers:
+                helper.join()
+            self._main_depth = None
+        return result._replace(nodes=result.nodes + sum(counts))
@@ -0,0 +1,102 @@
+"""
+Perft node counting for move generation benchmarks and regression checks.
+
+Perft walks the tree of all legal moves down to a fixed depth and counts the
+positions it reaches. The counts for well known positions have been
+established independently, so any difference points to a rule error, while
+the time needed measures move generation throughput.
+"""
+
+import time
+
+from king_snake.chessboard import Chessboard
+from king_snake.fen import START_FEN, from_fen
+from king_snake.moves import to_coordinates
+from king_snake.player import Player
+
+# FEN of well known test positions
+POSITIONS = {"start": START_FEN,
+             "kiwipete": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/"
+                         "R3K2R w KQkq - 0 1",
+             "endgame": "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+             "promotions": "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/"
+                           "R2Q1RK1 w kq - 0 1",
+             "middlegame": "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w "
+                           "KQ - 1 8"}
+
+# Established node counts for depths 1, 2, 3, ... of known positions
+KNOWN_RESULTS = {"start": (20, 400, 8902, 197281, 4865609),
+                 "kiwipete": (48, 2039, 97862, 4085603),
+                 "endgame": (14, 191, 2812, 43238, 674624),
+                 "promotions": (6, 264, 9467, 422333),
+                 "middlegame": (44, 1486, 62379, 2103487)}
+
+
+def new_board(bitboards=False, fen=None):
+    """
+    Return chessboard with two new players.
+
+    The chessboard is in the starting position or in the position described
+    by fen.
+    """
+    if fen:
+        return from_fen(fen, bitboards=bitboards)
+    return Chessboard({"white": Player(), "black": Player()},
+                      bitboards=bitboards)
+
+
+def perft(chessboard, depth):
+    """Return number of positions reachable from chessboard in depth moves."""
+    if depth == 0:
+        return 1
+    nodes = 0
+    if depth == 1:
+        for move in chessboard.generate_moves():
+            nodes += 1
+        return nodes
+    for move in chessboard.generate_moves():
+        chessboard.current_player.make_move(move)
+        nodes += perft(chessboard, depth - 1)
+        chessboard.rollback()
+    return nodes
+
+
+def divide(chessboard, depth):
+    """
+    Return perft node counts below each legal move as a dictionary.
+
+    The moves are given as tuples for Player.move.
+    """
+    counts = dict()
+    for move in chessboard.generate_moves():
+        chessboard.current_player.make_move(move)
+        counts[to_coordinates(move)] = perft(chessboard, depth - 1)
+        chessboard.rollback()
+    return counts
+
+
+def benchmark(chessboard, depths):
+    """
+    Run perft for each depth and yield (depth, nodes, seconds) tuples.
+
+    Dividing nodes by seconds gives the move generation speed.
+    """
+    for depth in depths:
+        started = time.time()
+        nodes = perft(chessboard, depth)
+        yield depth, nodes, time.time() - started
+
+
+def check(chessboard, expected):
+    """
+    Compare perft results with expected node counts.
+
+    expected holds the counts for depths 1, 2, ... Return list of
+    (depth, expected, found) tuples for all depths that differ.
+    """
+    errors = []
+    for depth, nodes in enumerate(expected, 1):
+        found = perft(chessboard, depth)
+        if found != nodes:
+            errors.append((depth, nodes, found))
+    return errors
@@ -0,0 +1,319 @@
+"""
+Reading and writing games in Portable Game Notation.
+
+PGN files are read line by line, so archives of any size can be streamed with
+constant memory. Files ending in .gz or .bz2 are decompressed on the fly.
+Moves are given in Standard Algebraic Notation (SAN), e.g. "Nf3", "exd5",
+"O-O" or "e8=Q+", and are resolved against the position on a Chessboard.
+
+read_games combines the steps: parse_games splits a stream of lines into the
+tag pairs and SAN moves of each game, and replay_game plays the moves on a
+new chessboard, stopping at the first illegal move. to_pgn writes the moves
+of a chessboard's move history in PGN again.
+"""
+
+import bz2
+from collections import namedtuple, OrderedDict
+import gzip
+import re
+
+from king_snake.chessboard import Chessboard
+from king_snake.errors import ChessError, NotationError
+from king_snake.fen import from_fen
+from king_snake.player import Player
+
+# Tags every PGN game has, in the order they are written
+SEVEN_TAG_ROSTER = (("Event", "?"), ("Site", "?"), ("Date", "????.??.??"),
+                    ("Round", "?"), ("White", "?"), ("Black", "?"),
+                    ("Result", "*"))
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+Game = namedtuple("Game", ("headers", "san", "moves", "result", "chessboard",
+                           "error"))
+
+# The value runs to the last quote, as some writers do not escape quotes
+_TAG = re.compile(r'\s*\[\s*(\w+)\s*"(.*)"\s*\]')
+_TOKEN = re.compile(r"\{[^}]*\}?|;.*|\$\d+|1-0|0-1|1/2-1/2|\*|\d+\.+|[()]|"
+                    r"[^\s{};()$]+")
+_MOVE_NUMBER = re.compile(r"\d+\.+$")
+_SAN = re.compile(r"([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])"
+                  r"(?:=?([NBRQ]))?[+#]?[!?]*$")
+_CASTLING = re.compile(r"([O0]-[O0](?:-[O0])?)[+#]?[!?]*$")
+
+
+def open_pgn(file_name, mode="r"):
+    """Open PGN file, compressed with gzip or bzip2 if its name says so."""
+    if file_name.endswith(".gz"):
+        return gzip.open(file_name, mode + "b")
+    if file_name.endswith(".bz2"):
+        return bz2.BZ2File(file_name, mode + "b")
+    return open(file_name, mode)
+
+
+def parse_games(lines):
+    """
+    Yield (headers, san, result) for each game in an iterable of PGN lines.
+
+    headers is an ordered dictionary of the game's tag pairs and san the list
+    of its moves in SAN. Comments, variations, annotation glyphs and move
+    numbers are skipped. result is the game termination marker, or the
+    Result tag if the movetext has none.
+    """
+    headers, san, result = OrderedDict(), [], None
+    in_comment = False
+    variation_depth = 0
+    for line in lines:
+        if in_comment:
+            end = line.find("}")
+            if end < 0:
+                continue
+            line = line[end + 1:]
+            in_comment = False
+        elif line.startswith("%"):
+            continue
+        elif line.lstrip().startswith("["):
+            if san or result:
+                yield headers, san, result or headers.get("Result", "*")
+                headers, san, result = OrderedDict(), [], None
+                variation_depth = 0
+            tag = _TAG.match(line)
+            if tag:
+                headers[tag.group(1)] = re.sub(r"\\(.)", r"\1", tag.group(2))
+            continue
+        for token in _TOKEN.findall(line):
+            if token[0] == "{":
+                in_comment = not token.endswith("}")
+            elif token[0] in ";$" or _MOVE_NUMBER.match(token):
+                continue
+            elif token == "(":
+                variation_depth += 1
+            elif token == ")":
+                variation_depth = max(variation_depth - 1, 0)
+            elif variation_depth:
+                continue
+            elif token in RESULTS:
+                yield headers, san, token
+                headers, san, result = OrderedDict(), [], None
+            else:
+                san.append(token)
+    if headers or san:
+        yield headers, san, result or headers.get("Result", "*")
+
+
+def new_board(headers=None, bitboards=False):
+    """Return chessboard in the starting position of a game's headers."""
+    if headers and "FEN" in headers:
+        return from_fen(headers["FEN"], bitboards=bitboards)
+    return Chessboard({"white": Player(), "black": Player()},
+                      bitboards=bitboards)
+
+
+def replay_game(headers, san, result="*", chessboard=None, bitboards=False):
+    """
+    Play a game's SAN moves and return it as a Game.
+
+    The moves are played on chessboard, which must be in the game's starting
+    position, or on a new chessboard. The Game's moves are the moves played,
+    as in the chessboard's move history. If a move cannot be read or is
+    illegal, the game stops there and its error is the ChessError raised,
+    otherwise error is None.
+    """
+    if chessboard is None:
+        chessboard = new_board(headers, bitboards)
+    moves = []
+    error = None
+    for text in san:
+        try:
+            move = parse_san(chessboard, text)
+            chessboard.current_player.move(*move)
+        except ChessError as move_error:
+            error = move_error
+            break
+        moves.append(chessboard.move_history[-1])
+    return Game(headers, san, moves, result, chessboard, error)
+
+
+def read_games(source, bitboards=False):
+    """
+    Yield each game in a PGN file as a Game with its moves played.
+
+    source is a file name or an iterable of lines. Only one game is held in
+    memory at a time.
+    """
+    if isinstance(source, str):
+        with open_pgn(source) as lines:
+            for game in read_games(lines, bitboards):
+                yield game
+        return
+    for headers, san, result in parse_games(source):
+        yield replay_game(headers, san, result, bitboards=bitboards)
+
+
+def parse_san(chessboard, text):
+    """
+    Return move of the current player given in SAN as a tuple.
+
+    The tuple holds start and goal field and, for a promotion, the symbol
+    of the promoted figure, so it can be passed on to Player.move. Raise
+    NotationError if the text is no SAN or does not match exactly one legal
+    move.
+    """
+    player = chessboard.current_player
+    castling = _CASTLING.match(text)
+    if castling:
+        row = player.king.start_position[player.color][0][1]
+        if len(castling.group(1)) == 3:
+            return player.king.position.name, "G" + row
+        return player.king.position.name, "C" + row
+
+    match = _SAN.match(text)
+    if not match:
+        raise NotationError("Not a move in SAN: {}".format(text))
+    symbol, letter, number, goal, promotion = match.groups()
+    if not symbol:
+        # Pawns move straight unless they capture, which names their column
+        symbol = "P"
+        letter = letter or goal[0]
+    goal = chessboard.fields[goal.upper()]
+    candidates = []
+    for figure in player.figures:
+        start = figure.position
+        if (figure.symbol != symbol or not figure.on_board or
+                letter and start.name[0] != letter.upper() or
+                number and start.name[1] != number or
+                goal not in figure.pseudo_legal_moves):
+            continue
+        candidates.append(figure)
+    if len(candidates) > 1:
+        candidates = [figure for figure in candidates
+                      if _is_legal(chessboard, figure.position, goal)]
+    if len(candidates) != 1:
+        raise NotationError("{} matches {} moves.".format(text,
+                                                          len(candidates)))
+    move = candidates[0].position.name, goal.name
+    if symbol == "P" and goal.number == candidates[0].last_row:
+        move += (promotion or "Q",)
+    return move
+
+
+def _is_legal(chessboard, start, goal):
+    """Test if the current player may move from start to goal."""
+    try:
+        chessboard.current_player.move(start.name, goal.name)
+    except ChessError:
+        return False
+    chessboard.rollback()
+    return True
+
+
+def san(chessboard, move):
+    """
+    Return SAN of a legal move of the current player.
+
+    move is a tuple as in the move history. A check or checkmate the move
+    gives is marked with "+" or "#".
+    """
+    start, goal = chessboard.fields[move[0]], chessboard.fields[move[1]]
+    figure = start.figure
+    if figure.symbol == "K" and abs(goal.letter - start.letter) == 2:
+        text = "O-O" if goal.letter > start.letter else "O-O-O"
+    elif figure.symbol == "P":
+        text = goal.name.lower()
+        if start.letter != goal.letter:
+            text = start.name[0].lower() + "x" + text
+        if goal.number == figure.last_row:
+            text += "=" + (move[2] if len(move) > 2 else "Q")
+    else:
+        text = figure.symbol + _disambiguation(chessboard, figure, goal)
+        if goal.figure:
+            text += "x"
+        text += goal.name.lower()
+
+    chessboard.current_player.move(*move)
+    player = chessboard.current_player
+    if player.king.in_check:
+        text += "+" if player.has_legal_move() else "#"
+    chessboard.rollback()
+    return text
+
+
+def _disambiguation(chessboard, figure, goal):
+    """Return column or row needed to tell figure's move to goal apart."""
+    rivals = [rival.position for rival in figure.player.figures
+              if rival is not figure and rival.symbol == figure.symbol and
+              rival.on_board and goal in rival.pseudo_legal_moves and
+              _is_legal(chessboard, rival.position, goal)]
+    if not rivals:
+        return ""
+    start = figure.position
+    if all(rival.letter != start.letter for rival in rivals):
+        return start.name[0].lower()
+    if all(rival.number != start.number for rival in rivals):
+        return start.name[1]
+    return start.name.lower()
+
+
+def game_result(chessboard):
+    """Return result of the game on chessboard as a PGN result."""
+    outcome = chessboard.outcome()
+    return outcome.result if outcome else "*"
+
+
+def to_pgn(chessboard, headers=None):
+    """
+    Return PGN of the game on chessboard.
+
+    The moves are taken from the chessboard's move history and replayed from
+    its initial position. headers are added to the seven tag roster, whose
+    Result tag defaults to the outcome of the final position.
+    """
+    tags = OrderedDict(SEVEN_TAG_ROSTER)
+    tags["Result"] = game_result(chessboard)
+    if chessboard.initial_fen:
+        tags["SetUp"] = "1"
+        tags["FEN"] = chessboard.initial_fen
+    tags.update(headers or {})
+    lines = ['[{} "{}"]'.format(name, value.replace("\\", "\\\\")
+                                           .replace('"', '\\"'))
+             for name, value in tags.items()]
+    lines.append("")
+
+    replay = new_board(tags)
+    tokens = []
+    for move in chessboard.move_history:
+        if replay.current_player.color == "white" or not tokens:
+            dots = "." if replay.current_player.color == "white" else "..."
+            tokens.append("{}{}".format((replay.current_move + 1) // 2, dots))
+        tokens.append(san(replay, move))
+        replay.current_player.move(*move)
+    tokens.append(tags["Result"])
+
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 79:
+            lines.append(line)
+            line = token
+        else:
+            line = line + " " + token if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def write_games(destination, chessboards, headers=None):
+    """
+    Write the games on chessboards to a PGN file, one after the other.
+
+    destination is a file name, compressed by its ending as in open_pgn, or
+    a writable file. headers is a function called with each chessboard that
+    returns its tag pairs, or None.
+    """
+    if isinstance(destination, str):
+        with open_pgn(destination, "w") as stream:
+            return write_games(stream, chessboards, headers)
+    for number, chessboard in enumerate(chessboards):
+        if number:
+            destination.write("\n")
+        destination.write(to_pgn(chessboard,
+                                 headers(chessboard) if headers else None))
+
@@ -1,17 +1,27 @@
 """A chess player."""
 
-from king_snake.errors import (FieldMustBeCastledError,
-                               FieldOccupiedError,
-                               IllegalMoveError,
-                               PawnMustCaptureError,
+import copy
+
+from king_snake.errors import (IllegalCaptureError, IllegalMoveError,
                                TurnError)
 from king_snake.figures import Pawn, Rook, Knight, Bishop, Queen, King
+from king_snake.figures.pawn import PROMOTIONS
+from king_snake.moves import (CAPTURE, CASTLE, EN_PASSANT, PROMOTION,
+                              PROMOTION_SYMBOLS, encode, goal_index,
+                              move_flags, promotion_symbol, start_index,
+                              to_coordinates)
+
+# Name of the figure method that makes a move with given flags
+_ACTIONS = {0: "move", CAPTURE: "capture", EN_PASSANT: "capture",
+            CASTLE: "castle"}
 
 
 class Player(object):
 
     """A chess player."""
 
+    __slots__ = ("chessboard", "figures", "king", "color")
+
     def __repr__(self):
         return "Player()"
 
@@ -55,22 +65,70 @@ class Player(object):
         self.king = King(self)
         self.figures.append(self.king)
 
-    def move(self, start, goal):
+    def set_up_position(self, chessboard, placement):
+        """
+        Place figures on given chessboard instead of the starting position.
+
+        placement is a sequence of (figure class, field name) pairs. The
+        figures count as not having moved yet, see king_snake.fen for how a
+        loaded position's flags are set.
+        """
+        self.chessboard = chessboard
+        if self == self.chessboard.players["white"]:
+            self.color = "white"
+        else:
+            self.color = "black"
+        self.figures = []
+        self.king = None
+        for figure_class, name in placement:
+            field = chessboard.fields[name]
+            figure = figure_class(self, field)
+            field.figure = figure
+            self.figures.append(figure)
+            if isinstance(figure, King):
+                self.king = figure
+
+    def copy(self, chessboard):
+        """
+        Return copy of self with copies of its figures on chessboard.
+
+        All other attributes are shared with the copy.
+        """
+        player = copy.copy(self)
+        player.chessboard = chessboard
+        player.figures = list(figure.copy(player) for figure in self.figures)
+        player.king = player.figures[self.figures.index(self.king)]
+        return player
+
+    def move(self, start, goal, promotion=None):
         """
         Move a piece to a new field.
 
         First verify if self is the chessboard's current player. Then check if
-        a moveable figure is located at the start field. If the piece can be
-        moved, move to the goal field, capturing a figure at the goal field if
-        necessary. Finally, check if the move would put the own king in check.
-        If yes, roll back the move. Otherwise, record the current turn on all
-        moved pieces and end the turn.
+        a moveable figure is located at the start field and if the move would
+        leave the own king in check, which is decided from the king's pins
+        and checks without touching the board. If the piece can be moved,
+        move to the goal field, capturing a figure at the goal field or
+        castling as the fields call for. If the figure cannot move like that,
+        roll the move back. Otherwise, record the current turn on all moved
+        pieces and end the turn.
+
+        A pawn reaching the last row becomes a queen unless another figure is
+        chosen. The move history then records the promoted figure's symbol
+        as a third element of the move.
 
         @param start_field - String used to look up field object (e.g. "E2")
         @param goal_field - Like start_field
+        @param promotion - Symbol of the figure a pawn is promoted to, one of
+                           "Q", "R", "B" and "N", defaults to "Q"
         """
         if self != self.chessboard.current_player:
             raise TurnError("Move attempted out of turn.")
+        if promotion is None:
+            promotion = "Q"
+        elif promotion not in PROMOTIONS:
+            raise IllegalMoveError("Pawns cannot be promoted to {}.".format(
+                                                                  promotion))
 
         start_field = self.chessboard.fields[start]
         goal_field = self.chessboard.fields[goal]
@@ -80,20 +138,170 @@ class Player(object):
             raise IllegalMoveError("Player does not own a piece at given "
                                    "position.")
 
+        # A move the figure cannot make at all fails below, with the figure's
+        # own error unless it targets a figure of the own color
+        if (goal_field in figure.pseudo_legal_moves and
+                not self.is_safe(figure, goal_field)):
+            raise IllegalMoveError("Move would put player's king in check.")
+
+        flags = self._move_flags(figure, goal_field)
+        if not (isinstance(figure, Pawn) and
+                goal_field.number == figure.last_row):
+            promotion = None
+        captured_piece = self._make_move(figure, goal_field, flags,
+                                         promotion)
+        self._end_move(figure, start_field, goal_field, flags,
+                       captured_piece, promotion)
+
+    def make_move(self, move):
+        """
+        Make a move encoded as in king_snake.moves.
+
+        The move has to be one yielded by generate_moves for the current
+        position, as it is made without checking if it is legal. The figure
+        method to call is chosen from the move's flags.
+        """
+        fields = self.chessboard.ordered_fields
+        start_field = fields[start_index(move)]
+        goal_field = fields[goal_index(move)]
+        figure = start_field.figure
+        flags = move_flags(move)
+        promotion = promotion_symbol(move)
+        captured_piece = self._make_move(figure, goal_field, flags,
+                                         promotion)
+        self._end_move(figure, start_field, goal_field, flags,
+                       captured_piece, promotion)
+
+    def _move_flags(self, figure, field):
+        """
+        Return flags of the move of figure to field, see moves.
+
+        Raise IllegalCaptureError if field holds a figure of the own color
+        and the move is no castling.
+        """
+        if (isinstance(figure, King) and not figure.already_moved and
+                field in figure.castle_positions.values()):
+            return CASTLE
+        if field.figure:
+            if field.figure.color == figure.color:
+                raise IllegalCaptureError("Cannot capture piece of same "
+                                          "color.")
+            return CAPTURE
+        if (isinstance(figure, Pawn) and
+                field.letter != figure.position.letter):
+            return EN_PASSANT
+        return 0
+
+    def _make_move(self, figure, field, flags, promotion=None):
+        """
+        Move figure to field and return the captured figure, if any.
+
+        flags tell whether the figure moves to a free field, captures,
+        possibly en passant, or castles, in which case the rook is returned.
+        A pawn is promoted to the figure with symbol promotion, by default a
+        queen, if it reaches the last row. The move is recorded on the
+        chessboard's undo stack. If the figure cannot make it, it is rolled
+        back and the figure's error is raised again.
+        """
+        if isinstance(figure, Pawn):
+            figure.promotion = PROMOTIONS[promotion or "Q"]
+        self.chessboard.push_undo(figure, field)
         try:
-            figure.move(goal_field)
-            captured_piece = None
-        except (FieldOccupiedError, PawnMustCaptureError):
-            captured_piece = figure.capture(goal_field)
-        except FieldMustBeCastledError:
-            captured_piece = figure.castle(goal_field)
-
-        if self.king.in_check:
+            return getattr(figure, _ACTIONS[flags & ~PROMOTION])(field)
+        except Exception:
             self.chessboard.rollback()
-            raise IllegalMoveError("Move would put player's king in check.")
+            raise
 
+    def _end_move(self, figure, start_field, goal_field, flags,
+                  captured_piece, promotion):
+        """Record the turn on the moved figures and end it."""
         figure.already_moved = True
         figure.last_moved = self.chessboard.current_move
         if captured_piece:
             captured_piece.last_moved = self.chessboard.current_move
-        self.chessboard.end_turn(start, goal)
+        irreversible = isinstance(figure, Pawn) or bool(flags & CAPTURE)
+        self.chessboard.end_turn(start_field.name, goal_field.name,
+                                 irreversible, promotion)
+
+    def is_safe(self, figure, field):
+        """
+        Test if moving figure to field leaves the own king out of check.
+
+        field has to be one of figure's pseudo legal moves. The answer is
+        found from the king's CheckState: the king may not move to a
+        threatened field, if it is in check by two figures only the king may
+        move, a single check has to be captured or blocked and a pinned
+        figure has to stay between the king and its pinner. Only capturing en
+        passant, which takes a second figure off the pin rays, is tried on
+        the board and rolled back.
+        """
+        king = self.king
+        checkers, evasions, pins, exposed = king.check_state
+        if figure is king:
+            return (field not in exposed and
+                    not field.threatened_by(self.opponent))
+        if len(checkers) > 1:
+            return False
+        if figure in pins and field not in pins[figure]:
+            return False
+        if (isinstance(figure, Pawn) and not field.figure and
+                field.letter != figure.position.letter):
+            self._make_move(figure, field, EN_PASSANT)
+            safe = not king.in_check
+            self.chessboard.rollback()
+            return safe
+        return not checkers or field in evasions
+
+    def has_legal_move(self):
+        """
+        Test if the player has any legal move.
+
+        Unlike generate_legal_moves, this stops at the first legal move.
+        """
+        for figure in list(self.figures):
+            if not figure.on_board:
+                continue
+            for field in figure.pseudo_legal_moves:
+                if self.is_safe(figure, field):
+                    return True
+        return False
+
+    def generate_moves(self):
+        """
+        Yield all legal moves of the player, encoded as in king_snake.moves.
+
+        A figure's pseudo legal moves are kept if is_safe finds that they do
+        not leave the king in check. A pawn reaching the last row yields a
+        move for each figure it can be promoted to. The board is unchanged
+        whenever a move is yielded, and nothing is raised for illegal moves.
+        A caller that makes a yielded move has to roll it back before asking
+        for the next one.
+        """
+        for figure in list(self.figures):
+            if not figure.on_board:
+                continue
+            start = figure.position.index
+            promotes = isinstance(figure, Pawn)
+            moves = []
+            for field in figure.pseudo_legal_moves:
+                if not self.is_safe(figure, field):
+                    continue
+                flags = self._move_flags(figure, field)
+                if promotes and field.number == figure.last_row:
+                    moves.extend(encode(start, field.index, flags, symbol)
+                                 for symbol in PROMOTION_SYMBOLS[1:])
+                else:
+                    moves.append(encode(start, field.index, flags))
+            for move in moves:
+                yield move
+
+    def generate_legal_moves(self):
+        """
+        Yield all legal moves of the player as (start, goal) tuples.
+
+        Pawns reaching the last row are promoted to a queen, which Player.move
+        does for such tuples. See generate_moves.
+        """
+        for move in self.generate_moves():
+            if promotion_symbol(move) in (None, "Q"):
+                yield to_coordinates(move)[:2]
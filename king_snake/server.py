@@ -0,0 +1,269 @@
+"""
+A server hosting many chess games for players connected over sockets.
+
+GameServer listens on a TCP address or a local socket and runs all games in
+one thread with asyncore's event loop, so waiting connections cost no more
+than their sockets and each game is one Chessboard. Moves are checked by the
+game's Player.move, exactly as on a local chessboard.
+
+The protocol is line based. Clients send commands of words separated by
+spaces, fields are given as e.g. "e2":
+
+    NEW [white|black]                 start a game, playing the given color
+                                      or both
+    JOIN <game>                       play the colors nobody plays yet
+    WATCH <game>                      receive a game's updates
+    MOVE <game> <start> <goal> [<promotion>]
+    LEAVE <game>                      stop playing or watching a game
+
+The server answers and pushes:
+
+    GAME <game> <colors>              reply to NEW and JOIN, colors joined by
+                                      "," or "-" for watchers
+    BOARD <game> <move> <FEN>         the position after a move, sent to all
+                                      players and watchers of the game. The
+                                      move is "-" for the current position
+                                      sent on joining.
+    OVER <game> <result> <termination>
+    ERROR <message>                   the last command was not carried out
+
+A game is dropped when it is over or when nobody plays or watches it any
+more. The games can share a PositionCache, so a position reached in several
+games, as openings are, only has its legal moves worked out once.
+"""
+
+import asynchat
+import asyncore
+import os
+import socket
+import stat
+
+from king_snake.cache import PositionCache
+from king_snake.chessboard import Chessboard
+from king_snake.errors import ChessError
+from king_snake.fen import to_fen
+from king_snake.player import Player
+
+COLORS = ("white", "black")
+# Longest command line accepted before the connection is closed
+MAX_LINE = 1024
+
+
+class ProtocolError(Exception):
+    """A client sent a command that cannot be carried out."""
+
+
+class Game(object):
+
+    """A chessboard with the connections playing and watching it."""
+
+    __slots__ = ("number", "chessboard", "seats", "watchers")
+
+    def __repr__(self):
+        return "Game({})".format(self.number)
+
+    def __init__(self, number, bitboards=False, position_cache=None):
+        self.number = number
+        self.chessboard = Chessboard({"white": Player(), "black": Player()},
+                                     bitboards=bitboards,
+                                     position_cache=position_cache)
+        # Connection playing each color
+        self.seats = dict()
+        self.watchers = set()
+
+    @property
+    def listeners(self):
+        """Return set of connections that receive the game's updates."""
+        return set(self.seats.values()) | self.watchers
+
+    def board_line(self, move="-"):
+        """Return BOARD line with move given in coordinates."""
+        return "BOARD {} {} {}\n".format(self.number, move,
+                                         to_fen(self.chessboard))
+
+
+class GameConnection(asynchat.async_chat):
+
+    """A client's connection, which reads commands line by line."""
+
+    def __init__(self, sock, server):
+        asynchat.async_chat.__init__(self, sock)
+        self.server = server
+        self.games = set()
+        self._received = []
+        self._received_length = 0
+        self.set_terminator("\n")
+
+    def collect_incoming_data(self, data):
+        self._received.append(data)
+        self._received_length += len(data)
+        if self._received_length > MAX_LINE:
+            self.close_when_done()
+
+    def found_terminator(self):
+        """Carry out the command received and report errors to the client."""
+        words = "".join(self._received).split()
+        self._received = []
+        self._received_length = 0
+        if not words:
+            return
+        try:
+            self.server.execute(self, words[0].upper(), words[1:])
+        except ProtocolError as error:
+            self.push("ERROR {}\n".format(error))
+
+    def handle_close(self):
+        self.server.disconnect(self)
+        self.close()
+
+
+class GameServer(asyncore.dispatcher):
+
+    """Accepts connections and runs their commands on the games."""
+
+    def __repr__(self):
+        return "GameServer({!r})".format(self.address)
+
+    def __init__(self, address, bitboards=False, backlog=128,
+                 cache_size=0):
+        """
+        Listen on address.
+
+        address is a (host, port) pair for TCP or the file name of a local
+        socket. bitboards is passed on to the games' chessboards. If
+        cache_size is given, the games share a PositionCache of that many
+        positions.
+        """
+        asyncore.dispatcher.__init__(self)
+        if isinstance(address, tuple):
+            self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.set_reuse_addr()
+        else:
+            self.create_socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # A socket left behind by an earlier server would block binding
+            if (os.path.exists(address) and
+                    stat.S_ISSOCK(os.stat(address).st_mode)):
+                os.remove(address)
+        self.bind(address)
+        self.listen(backlog)
+        self.address = self.socket.getsockname()
+        self.bitboards = bitboards
+        self.position_cache = PositionCache(cache_size) if cache_size else None
+        self.games = dict()
+        self.moves = 0
+        self._last_game = 0
+        # Method and smallest and largest number of arguments of each command
+        self._commands = {"NEW": (self._new, 0, 1),
+                          "JOIN": (self._join, 1, 1),
+                          "WATCH": (self._watch, 1, 1),
+                          "MOVE": (self._move, 3, 4),
+                          "LEAVE": (self._leave, 1, 1)}
+
+    def handle_accept(self):
+        pair = self.accept()
+        if pair:
+            GameConnection(pair[0], self)
+
+    def execute(self, connection, command, arguments):
+        """Carry out command for connection or raise ProtocolError."""
+        if command not in self._commands:
+            raise ProtocolError("Unknown command {}.".format(command))
+        method, minimum, maximum = self._commands[command]
+        if not minimum <= len(arguments) <= maximum:
+            raise ProtocolError("Wrong number of arguments for {}.".format(
+                                                                     command))
+        method(connection, *arguments)
+
+    def _game(self, number):
+        """Return game with given number."""
+        try:
+            return self.games[int(number)]
+        except (KeyError, ValueError):
+            raise ProtocolError("There is no game {}.".format(number))
+
+    def _seat(self, connection, game, colors):
+        """Give connection the free colors of game and announce them."""
+        colors = [color for color in colors if color not in game.seats]
+        if not colors:
+            raise ProtocolError("Game {} has no free color.".format(
+                                                                 game.number))
+        for color in colors:
+            game.seats[color] = connection
+        connection.games.add(game)
+        connection.push("GAME {} {}\n".format(game.number, ",".join(colors)))
+
+    def _new(self, connection, color=None):
+        if color and color.lower() not in COLORS:
+            raise ProtocolError("Unknown color {}.".format(color))
+        self._last_game += 1
+        game = Game(self._last_game, self.bitboards, self.position_cache)
+        self.games[game.number] = game
+        self._seat(connection, game, [color.lower()] if color else COLORS)
+
+    def _join(self, connection, number):
+        game = self._game(number)
+        self._seat(connection, game, COLORS)
+        connection.push(game.board_line())
+
+    def _watch(self, connection, number):
+        game = self._game(number)
+        game.watchers.add(connection)
+        connection.games.add(game)
+        connection.push("GAME {} -\n".format(game.number))
+        connection.push(game.board_line())
+
+    def _move(self, connection, number, *move):
+        game = self._game(number)
+        player = game.chessboard.current_player
+        if game.seats.get(player.color) is not connection:
+            raise ProtocolError("It is not your turn in game {}.".format(
+                                                                 game.number))
+        try:
+            player.move(*[part.upper() for part in move])
+        except (ChessError, KeyError) as error:
+            raise ProtocolError("Illegal move: {}".format(error))
+        self.moves += 1
+        chessboard = game.chessboard
+        line = game.board_line("".join(chessboard.move_history[-1]).lower())
+        outcome = chessboard.outcome()
+        if outcome:
+            line += "OVER {} {} {}\n".format(game.number, outcome.result,
+                                             outcome.termination)
+        for listener in game.listeners:
+            listener.push(line)
+        if outcome:
+            self._drop(game)
+
+    def _leave(self, connection, number):
+        game = self._game(number)
+        if game not in connection.games:
+            raise ProtocolError("You are not in game {}.".format(number))
+        self._remove(connection, game)
+
+    def _remove(self, connection, game):
+        """Take connection's seats in game and stop sending it updates."""
+        for color, player in list(game.seats.items()):
+            if player is connection:
+                del game.seats[color]
+        game.watchers.discard(connection)
+        connection.games.discard(game)
+        if not game.seats and not game.watchers:
+            self._drop(game)
+
+    def _drop(self, game):
+        """Forget game."""
+        for listener in game.listeners:
+            listener.games.discard(game)
+        self.games.pop(game.number, None)
+
+    def disconnect(self, connection):
+        """Remove a closed connection from all its games."""
+        for game in list(connection.games):
+            self._remove(connection, game)
+
+
+def serve(address, bitboards=False, cache_size=0):
+    """Run a GameServer on address until interrupted."""
+    GameServer(address, bitboards, cache_size=cache_size)
+    # poll copes with more open connections than select
+    asyncore.loop(use_poll=True)
@@ -0,0 +1,164 @@
+"""
+Encoding positions as NumPy arrays, e.g. as input for machine learning.
+
+A position is encoded in PLANES planes of 8 x 8 values, indexed by row and
+column counted from field A1, so that a flattened plane is in the order of
+the field indices:
+
+    0 - 5      white pawns, knights, bishops, rooks, queens and king
+    6 - 11     the same for black
+    12         all ones if white is to move
+    13 - 16    all ones for each castling right in the order "KQkq"
+    17         a one on the field a pawn can be taken en passant on
+
+Figures are entered in one step per kind of figure from the chessboard's
+bitboards if it has them, otherwise in one step per figure, never by walking
+the fields. Arrays can be passed in to be filled, so batches can be written
+into preallocated memory.
+
+write_npy encodes the positions of the games in a PGN file straight into a
+memory-mapped .npy file, so the result does not need to fit into memory.
+This module requires NumPy.
+"""
+
+import numpy
+from numpy.lib import format as npy_format
+
+from king_snake.bitboard import COLORS, SYMBOLS
+from king_snake.errors import ChessError
+from king_snake.pgn import new_board, open_pgn, parse_games, parse_san
+
+PLANES = 18
+FIGURE_PLANES = dict(((color, symbol), plane) for plane, (color, symbol) in
+                     enumerate((color, symbol) for color in COLORS
+                               for symbol in SYMBOLS))
+WHITE_TO_MOVE_PLANE = 12
+CASTLING_PLANES = {"K": 13, "Q": 14, "k": 15, "q": 16}
+EN_PASSANT_PLANE = 17
+
+_FIELD_BITS = numpy.arange(64, dtype=numpy.uint64)
+
+
+def encode(chessboard, out=None, dtype=numpy.uint8):
+    """
+    Return chessboard's position encoded in an array of PLANES x 8 x 8.
+
+    If out is given, the position is written into it and out is returned,
+    otherwise a new array of dtype is created.
+    """
+    if out is None:
+        out = numpy.zeros((PLANES, 8, 8), dtype)
+    else:
+        out[...] = 0
+    bitboards = chessboard.bitboards
+    if bitboards:
+        masks = numpy.array([bitboards.pieces[figure] for figure in
+                             sorted(FIGURE_PLANES, key=FIGURE_PLANES.get)],
+                            dtype=numpy.uint64)
+        out[:WHITE_TO_MOVE_PLANE] = ((masks[:, None] >> _FIELD_BITS) &
+                                     1).reshape(-1, 8, 8)
+    else:
+        planes, indices = [], []
+        for player in chessboard.players.values():
+            for figure in player.figures:
+                if figure.on_board:
+                    planes.append(FIGURE_PLANES[figure.color, figure.symbol])
+                    indices.append(figure.position.index)
+        planes = numpy.array(planes, dtype=numpy.intp)
+        indices = numpy.array(indices, dtype=numpy.intp)
+        out[planes, indices // 8, indices % 8] = 1
+    if chessboard.current_player.color == "white":
+        out[WHITE_TO_MOVE_PLANE] = 1
+    for right in chessboard.castling_rights:
+        out[CASTLING_PLANES[right]] = 1
+    field = chessboard.en_passant_field
+    if field:
+        out[EN_PASSANT_PLANE, field.number - 1, field.letter - ord("A")] = 1
+    return out
+
+
+def encode_batch(chessboards, out=None, dtype=numpy.uint8):
+    """
+    Return positions of chessboards encoded in an array of N x PLANES x 8 x 8.
+
+    If out is given, the positions are written into its first rows and out
+    is returned, otherwise a new array of dtype is created.
+    """
+    if out is None:
+        chessboards = list(chessboards)
+        out = numpy.empty((len(chessboards), PLANES, 8, 8), dtype)
+    for row, chessboard in enumerate(chessboards):
+        encode(chessboard, out[row])
+    return out
+
+
+def write_npy(pgn_file, npy_file, bitboards=True, dtype=numpy.uint8):
+    """
+    Write each position a move was played in to npy_file and return count.
+
+    The games of pgn_file are read twice: first their moves are counted to
+    size the memory-mapped array, then they are played and each position is
+    encoded into its next row before its move is made. A game stops at its
+    first illegal move, in which case the array is shrunk to the positions
+    actually written at the end.
+    """
+    with open_pgn(pgn_file) as lines:
+        capacity = sum(len(san) for headers, san, result in
+                       parse_games(lines))
+    shape = (capacity, PLANES, 8, 8)
+    if not capacity:
+        # An empty file cannot be mapped into memory
+        numpy.save(npy_file, numpy.zeros(shape, dtype))
+        return 0
+    array = npy_format.open_memmap(npy_file, "w+", numpy.dtype(dtype), shape)
+    count = 0
+    standard_board = new_board(bitboards=bitboards)
+    with open_pgn(pgn_file) as lines:
+        for headers, san, result in parse_games(lines):
+            if "FEN" in headers:
+                chessboard = new_board(headers, bitboards)
+            else:
+                chessboard = standard_board
+                chessboard.reset()
+            for text in san:
+                try:
+                    move = parse_san(chessboard, text)
+                    encode(chessboard, array[count])
+                    chessboard.current_player.move(*move)
+                except ChessError:
+                    break
+                count += 1
+    array.flush()
+    del array
+    if count < capacity:
+        _shrink_npy(npy_file, count)
+    return count
+
+
+def _shrink_npy(file_name, rows):
+    """
+    Cut the array in a .npy file down to its first rows.
+
+    The header is rewritten in place, padded to its old length, and the
+    file truncated after the last kept row.
+    """
+    with open(file_name, "r+b") as stream:
+        version = npy_format.read_magic(stream)
+        if version == (1, 0):
+            read_header = npy_format.read_array_header_1_0
+        else:
+            read_header = npy_format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(stream)
+        data_start = stream.tell()
+        # Magic string, version and the header's length come first
+        header_start = len(npy_format.MAGIC_PREFIX) + 2
+        header_start += 2 if version == (1, 0) else 4
+        shape = (rows,) + shape[1:]
+        header = ("{{'descr': {!r}, 'fortran_order': {!r}, 'shape': {!r}, }}"
+                  .format(npy_format.dtype_to_descr(dtype), fortran_order,
+                          shape))
+        header = header.ljust(data_start - header_start - 1) + "\n"
+        stream.seek(header_start)
+        stream.write(header.encode("latin1"))
+        stream.truncate(data_start + rows * dtype.itemsize *
+                        int(numpy.prod(shape[1:])))
@@ -0,0 +1,49 @@
+"""
+Zobrist keys for identifying chess positions.
+
+A position's key is the exclusive or of one random 64 bit number for each
+figure on its field, plus numbers for the side to move, the castling rights
+and the column in which a pawn can be taken en passant. Keys can therefore be
+updated incrementally by xoring numbers in and out as the position changes.
+
+The numbers are drawn from a fixed seed, so keys are the same in every
+process and can be stored and compared across runs.
+"""
+
+import random
+
+_random = random.Random(0x4B696E67)
+
+PIECE_KEYS = dict(((color, symbol), tuple(_random.getrandbits(64)
+                                           for index in range(64)))
+                  for color in ("white", "black")
+                  for symbol in ("P", "N", "B", "R", "Q", "K"))
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+# Keyed by FEN notation of the castling right
+CASTLING_KEYS = dict((right, _random.getrandbits(64)) for right in "KQkq")
+# Keyed by column letter of the field that was jumped over
+EN_PASSANT_KEYS = dict((letter, _random.getrandbits(64))
+                       for letter in "ABCDEFGH")
+
+
+def piece_key(figure, field):
+    """Return number for figure standing on field."""
+    return PIECE_KEYS[figure.color, figure.symbol][field.index]
+
+
+def state_key(color, castling_rights, en_passant_field):
+    """
+    Return numbers for the position's state combined.
+
+    color is the color of the player to move, castling_rights a string of
+    rights in FEN notation and en_passant_field the field a pawn has jumped
+    over, if it can be taken en passant, or None.
+    """
+    key = 0
+    if color == "black":
+        key ^= BLACK_TO_MOVE_KEY
+    for right in castling_rights:
+        key ^= CASTLING_KEYS[right]
+    if en_passant_field:
+        key ^= EN_PASSANT_KEYS[en_passant_field.name[0]]
+    return key
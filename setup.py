@@ -11,5 +11,7 @@ setup(name='KingSnake',
       packages=['king_snake', 'king_snake.figures'],
       license="GNU GPL",
       long_description=open("README").read(),
-      scripts=["bin/kingsnake", "bin/KingSnake.py"]
+      scripts=["bin/kingsnake", "bin/KingSnake.py", "bin/KingSnakePerft.py",
+               "bin/KingSnakeValidate.py", "bin/KingSnakeBook.py",
+               "bin/KingSnakeServer.py", "bin/KingSnakeLoadTest.py"]
      )
@@ -0,0 +1,17 @@
+"""Helpers shared by the tests."""
+
+from king_snake.pgn import parse_san
+
+
+def play(chessboard, moves):
+    """
+    Play moves on chessboard and return it.
+
+    Each move is a tuple for Player.move, e.g. ("E2", "E4"), or a move in
+    SAN, e.g. "e4".
+    """
+    for move in moves:
+        if isinstance(move, str):
+            move = parse_san(chessboard, move)
+        chessboard.current_player.move(*move)
+    return chessboard
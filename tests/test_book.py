@@ -0,0 +1,49 @@
+"""Tests for opening book records and lookups."""
+
+import pytest
+
+from king_snake.book import OpeningBook, build_book, decode_move, encode_move
+from king_snake.perft import new_board
+from king_snake.pgn import parse_games
+
+GAMES = """[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 1-0
+
+[Result "1/2-1/2"]
+
+1. e4 c5 2. Nf3 1/2-1/2
+
+[Result "0-1"]
+
+1. d4 d5 0-1
+"""
+
+
+@pytest.mark.parametrize("move,code", ((("A1", "A2"), 8 << 6),
+                                       (("E2", "E4"), 12 | 28 << 6),
+                                       (("H8", "H1"), 63 | 7 << 6),
+                                       (("B7", "B8", "Q"), 49 | 57 << 6 |
+                                        1 << 12),
+                                       (("G2", "H1", "N"), 14 | 7 << 6 |
+                                        4 << 12)))
+def test_move_codes(move, code):
+    # Codes are stored in book files and must not change
+    assert encode_move(move) == code
+    assert decode_move(code) == move
+
+
+def test_book_counts_games(tmpdir):
+    file_name = str(tmpdir.join("book.bin"))
+    games = parse_games(GAMES.splitlines(True))
+    assert build_book(games, file_name, buffer_records=2) == 8
+    chessboard = new_board()
+    with OpeningBook(file_name) as book:
+        entries = book.lookup(chessboard)
+        assert [entry.move for entry in entries] == [("E2", "E4"),
+                                                     ("D2", "D4")]
+        assert entries[0][1:] == (2, 1, 1, 0)
+        assert entries[1][1:] == (1, 0, 0, 1)
+        chessboard.current_player.move("E2", "E4")
+        assert sorted(entry.move for entry in book.lookup(chessboard)) == [
+                                                   ("C7", "C5"), ("E7", "E5")]
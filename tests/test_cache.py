@@ -0,0 +1,115 @@
+"""Tests for the position cache shared by chessboards."""
+
+import pickle
+
+import pytest
+
+from conftest import play
+from king_snake.cache import PositionCache
+from king_snake.evaluation import evaluate
+from king_snake.fen import to_fen
+from king_snake.perft import new_board
+
+# Move orders reaching the same positions. In the second pair, black's pawn
+# reaches d5 by capturing, so it cannot be taken en passant either way.
+TRANSPOSITIONS = (((("G1", "F3"), ("G8", "F6"), ("B1", "C3"), ("B8", "C6")),
+                   (("B1", "C3"), ("B8", "C6"), ("G1", "F3"), ("G8", "F6"))),
+                  ((("E2", "E4"), ("A7", "A6"), ("E4", "E5"), ("A6", "A5"),
+                    ("F1", "B5"), ("H7", "H6"), ("B5", "C6"), ("B7", "C6"),
+                    ("B1", "C3"), ("H6", "H5"), ("C3", "D5"), ("C6", "D5")),
+                   (("E2", "E4"), ("H7", "H6"), ("F1", "B5"), ("A7", "A6"),
+                    ("B5", "C6"), ("B7", "C6"), ("B1", "C3"), ("A6", "A5"),
+                    ("C3", "D5"), ("C6", "D5"), ("E4", "E5"), ("H6", "H5"))))
+
+
+def fresh_moves(chessboard):
+    """Return moves generated for a copy of chessboard without a cache."""
+    duplicate = chessboard.copy()
+    duplicate.position_cache = None
+    return sorted(duplicate.generate_moves())
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+@pytest.mark.parametrize("first,second", TRANSPOSITIONS)
+def test_transposed_positions_share_moves(first, second, bitboards):
+    cache = PositionCache()
+    chessboards = []
+    for moves in first, second:
+        chessboard = new_board(bitboards)
+        chessboard.position_cache = cache
+        chessboards.append(play(chessboard, moves))
+    one, other = chessboards
+    assert to_fen(one) == to_fen(other)
+    assert one.position_key == other.position_key
+    assert sorted(one.generate_moves()) == fresh_moves(one)
+    hits = cache.hits
+    # The second board finds the moves of the first in the cache
+    assert sorted(other.generate_moves()) == fresh_moves(other)
+    assert cache.hits == hits + 1
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_cached_moves_follow_en_passant(bitboards):
+    cache = PositionCache()
+    jumped = play(new_board(bitboards), (("E2", "E4"), ("A7", "A6"),
+                                         ("E4", "E5"), ("D7", "D5")))
+    stepped = play(new_board(bitboards), (("E2", "E3"), ("D7", "D6"),
+                                          ("E3", "E4"), ("A7", "A6"),
+                                          ("E4", "E5"), ("D6", "D5")))
+    for chessboard in jumped, stepped:
+        chessboard.position_cache = cache
+    assert jumped.position_key != stepped.position_key
+    assert sorted(jumped.generate_moves()) == fresh_moves(jumped)
+    assert sorted(stepped.generate_moves()) == fresh_moves(stepped)
+    assert len(fresh_moves(jumped)) == len(fresh_moves(stepped)) + 1
+
+
+def test_cache_hit_after_rollback():
+    chessboard = new_board()
+    chessboard.position_cache = PositionCache()
+    moves = sorted(chessboard.generate_moves())
+    for move in moves:
+        chessboard.current_player.make_move(move)
+        assert sorted(chessboard.generate_moves()) == fresh_moves(chessboard)
+        chessboard.rollback()
+        assert sorted(chessboard.generate_moves()) == moves
+    stats = chessboard.position_cache.stats()
+    assert stats.misses == 1 + len(moves)
+    assert stats.hits == len(moves)
+
+
+def test_position_info():
+    chessboard = play(new_board(), (("E2", "E4"), ("F7", "F6"),
+                                    ("D1", "H5")))
+    chessboard.position_cache = PositionCache()
+    info = chessboard.position_info()
+    assert info.in_check
+    assert info.score is None
+    assert sorted(info.moves) == fresh_moves(chessboard)
+    assert chessboard.position_info(evaluate).score == evaluate(chessboard)
+    assert chessboard.position_info().score == evaluate(chessboard)
+
+
+def test_least_recently_used_is_dropped():
+    cache = PositionCache(2)
+    for key in 1, 2, 3:
+        cache.store(key, key)
+    assert cache.lookup(1) is None
+    assert cache.lookup(2) == 2
+    cache.store(4, 4)
+    assert cache.lookup(3) is None
+    assert cache.lookup(2) == 2
+    assert cache.stats() == (2, 2, 2, 2, 2)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats() == (0, 0, 0, 0, 2)
+
+
+def test_pickled_cache_is_empty():
+    cache = PositionCache(8)
+    cache.store(1, 1)
+    cache = pickle.loads(pickle.dumps(cache))
+    assert cache.capacity == 8
+    assert len(cache) == 0
+    with pytest.raises(ValueError):
+        PositionCache(0)
@@ -0,0 +1,67 @@
+"""Tests for copying chessboards."""
+
+import pytest
+
+from conftest import play
+from king_snake.fen import to_fen
+from king_snake.perft import new_board
+
+OPENING = (("E2", "E4"), ("A7", "A6"), ("E4", "E5"), ("D7", "D5"))
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_copy_keeps_position(bitboards):
+    chessboard = play(new_board(bitboards), OPENING)
+    duplicate = chessboard.copy()
+    assert to_fen(duplicate) == to_fen(chessboard)
+    assert duplicate.position_key == chessboard.position_key
+    assert duplicate.move_history == chessboard.move_history
+    assert (sorted(duplicate.generate_legal_moves()) ==
+            sorted(chessboard.generate_legal_moves()))
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_copy_has_own_figures(bitboards):
+    chessboard = play(new_board(bitboards), OPENING)
+    duplicate = chessboard.copy()
+    for color, player in duplicate.players.items():
+        original = chessboard.players[color]
+        assert player is not original
+        assert player.chessboard is duplicate
+        assert player.king is not original.king
+        for figure in player.figures:
+            assert figure.player is player
+            assert figure not in original.figures
+            assert figure.position.chessboard is duplicate
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_moves_on_copy_leave_original(bitboards):
+    chessboard = play(new_board(bitboards), OPENING)
+    fen, key = to_fen(chessboard), chessboard.position_key
+    history = list(chessboard.move_history)
+    duplicate = chessboard.copy()
+    # En passant is still possible on the copy
+    play(duplicate, (("E5", "D6"), ("C7", "D6"), ("D1", "H5")))
+    assert to_fen(chessboard) == fen
+    assert chessboard.position_key == key
+    assert chessboard.move_history == history
+    assert chessboard.fields["D5"].figure.symbol == "P"
+    assert chessboard.fields["D6"].figure is None
+    # The original goes on as if it had never been copied
+    duplicate_fen = to_fen(duplicate)
+    play(chessboard, (("G1", "F3"), ("B8", "C6")))
+    chessboard.rollback()
+    chessboard.rollback()
+    assert to_fen(chessboard) == fen
+    assert to_fen(duplicate) == duplicate_fen
+
+
+def test_copy_cannot_roll_back_past_copy():
+    chessboard = play(new_board(), OPENING)
+    duplicate = chessboard.copy()
+    play(duplicate, (("G1", "F3"),))
+    duplicate.rollback()
+    assert to_fen(duplicate) == to_fen(chessboard)
+    duplicate.rollback()
+    assert to_fen(duplicate) == to_fen(chessboard)
@@ -0,0 +1,46 @@
+"""Tests for the engine."""
+
+import pytest
+
+from king_snake.engine import MATE, Engine
+from king_snake.fen import to_fen
+from king_snake.perft import POSITIONS, new_board
+
+MATE_IN_ONE = "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+STALEMATE = "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_mate_in_one(bitboards):
+    result = Engine().search(new_board(bitboards, MATE_IN_ONE), depth=4)
+    assert result.move == ("A1", "A8")
+    assert result.score == MATE - 1
+    # Deeper iterations cannot improve on a mate
+    assert result.depth < 4
+    assert result.principal_variation == [("A1", "A8")]
+
+
+def test_stalemate():
+    result = Engine().search(new_board(fen=STALEMATE))
+    assert result.move is None
+    assert result.score == 0
+    assert result.principal_variation == []
+
+
+def test_node_budget():
+    result = Engine().search(new_board(), depth=20, nodes=2000)
+    assert result.move
+    assert result.depth < 20
+    # Budgets are checked every 1024 nodes
+    assert result.nodes <= 2048
+
+
+@pytest.mark.parametrize("limits", ({"depth": 3}, {"depth": 20, "nodes": 3000},
+                                    {"seconds": 0.1}))
+def test_board_unchanged(limits):
+    chessboard = new_board(fen=POSITIONS["kiwipete"])
+    chessboard.current_player.move("E1", "G1")
+    fen, undo_depth = to_fen(chessboard), len(chessboard.undo_stack)
+    Engine().search(chessboard, **limits)
+    assert to_fen(chessboard) == fen
+    assert len(chessboard.undo_stack) == undo_depth
@@ -0,0 +1,47 @@
+"""Tests for the evaluation and the chessboard's incrementally kept score."""
+
+import pytest
+
+from conftest import play
+from king_snake.evaluation import evaluate, evaluate_batch, full_score
+from king_snake.fen import to_binary
+from king_snake.perft import new_board
+
+GAMES = (
+    # Captures, en passant and castling on both sides
+    (None, ("e4", "Nf6", "e5", "d5", "exd6", "exd6", "Nf3", "Be7", "Bc4",
+            "O-O", "O-O", "Bg4", "Bxf7+", "Rxf7", "d4", "Nc6", "Bg5", "Qd7",
+            "Nc3", "Bxf3", "Qxf3", "Nxd4", "Qxb7", "Rb8", "Qxa7", "Nxc2",
+            "Rac1")),
+    # Promotions with and without capture and underpromotion
+    ("r3k3/1P4P1/8/8/8/8/p7/R3K2R w KQq - 0 1",
+     ("bxa8=Q+", "Ke7", "g8=N+", "Kf7", "O-O-O", "a1=R+", "Kd2", "Rxd1+",
+      "Rxd1", "Kg6")),
+)
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+@pytest.mark.parametrize("fen,moves", GAMES)
+def test_incremental_score(fen, moves, bitboards):
+    chessboard = new_board(bitboards, fen)
+    scores = [chessboard.score]
+    assert chessboard.score == full_score(chessboard)
+    for move in moves:
+        play(chessboard, (move,))
+        assert chessboard.score == full_score(chessboard)
+        scores.append(chessboard.score)
+    for score in reversed(scores[:-1]):
+        chessboard.rollback()
+        assert chessboard.score == full_score(chessboard) == score
+
+
+@pytest.mark.parametrize("fen,moves", GAMES)
+def test_evaluate_batch(fen, moves):
+    pytest.importorskip("numpy")
+    chessboard = new_board(fen=fen)
+    positions, expected = [to_binary(chessboard)], [evaluate(chessboard)]
+    for move in moves:
+        play(chessboard, (move,))
+        positions.append(to_binary(chessboard))
+        expected.append(evaluate(chessboard))
+    assert list(evaluate_batch(positions)) == expected
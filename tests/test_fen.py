@@ -0,0 +1,69 @@
+"""Tests for loading and storing positions in FEN and binary form."""
+
+import pytest
+
+from king_snake.fen import START_FEN, from_binary, from_fen, to_binary, to_fen
+
+# Positions with pawns next to each other on the fifth or fourth row
+FENS = (START_FEN,
+        # Black's pawn reached d5 by capturing, it cannot be taken en passant
+        "r1bqkbnr/2pp1pp1/8/p2pP2p/8/8/PPPP1PPP/R1BQK1NR w KQkq - 0 7",
+        "rnbqkbnr/1pp1pppp/p7/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 3",
+        "rnbqkbnr/pppp1ppp/8/8/3Pp3/4P3/PPP2PPP/RNBQKBNR b KQkq d3 0 3",
+        "8/8/8/2k5/3Pp3/8/8/4K3 b - d3 0 1",
+        "8/8/8/2k5/3Pp3/8/8/4K3 b - - 0 1",
+        "4k3/8/8/3pP3/8/8/8/4K3 w - - 0 1")
+
+
+def en_passant_pawns(chessboard):
+    return sorted(field.name for field in chessboard.ordered_fields
+                  if field.figure and field.figure.symbol == "P" and
+                  field.figure.can_be_taken_en_passant)
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+@pytest.mark.parametrize("fen", FENS)
+def test_fen_round_trip(fen, bitboards):
+    chessboard = from_fen(fen, bitboards=bitboards)
+    assert to_fen(chessboard) == fen
+    assert to_fen(from_binary(to_binary(chessboard))) == fen
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_only_jumped_pawn_can_be_taken_en_passant(fen):
+    chessboard = from_fen(fen)
+    en_passant = fen.split()[3]
+    if en_passant == "-":
+        assert en_passant_pawns(chessboard) == []
+    else:
+        jumped = chessboard.fields[en_passant.upper()]
+        pawn_field = jumped.above() if jumped.number == 3 else jumped.below()
+        assert en_passant_pawns(chessboard) == [pawn_field.name]
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_en_passant_moves_match_fen(fen):
+    chessboard = from_fen(fen)
+    en_passant = fen.split()[3].upper()
+    captures = [(start, goal) for start, goal in
+                chessboard.generate_legal_moves()
+                if chessboard.fields[start].figure.symbol == "P" and
+                start[0] != goal[0] and not chessboard.fields[goal].figure]
+    if en_passant == "-":
+        assert captures == []
+    else:
+        assert captures
+        assert all(goal == en_passant for start, goal in captures)
+
+
+def test_moves_after_loading_keep_fen_in_step():
+    chessboard = from_fen(FENS[2])
+    chessboard.current_player.move("E5", "D6")
+    chessboard.current_player.move("A6", "A5")
+    assert to_fen(chessboard) == ("rnbqkbnr/1pp1pppp/3P4/p7/8/8/PPPP1PPP/"
+                                  "RNBQKBNR w KQkq - 0 4")
+    chessboard.current_player.move("H2", "H3")
+    chessboard.current_player.move("A5", "A4")
+    chessboard.current_player.move("B2", "B4")
+    assert to_fen(chessboard).split()[3] == "b3"
+    assert ("A4", "B3") in chessboard.generate_legal_moves()
@@ -0,0 +1,52 @@
+"""Tests for instrumenting the hot paths of move validation."""
+
+import pytest
+
+from conftest import play
+from king_snake.instrumentation import TARGETS, format_stats, instrumented
+from king_snake.moves import encode
+from king_snake.perft import new_board
+
+
+def attributes():
+    """Return the attributes of TARGETS as found in their classes."""
+    return [cls.__dict__[attribute] for cls, attribute, _, _ in TARGETS]
+
+
+def test_instrumented():
+    originals = attributes()
+    chessboard, other = new_board(), new_board()
+    with instrumented(chessboard):
+        assert all(current is not original for current, original in
+                   zip(attributes(), originals))
+        play(chessboard, (("E2", "E4"), ("E7", "E5")))
+        chessboard.current_player.make_move(encode(6, 21))
+        chessboard.current_player.figures[0].legal_moves
+        play(other, (("E2", "E4"),))
+    assert attributes() == originals
+    stats = chessboard.stats()
+    for name in ("Player.move", "Player.make_move"):
+        assert stats[name].calls > 0
+        assert sum(stats[name].histogram) == stats[name].calls
+    assert any(name.startswith("Figure.legal_moves ") for name in stats)
+    assert other.stats() == {}
+    assert format_stats(stats).splitlines()[0].startswith("call")
+    # Nothing is recorded afterwards
+    play(chessboard, (("G8", "F6"),))
+    assert chessboard.stats() == stats
+
+
+def test_nested_and_errors():
+    originals = attributes()
+    first, second = new_board(), new_board()
+    with pytest.raises(KeyError):
+        with instrumented(first):
+            with instrumented(second):
+                play(second, (("E2", "E4"),))
+            # Still instrumented for the first chessboard
+            assert attributes() != originals
+            play(first, (("D2", "D4"),))
+            raise KeyError()
+    assert attributes() == originals
+    assert first.stats()["Player.move"].calls == 1
+    assert second.stats()["Player.move"].calls == 1
@@ -0,0 +1,99 @@
+"""Tests for checks and pins as the king sees them."""
+
+import pytest
+
+from king_snake.errors import IllegalCaptureError, IllegalMoveError
+from king_snake.fen import from_fen, to_fen
+from king_snake.player import Player
+
+# Rook pinned along the file, bishop along the diagonal
+PINS = "k3r3/8/8/b7/8/8/3BR3/4K3 w - - 0 1"
+# Knight and rook check the black king at once
+DOUBLE_CHECK = "3qk3/8/3N4/8/8/8/8/4RK2 b - - 0 1"
+# Rook checks along the file the king stands on
+FILE_CHECK = "k3r3/8/8/8/8/8/4K3/8 w - - 0 1"
+# Taking c5 en passant would clear the row between king and rook
+EN_PASSANT_PIN = "8/8/8/KPp4r/8/8/8/7k w - c6 0 1"
+
+
+def legal_moves(chessboard):
+    return sorted(chessboard.generate_legal_moves())
+
+
+def fields(chessboard, names):
+    return frozenset(chessboard.fields[name] for name in names)
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_pinned_figures_move_along_pin(bitboards):
+    chessboard = from_fen(PINS, bitboards=bitboards)
+    king = chessboard.current_player.king
+    checkers, evasions, pins, exposed = king.check_state
+    rook, bishop = (chessboard.fields[name].figure for name in ("E2", "D2"))
+    assert checkers == ()
+    assert pins == {rook: fields(chessboard, ("E2", "E3", "E4", "E5", "E6",
+                                              "E7", "E8")),
+                    bishop: fields(chessboard, ("D2", "C3", "B4", "A5"))}
+    assert legal_moves(chessboard) == [
+        ("D2", "A5"), ("D2", "B4"), ("D2", "C3"), ("E1", "D1"),
+        ("E1", "F1"), ("E1", "F2"), ("E2", "E3"), ("E2", "E4"),
+        ("E2", "E5"), ("E2", "E6"), ("E2", "E7"), ("E2", "E8")]
+    for move in ("E2", "F2"), ("D2", "E3"):
+        with pytest.raises(IllegalMoveError):
+            chessboard.current_player.move(*move)
+    assert to_fen(chessboard) == PINS
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_double_check_leaves_king_moves(bitboards):
+    chessboard = from_fen(DOUBLE_CHECK, bitboards=bitboards)
+    checkers = chessboard.current_player.king.check_state.checkers
+    assert sorted(figure.position.name for figure in checkers) == ["D6",
+                                                                   "E1"]
+    assert legal_moves(chessboard) == [("E8", "D7"), ("E8", "F8")]
+    # Capturing one checker leaves the other
+    with pytest.raises(IllegalMoveError):
+        chessboard.current_player.move("D8", "D6")
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_king_cannot_step_back_along_check(bitboards):
+    chessboard = from_fen(FILE_CHECK, bitboards=bitboards)
+    check_state = chessboard.current_player.king.check_state
+    assert check_state.exposed == fields(chessboard, ("E1",))
+    assert legal_moves(chessboard) == [("E2", "D1"), ("E2", "D2"),
+                                       ("E2", "D3"), ("E2", "F1"),
+                                       ("E2", "F2"), ("E2", "F3")]
+    with pytest.raises(IllegalMoveError):
+        chessboard.current_player.move("E2", "E1")
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_en_passant_cannot_expose_king(bitboards):
+    chessboard = from_fen(EN_PASSANT_PIN, bitboards=bitboards)
+    assert legal_moves(chessboard) == [("A5", "A4"), ("A5", "A6"),
+                                       ("A5", "B6"), ("B5", "B6")]
+    with pytest.raises(IllegalMoveError):
+        chessboard.current_player.move("B5", "C6")
+    assert to_fen(chessboard) == EN_PASSANT_PIN
+    # Without the rook, the capture is fine
+    chessboard = from_fen(EN_PASSANT_PIN.replace("4r", "5"),
+                          bitboards=bitboards)
+    assert ("B5", "C6") in legal_moves(chessboard)
+
+
+def test_only_pseudo_legal_moves_are_tested_for_safety(monkeypatch):
+    is_safe = Player.is_safe
+
+    def checked_is_safe(player, figure, field):
+        assert field in figure.pseudo_legal_moves
+        return is_safe(player, figure, field)
+
+    monkeypatch.setattr(Player, "is_safe", checked_is_safe)
+    fen = "4k3/8/8/8/8/8/4P3/4K3 w - - 0 1"
+    chessboard = from_fen(fen)
+    # A pawn stepping diagonally without capturing fails with its own error
+    with pytest.raises(IllegalCaptureError):
+        chessboard.current_player.move("E2", "F3")
+    assert to_fen(chessboard) == fen
+    chessboard.current_player.move("E2", "E4")
@@ -0,0 +1,83 @@
+"""Tests for moves encoded as integers and making them."""
+
+import pytest
+
+from king_snake.errors import IllegalCaptureError, IllegalMoveError
+from king_snake.fen import from_fen, to_fen
+from king_snake.moves import (CAPTURE, CASTLE, EN_PASSANT, PROMOTION, encode,
+                              goal_index, move_flags, promotion_symbol,
+                              start_index, to_coordinates)
+from king_snake.perft import POSITIONS, new_board
+
+EN_PASSANT_FEN = ("rnbqkbnr/1pp1pppp/p7/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 "
+                  "0 3")
+PROMOTION_FEN = "r3k3/1P6/8/8/8/8/8/4K3 w - - 0 1"
+
+
+@pytest.mark.parametrize("start,goal,flags,promotion,move,coordinates", (
+    (12, 28, 0, None, 12 | 28 << 6, ("E2", "E4")),
+    (0, 63, CAPTURE, None, 63 << 6 | 1 << 12, ("A1", "H8")),
+    (36, 43, EN_PASSANT, None, 36 | 43 << 6 | 2 << 12, ("E5", "D6")),
+    (4, 6, CASTLE, None, 4 | 6 << 6 | 4 << 12, ("E1", "G1")),
+    (49, 57, 0, "Q", 49 | 57 << 6 | 8 << 12 | 1 << 16, ("B7", "B8", "Q")),
+    (49, 56, CAPTURE, "R", 49 | 56 << 6 | 9 << 12 | 2 << 16,
+     ("B7", "A8", "R")),
+    (14, 7, 0, "B", 14 | 7 << 6 | 8 << 12 | 3 << 16, ("G2", "H1", "B")),
+    (14, 6, 0, "N", 14 | 6 << 6 | 8 << 12 | 4 << 16, ("G2", "G1", "N"))))
+def test_encoding(start, goal, flags, promotion, move, coordinates):
+    assert encode(start, goal, flags, promotion) == move
+    assert start_index(move) == start
+    assert goal_index(move) == goal
+    assert move_flags(move) == flags | (PROMOTION if promotion else 0)
+    assert promotion_symbol(move) == promotion
+    assert to_coordinates(move) == coordinates
+
+
+def find_move(chessboard, coordinates):
+    """Return the generated move with the given coordinates."""
+    moves = [move for move in chessboard.generate_moves()
+             if to_coordinates(move) == coordinates]
+    assert len(moves) == 1
+    return moves[0]
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+@pytest.mark.parametrize("fen,coordinates,flags", (
+    (None, ("E2", "E4"), 0),
+    (POSITIONS["kiwipete"], ("E5", "F7"), CAPTURE),
+    (EN_PASSANT_FEN, ("E5", "D6"), EN_PASSANT),
+    (POSITIONS["kiwipete"], ("E1", "G1"), CASTLE),
+    (POSITIONS["kiwipete"], ("E1", "C1"), CASTLE),
+    (PROMOTION_FEN, ("B7", "B8", "Q"), PROMOTION),
+    (PROMOTION_FEN, ("B7", "B8", "R"), PROMOTION),
+    (PROMOTION_FEN, ("B7", "B8", "B"), PROMOTION),
+    (PROMOTION_FEN, ("B7", "B8", "N"), PROMOTION),
+    (PROMOTION_FEN, ("B7", "A8", "N"), CAPTURE | PROMOTION)))
+def test_make_move(fen, coordinates, flags, bitboards):
+    chessboard = new_board(bitboards, fen)
+    before = to_fen(chessboard)
+    move = find_move(chessboard, coordinates)
+    assert move_flags(move) == flags
+    chessboard.current_player.make_move(move)
+    # Player.move gets to the same position
+    expected = new_board(bitboards, fen)
+    expected.current_player.move(*coordinates)
+    assert to_fen(chessboard) == to_fen(expected)
+    assert chessboard.position_key == expected.position_key
+    assert chessboard.move_history == expected.move_history
+    if len(coordinates) > 2:
+        promoted = chessboard.fields[coordinates[1]].figure
+        assert promoted.symbol == coordinates[2]
+        assert promoted in chessboard.players["white"].figures
+    chessboard.rollback()
+    assert to_fen(chessboard) == before
+
+
+def test_castling_to_occupied_field_is_no_capture():
+    chessboard = new_board()
+    with pytest.raises(IllegalMoveError) as error:
+        chessboard.current_player.move("E1", "G1")
+    assert "castle" in str(error.value)
+    with pytest.raises(IllegalCaptureError):
+        chessboard.current_player.move("A1", "A2")
+    assert chessboard.move_history == []
@@ -0,0 +1,89 @@
+"""Tests for telling how a game ended."""
+
+import pytest
+
+from conftest import play
+from king_snake.cache import PositionCache
+from king_snake.chessboard import (CHECKMATE, FIFTY_MOVES,
+                                   INSUFFICIENT_MATERIAL, STALEMATE,
+                                   THREEFOLD_REPETITION)
+from king_snake.perft import new_board
+
+KNIGHT_TOUR = (("G1", "F3"), ("G8", "F6"), ("F3", "G1"), ("F6", "G8"))
+
+
+@pytest.fixture(params=("board", "bitboards", "cache"))
+def board(request):
+    """Return function creating chessboards of the backend to test."""
+    def create(fen=None):
+        chessboard = new_board(request.param == "bitboards", fen)
+        if request.param == "cache":
+            chessboard.position_cache = PositionCache(16)
+        return chessboard
+    return create
+
+
+def test_game_goes_on(board):
+    chessboard = board()
+    assert chessboard.outcome() is None
+    play(chessboard, (("E2", "E4"), ("F7", "F6"), ("D1", "H5")))
+    # In check, but not mate
+    assert chessboard.outcome() is None
+
+
+def test_checkmate(board):
+    chessboard = play(board(), (("F2", "F3"), ("E7", "E5"), ("G2", "G4"),
+                                ("D8", "H4")))
+    outcome = chessboard.outcome()
+    assert outcome == (CHECKMATE, "black")
+    assert outcome.result == "0-1"
+
+
+def test_stalemate(board):
+    chessboard = play(board("7k/8/6Q1/8/8/8/8/6K1 w - - 0 1"),
+                      (("G6", "F7"),))
+    outcome = chessboard.outcome()
+    assert outcome == (STALEMATE, None)
+    assert outcome.result == "1/2-1/2"
+
+
+def test_insufficient_material(board):
+    chessboard = board("4k3/8/8/8/8/8/8/2B1K3 w - - 0 1")
+    assert chessboard.outcome() == (INSUFFICIENT_MATERIAL, None)
+    chessboard = board("4k3/8/8/8/8/8/8/1NB1K3 w - - 0 1")
+    assert chessboard.outcome() is None
+
+
+def test_fifty_moves(board):
+    chessboard = board("4k3/8/8/8/8/8/R7/4K3 w - - 98 80")
+    play(chessboard, (("A2", "A3"),))
+    assert chessboard.halfmove_clock == 99
+    assert chessboard.outcome() is None
+    play(chessboard, (("E8", "D8"),))
+    assert chessboard.outcome() == (FIFTY_MOVES, None)
+
+
+def test_fifty_moves_ends_with_mate(board):
+    chessboard = board("6k1/5ppp/8/8/8/8/8/R5K1 w - - 99 80")
+    play(chessboard, (("A1", "A8"),))
+    assert chessboard.halfmove_clock == 100
+    assert chessboard.outcome() == (CHECKMATE, "white")
+
+
+def test_capture_resets_fifty_moves(board):
+    chessboard = board("4k3/8/8/8/8/8/r7/R3K3 w - - 99 80")
+    play(chessboard, (("A1", "A2"),))
+    assert chessboard.halfmove_clock == 0
+    assert chessboard.outcome() is None
+
+
+def test_threefold_repetition(board):
+    chessboard = play(board(), KNIGHT_TOUR)
+    assert chessboard.repetitions() == 1
+    assert chessboard.outcome() is None
+    play(chessboard, KNIGHT_TOUR)
+    assert chessboard.repetitions() == 2
+    assert chessboard.outcome() == (THREEFOLD_REPETITION, None)
+    chessboard.rollback()
+    assert chessboard.outcome() is None
+
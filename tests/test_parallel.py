@@ -0,0 +1,105 @@
+"""Tests for the shared transposition table and the parallel engine."""
+
+import ctypes
+import multiprocessing
+
+import pytest
+
+from king_snake.engine import (EXACT, INFINITY, LOWER_BOUND, MATE_THRESHOLD,
+                               UPPER_BOUND, Engine)
+from king_snake.fen import from_fen, to_fen
+from king_snake.evaluation import evaluate
+from king_snake.parallel import (ParallelEngine, SharedTranspositionTable,
+                                 _Helper, _pack, _unpack)
+from king_snake.perft import new_board
+
+# White mates in two with a single line of play
+MATE_IN_TWO = "2k5/8/8/3R4/8/8/5RK1/8 w - - 0 1"
+
+
+@pytest.mark.parametrize("entry", ((0, 0, EXACT, None, 0),
+                                   (255, INFINITY, LOWER_BOUND,
+                                    2 ** 19 - 1, 4095),
+                                   (255, -INFINITY, UPPER_BOUND, 0, 4095),
+                                   (1, -1, EXACT, 2 ** 19 - 1, 1)))
+def test_pack_round_trip(entry):
+    data = _pack(*entry)
+    assert 0 < data < 2 ** 64
+    assert _unpack(data) == entry
+
+
+def test_pack_keeps_low_generation_bits():
+    assert _unpack(_pack(3, 5, EXACT, 7, 4096 + 9))[4] == 9
+
+
+def test_table_probe():
+    table = SharedTranspositionTable(1000)
+    assert table.mask == 1023
+    key = 0x123456789ABCDEF
+    assert table.probe(key) is None
+    table.store(key, 3, -5, LOWER_BOUND, 700)
+    assert table.probe(key) == (3, -5, LOWER_BOUND, 700)
+    # Another position in the same slot
+    assert table.probe(key ^ 1 << 40) is None
+
+
+def test_table_ignores_torn_slot():
+    table = SharedTranspositionTable(16)
+    key = 0xFEDCBA987654321
+    table.store(key, 3, -5, EXACT, 700)
+    slot = key & table.mask
+    # Entry written by another process without its key
+    table.entries[slot] = _pack(4, 9, EXACT, 800, 0)
+    assert table.probe(key) is None
+    table.store(key, 5, 1, EXACT, 5)
+    assert table.probe(key) == (5, 1, EXACT, 5)
+    # Key written, entry not yet
+    table.keys[slot] ^= 1
+    assert table.probe(key) is None
+
+
+def helper(number, main_depth=1):
+    return _Helper(multiprocessing.RawValue(ctypes.c_bool, False), evaluate,
+                   multiprocessing.RawValue(ctypes.c_int, main_depth), number)
+
+
+def test_helpers_search_at_and_beyond_main_depth():
+    assert list(helper(2)._iterations(4)) == [1, 2, 3, 4]
+    assert list(helper(1)._iterations(4)) == [2, 3, 4]
+    odd, even = helper(3), helper(2)
+    odd_iterations, even_iterations = (odd._iterations(10),
+                                       even._iterations(10))
+    assert (next(odd_iterations), next(even_iterations)) == (2, 1)
+    odd.main_depth.value = even.main_depth.value = 5
+    assert (next(odd_iterations), next(even_iterations)) == (6, 5)
+    assert (next(odd_iterations), next(even_iterations)) == (7, 6)
+
+
+def test_helpers_order_root_moves_differently():
+    chessboard = new_board()
+    moves = list(chessboard.generate_moves())
+    ordered = Engine()._order(chessboard, moves, moves[5], 0)
+    for number in 1, 2, 20:
+        rotated = helper(number)._order(chessboard, moves, moves[5], 0)
+        assert rotated[0] == moves[5]
+        assert rotated != ordered
+        assert sorted(rotated) == sorted(ordered)
+    assert helper(1)._order(chessboard, moves, None, 1) == Engine()._order(
+                                                   chessboard, moves, None, 1)
+
+
+@pytest.mark.parametrize("processes", (1, 2))
+def test_parallel_engine_agrees_with_engine(processes):
+    expected = Engine().search(from_fen(MATE_IN_TWO), depth=4)
+    assert expected.move == ("F2", "F7")
+    assert expected.principal_variation == [("F2", "F7"), ("C8", "B8"),
+                                            ("D5", "D8")]
+    assert expected.score >= MATE_THRESHOLD
+    chessboard = from_fen(MATE_IN_TWO)
+    result = ParallelEngine(processes).search(chessboard, depth=4)
+    assert result.move == expected.move
+    assert result.principal_variation == expected.principal_variation
+    assert result.score == expected.score
+    assert result.nodes >= 1
+    assert to_fen(chessboard) == MATE_IN_TWO
+    assert not chessboard.undo_stack
@@ -0,0 +1,42 @@
+"""Tests for pawn moves, in particular capturing en passant."""
+
+import pytest
+
+from conftest import play
+from king_snake.errors import ChessError
+from king_snake.fen import to_fen
+from king_snake.perft import new_board
+
+# Black's pawn reaches d5 by two captures, so it never jumped past d6
+CAPTURED_TO_FIFTH_ROW = (("E2", "E4"), ("A7", "A6"), ("E4", "E5"),
+                         ("A6", "A5"), ("F1", "B5"), ("H7", "H6"),
+                         ("B5", "C6"), ("B7", "C6"), ("B1", "C3"),
+                         ("H6", "H5"), ("C3", "D5"), ("C6", "D5"))
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_no_en_passant_after_captures(bitboards):
+    chessboard = play(new_board(bitboards), CAPTURED_TO_FIFTH_ROW)
+    assert to_fen(chessboard).split()[3] == "-"
+    assert ("E5", "D6") not in chessboard.generate_legal_moves()
+    with pytest.raises(ChessError):
+        chessboard.current_player.move("E5", "D6")
+    assert chessboard.fields["D5"].figure.symbol == "P"
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_en_passant_after_jump(bitboards):
+    chessboard = play(new_board(bitboards),
+                      (("E2", "E4"), ("A7", "A6"), ("E4", "E5"),
+                       ("D7", "D5")))
+    assert to_fen(chessboard).split()[3] == "d6"
+    assert ("E5", "D6") in chessboard.generate_legal_moves()
+    chessboard.current_player.move("E5", "D6")
+    assert chessboard.fields["D5"].figure is None
+
+
+def test_en_passant_expires():
+    chessboard = play(new_board(),
+                      (("E2", "E4"), ("A7", "A6"), ("E4", "E5"),
+                       ("D7", "D5"), ("H2", "H3"), ("H7", "H6")))
+    assert ("E5", "D6") not in chessboard.generate_legal_moves()
@@ -0,0 +1,32 @@
+"""Perft node counts of the known positions on both backends."""
+
+import pytest
+
+from king_snake.perft import KNOWN_RESULTS, POSITIONS, new_board, perft
+
+# Depth checked on every run, deeper ones are benchmarks
+SHALLOW_DEPTH = 3
+
+SHALLOW = [(name, depth) for name in sorted(POSITIONS)
+           for depth in range(1, SHALLOW_DEPTH + 1)]
+DEEP = [(name, depth) for name in sorted(POSITIONS)
+        for depth in range(SHALLOW_DEPTH + 1, len(KNOWN_RESULTS[name]) + 1)]
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+@pytest.mark.parametrize("name,depth", SHALLOW)
+def test_perft(name, depth, bitboards):
+    chessboard = new_board(bitboards, POSITIONS[name])
+    assert perft(chessboard, depth) == KNOWN_RESULTS[name][depth - 1]
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("bitboards", (False, True))
+@pytest.mark.parametrize("name,depth", DEEP)
+def test_perft_deep(name, depth, bitboards):
+    chessboard = new_board(bitboards, POSITIONS[name])
+    assert perft(chessboard, depth) == KNOWN_RESULTS[name][depth - 1]
+
+
+def test_known_results_cover_positions():
+    assert sorted(KNOWN_RESULTS) == sorted(POSITIONS)
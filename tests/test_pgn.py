@@ -0,0 +1,87 @@
+"""Tests for SAN moves and PGN games written and read again."""
+
+import pytest
+
+from conftest import play
+from king_snake.fen import from_fen, to_fen
+from king_snake.perft import new_board
+from king_snake.pgn import parse_san, read_games, san, to_pgn
+
+# En passant, promotion to a knight, disambiguation, castling and checks
+GAME = ("e4 Nf6 e5 d5 exd6 Nbd7 dxc7 e6 cxd8=N Kxd8 Nf3 Bc5 d3 Ke7 Nbd2 Rd8 "
+        "Be2 Nb6 O-O Bxf2+ Rxf2 Nfd5").split()
+GAME_END = "r1br4/pp2kppp/1n2p3/3n4/8/3P1N2/PPPNBRPP/R1BQ2K1 w - - 1 12"
+
+# Three queens that can all move to d4
+QUEENS = "2k5/8/8/8/Q6Q/8/8/Q3K3 w - - 0 1"
+
+
+def test_parse_san():
+    chessboard = play(new_board(), GAME)
+    assert to_fen(chessboard) == GAME_END
+    assert chessboard.move_history[4] == ("E5", "D6")
+    assert chessboard.move_history[8] == ("C7", "D8", "N")
+    assert chessboard.move_history[18] == ("E1", "G1")
+
+
+@pytest.mark.parametrize("move,text", ((("A4", "D4"), "Qa4d4"),
+                                       (("H4", "D4"), "Qhd4"),
+                                       (("A1", "D4"), "Q1d4"),
+                                       (("A1", "A3"), "Q1a3"),
+                                       (("H4", "H8"), "Qhh8+"),
+                                       (("A4", "C6"), "Qc6+"),
+                                       (("A1", "B2"), "Qb2")))
+def test_san_disambiguation(move, text):
+    chessboard = from_fen(QUEENS)
+    assert san(chessboard, move) == text
+    assert parse_san(chessboard, text) == move
+    assert to_fen(chessboard) == QUEENS
+
+
+@pytest.mark.parametrize("promotion", ("Q", "R", "B", "N"))
+def test_san_promotion(promotion):
+    chessboard = from_fen("7k/1P6/8/8/8/8/8/4K3 w - - 0 1")
+    text = san(chessboard, ("B7", "B8", promotion))
+    assert text == "b8=" + promotion + ("+" if promotion in "QR" else "")
+    assert parse_san(chessboard, text) == ("B7", "B8", promotion)
+    assert parse_san(chessboard, "b8") == ("B7", "B8", "Q")
+
+
+@pytest.mark.parametrize("bitboards", (False, True))
+def test_pgn_round_trip(bitboards):
+    chessboard = play(new_board(bitboards), GAME)
+    text = to_pgn(chessboard, {"Event": "Round trip"})
+    assert "3. exd6 Nbd7" in text
+    assert "5. cxd8=N Kxd8" in text
+    assert "10. O-O Bxf2+ 11. Rxf2 Nfd5 *" in text
+    games = list(read_games(text.splitlines(True), bitboards))
+    assert len(games) == 1
+    game = games[0]
+    assert game.error is None
+    assert game.headers["Event"] == "Round trip"
+    assert game.san == GAME
+    assert game.moves == chessboard.move_history
+    assert to_fen(game.chessboard) == GAME_END
+    assert to_pgn(game.chessboard, {"Event": "Round trip"}) == text
+
+
+def test_pgn_round_trip_from_fen():
+    chessboard = from_fen("8/1P6/8/8/8/8/8/k3K3 w - - 0 1")
+    play(chessboard, ("b8=N", "Ka2", "Nc6", "Kb3"))
+    text = to_pgn(chessboard)
+    assert '[FEN "8/1P6/8/8/8/8/8/k3K3 w - - 0 1"]' in text
+    # A knight cannot mate
+    assert "1. b8=N Ka2 2. Nc6 Kb3 1/2-1/2" in text
+    game = next(read_games(text.splitlines(True)))
+    assert game.error is None
+    assert game.moves == chessboard.move_history
+    assert to_fen(game.chessboard) == to_fen(chessboard)
+
+
+def test_pgn_marks_mate_and_result():
+    chessboard = play(new_board(), ("f3", "e5", "g4"))
+    assert san(chessboard, ("D8", "H4")) == "Qh4#"
+    play(chessboard, ("Qh4#",))
+    text = to_pgn(chessboard)
+    assert '[Result "0-1"]' in text
+    assert text.endswith("1. f3 e5 2. g4 Qh4# 0-1\n")
@@ -0,0 +1,60 @@
+"""Tests for playing moves in batch mode with bin/KingSnake.py."""
+
+import argparse
+import imp
+import os
+
+from king_snake.controller import GameController
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "bin",
+                      "KingSnake.py")
+king_snake_script = imp.load_source("king_snake_script", SCRIPT)
+
+FOOLS_MATE = ("# Fool's mate", "f2f3", "e7e5", "", "g2g4", "d8h4")
+MATED = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+
+
+def arguments(**options):
+    """Return parsed command line arguments with the given batch options."""
+    values = dict(verbose=False, stats=False, profile=None, flame_graph=None)
+    values.update(options)
+    return argparse.Namespace(**values)
+
+
+def test_mate(capsys):
+    status = king_snake_script._run_batch(GameController(), FOOLS_MATE,
+                                          arguments())
+    assert status == 0
+    assert capsys.readouterr()[0].splitlines() == [MATED, "0-1 checkmate"]
+
+
+def test_illegal_move(capsys):
+    status = king_snake_script._run_batch(GameController(),
+                                          ("e2e4", "e2e5", "d7d5"),
+                                          arguments())
+    assert status == 1
+    output = capsys.readouterr()[0].splitlines()
+    assert output[0].startswith("Line 2: cannot play e2e5: ")
+    assert output[1:] == [
+        "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"]
+
+
+def test_verbose_stats(capsys):
+    status = king_snake_script._run_batch(GameController(), FOOLS_MATE,
+                                          arguments(verbose=True, stats=True))
+    assert status == 0
+    output = capsys.readouterr()[0].splitlines()
+    assert output[:6] == ["F2 F3", "E7 E5", "G2 G4", "D8 H4", MATED,
+                          "0-1 checkmate"]
+    assert len(output) > 6
+
+
+def test_engine_replies(capsys):
+    controller = GameController("black", engine_seconds=0.05)
+    status = king_snake_script.play_batch(controller, ("e2e4",),
+                                          verbose=True)
+    assert status == 0
+    output = capsys.readouterr()[0].splitlines()
+    assert output[0] == "E2 E4"
+    assert len(output) == 3
+    assert len(controller.chessboard.move_history) == 2
@@ -0,0 +1,82 @@
+"""Tests for the game server, run in process on a local socket."""
+
+import asyncore
+import socket
+
+import pytest
+
+from king_snake.server import GameServer
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class Client(object):
+
+    """A blocking client that lets the server run while waiting."""
+
+    def __init__(self, address):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(address)
+        self.socket.setblocking(False)
+        self.received = ""
+
+    def send(self, line):
+        self.socket.sendall(line + "\n")
+
+    def receive(self, count):
+        """Run the server until count lines have arrived and return them."""
+        for _ in range(1000):
+            if self.received.count("\n") >= count:
+                break
+            asyncore.loop(timeout=0.01, count=1, use_poll=True)
+            try:
+                self.received += self.socket.recv(4096)
+            except socket.error:
+                pass
+        lines = self.received.split("\n")
+        self.received = "\n".join(lines[count:])
+        return lines[:count]
+
+
+@pytest.fixture
+def server(tmpdir):
+    server = GameServer(str(tmpdir.join("server.sock")), cache_size=1000)
+    yield server
+    asyncore.close_all()
+
+
+def test_game(server):
+    white, black = Client(server.address), Client(server.address)
+    white.send("NEW white")
+    assert white.receive(1) == ["GAME 1 white"]
+    black.send("JOIN 1")
+    assert black.receive(2) == ["GAME 1 black", "BOARD 1 - " + START]
+
+    white.send("MOVE 1 f2 f3")
+    line = ("BOARD 1 f2f3 "
+            "rnbqkbnr/pppppppp/8/8/8/5P2/PPPPP1PP/RNBQKBNR b KQkq - 0 1")
+    assert white.receive(1) == black.receive(1) == [line]
+    black.send("MOVE 1 e7 e4")
+    assert black.receive(1)[0].startswith("ERROR Illegal move: ")
+    for client, move in ((black, "e7 e5"), (white, "g2 g4"),
+                         (black, "d8 h4")):
+        client.send("MOVE 1 " + move)
+        line = white.receive(1)[0]
+        assert black.receive(1) == [line]
+        assert line.split()[2] == move.replace(" ", "")
+    assert white.receive(1) == black.receive(1) == ["OVER 1 0-1 checkmate"]
+    assert server.moves == 4
+    assert server.games == {}
+    assert len(server.position_cache)
+
+
+def test_errors(server):
+    client = Client(server.address)
+    for command in ("MOVE 1 e2 e4", "NEW green", "DANCE", "NEW"):
+        client.send(command)
+    assert client.receive(4) == ["ERROR There is no game 1.",
+                                 "ERROR Unknown color green.",
+                                 "ERROR Unknown command DANCE.",
+                                 "GAME 1 white,black"]
+    client.send("MOVE 1 e7 e5")
+    assert client.receive(1)[0].startswith("ERROR Illegal move: ")